@@ -0,0 +1,126 @@
+# async_api.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import database_importer as di
+import connection_manager as cm
+import report_runner as rr
+
+DEFAULT_MAX_WORKERS = 4
+PROGRESS_CHECK_INSTRUCTIONS = 10000 # SQLite VM steps between cancellation checks
+
+
+class _Execution:
+    """One running report, shared by every coroutine that asked for the same thing."""
+    __slots__ = ('future', 'waiters', 'conn', 'cancelled')
+
+    def __init__(self):
+        self.future = None
+        self.waiters = 0
+        self.conn = None
+        self.cancelled = False
+
+
+class AsyncTimeDatabase:
+    """
+    asyncio front end for the blocking querier and heatmap code.
+
+    Reports run on a bounded thread pool; each worker thread keeps its own read-only
+    connection (ConnectionManager.reader), so a connection is only ever used by the
+    thread that owns it. Identical requests made while one is still running share that
+    execution instead of starting another. When every coroutine waiting for an
+    execution is cancelled, the report is stopped: a queued one never starts, a running
+    one is interrupted (conn.interrupt() plus a progress handler, so a statement
+    started just after the cancellation is aborted too).
+
+    Use it as `async with AsyncTimeDatabase(path) as db: text = await db.query_day('20240105')`.
+
+    Args:
+        db_path (str): The database file.
+        max_workers (int): Threads (and so connections) running reports at once.
+    """
+    def __init__(self, db_path=di.DEFAULT_DB_PATH, max_workers=DEFAULT_MAX_WORKERS):
+        self.manager = cm.ConnectionManager(db_path)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='time-db')
+        self._in_flight = {} # (kind, argument, options) -> _Execution; only touched on the event loop thread
+        self.coalesced_count = 0 # Requests answered by an execution that was already running
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Cancels in-flight reports, waits for the worker threads and closes the connections."""
+        for execution in list(self._in_flight.values()):
+            self._cancel(execution)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown)
+        self.manager.close()
+
+    # --- Reports ---
+    # output_format is one of report_renderers.OUTPUT_FORMATS, or None for the typed report object
+    async def query_day(self, date, output_format='text'):
+        return await self._submit('day', date, output_format=output_format)
+
+    async def query_day_raw(self, date, output_format='text'):
+        return await self._submit('raw', date, output_format=output_format)
+
+    async def query_period(self, days_to_query, output_format='text'):
+        return await self._submit('period', days_to_query, output_format=output_format)
+
+    async def query_month_summary(self, year_month, output_format='text'):
+        return await self._submit('month', year_month, output_format=output_format)
+
+    async def generate_heatmap(self, year, output_file=None, drilldown=False, threshold_mode='fixed'):
+        """Writes the year's heatmap HTML; returns the confirmation message."""
+        return await self._submit('heatmap', year, output_file=output_file, drilldown=drilldown, threshold_mode=threshold_mode)
+
+    # --- Machinery ---
+    async def _submit(self, kind, argument, **options):
+        key = (kind, str(argument), tuple(sorted(options.items())))
+        execution = self._in_flight.get(key)
+        if execution is None:
+            execution = _Execution()
+            loop = asyncio.get_running_loop()
+            execution.future = loop.run_in_executor(self.executor, self._run_in_worker, execution, kind, str(argument), options)
+            self._in_flight[key] = execution
+            execution.future.add_done_callback(lambda _: self._forget(key, execution))
+        else:
+            self.coalesced_count += 1
+
+        execution.waiters += 1
+        try:
+            return await asyncio.shield(execution.future)
+        except asyncio.CancelledError:
+            if execution.waiters == 1 and not execution.future.done():
+                self._cancel(execution) # Nobody else wants the result
+            raise
+        finally:
+            execution.waiters -= 1
+
+    def _forget(self, key, execution):
+        if self._in_flight.get(key) is execution:
+            del self._in_flight[key]
+
+    def _cancel(self, execution):
+        execution.cancelled = True
+        execution.future.cancel() # Prevents a queued job from starting
+        conn = execution.conn
+        if conn is not None:
+            conn.interrupt()
+        for key, in_flight in list(self._in_flight.items()):
+            if in_flight is execution:
+                del self._in_flight[key] # New requests must not join a cancelled execution
+
+    def _run_in_worker(self, execution, kind, argument, options):
+        conn = self.manager.reader()
+        execution.conn = conn
+        conn.set_progress_handler(lambda: execution.cancelled, PROGRESS_CHECK_INSTRUCTIONS)
+        try:
+            if execution.cancelled:
+                return None
+            return rr.run_report(conn, kind, argument, **options)
+        finally:
+            conn.set_progress_handler(None, 0)
+            execution.conn = None
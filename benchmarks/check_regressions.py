@@ -0,0 +1,154 @@
+# benchmarks/check_regressions.py
+import os
+import sys
+import json
+import argparse
+import platform
+
+from run_benchmarks import run_benchmarks
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# The fixed workload; stored in the baseline so a check always reruns what the baseline measured.
+# last_year pins the corpus years: a corpus ending with the current year would change with the
+# calendar (leap years, period windows reaching into an empty previous year in early January).
+DEFAULT_WORKLOAD = {'years': 1, 'last_year': 2025, 'seed': 42, 'repeat': 5, 'min_seconds': 0.2}
+# Allowed relative change before a stage counts as regressed. Small stages are noisy, so
+# the baseline can override these per stage under tolerances.stages.<name>.
+DEFAULT_TOLERANCES = {'throughput': 0.30, 'peak_memory': 0.20}
+GATED_STAGES = (
+    'parsing', 'import',
+    'query_day', 'query_day_raw', 'query_period_7', 'query_period_14', 'query_period_30', 'query_month_summary',
+    'heatmap', 'heatmap_drilldown',
+)
+
+
+def load_baseline(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def stage_tolerances(baseline, stage_name):
+    tolerances = dict(DEFAULT_TOLERANCES)
+    tolerances.update(baseline.get('tolerances', {}).get('default', {}))
+    tolerances.update(baseline.get('tolerances', {}).get('stages', {}).get(stage_name, {}))
+    return tolerances
+
+
+def corpus_differences(baseline, current):
+    """
+    Returns the corpus statistics (years, days, lines, bytes) that differ between the baseline
+    run and the current one, as {key: (baseline value, current value)}. Results over different
+    corpora are not comparable.
+    """
+    baseline_corpus = baseline.get('corpus', {})
+    current_corpus = current.get('corpus', {})
+    return {key: (baseline_corpus.get(key), current_corpus.get(key))
+            for key in sorted(baseline_corpus.keys() | current_corpus.keys())
+            if baseline_corpus.get(key) != current_corpus.get(key)}
+
+
+def compare_results(baseline, current):
+    """
+    Compares per-stage throughput and peak memory.
+
+    Returns:
+        list: One row per baseline stage: {'stage', 'metric', 'baseline', 'current', 'change', 'tolerance', 'regressed'}.
+              change is relative: negative throughput / positive memory changes are the bad direction.
+    """
+    rows = []
+    for stage_name, baseline_stage in baseline['stages'].items():
+        current_stage = current['stages'].get(stage_name)
+        tolerances = stage_tolerances(baseline, stage_name)
+        if current_stage is None:
+            rows.append({'stage': stage_name, 'metric': 'missing', 'baseline': None, 'current': None,
+                         'change': None, 'tolerance': None, 'regressed': True})
+            continue
+
+        baseline_throughput = baseline_stage['items_per_second']
+        current_throughput = current_stage['items_per_second']
+        if baseline_throughput and current_throughput:
+            change = current_throughput / baseline_throughput - 1
+            rows.append({'stage': stage_name, 'metric': 'throughput', 'baseline': baseline_throughput,
+                         'current': current_throughput, 'change': change, 'tolerance': tolerances['throughput'],
+                         'regressed': change < -tolerances['throughput']})
+
+        baseline_memory = baseline_stage['peak_memory_bytes']
+        current_memory = current_stage['peak_memory_bytes']
+        if baseline_memory:
+            change = current_memory / baseline_memory - 1
+            rows.append({'stage': stage_name, 'metric': 'peak_memory', 'baseline': baseline_memory,
+                         'current': current_memory, 'change': change, 'tolerance': tolerances['peak_memory'],
+                         'regressed': change > tolerances['peak_memory']})
+    return rows
+
+
+def format_report(rows):
+    lines = [f"{'stage':<22} {'metric':<12} {'baseline':>14} {'current':>14} {'change':>9} {'allowed':>9}  status"]
+    for row in rows:
+        if row['metric'] == 'missing':
+            lines.append(f"{row['stage']:<22} {'-':<12} {'-':>14} {'-':>14} {'-':>9} {'-':>9}  MISSING")
+            continue
+        unit_format = (lambda v: f"{v:,.1f}/s") if row['metric'] == 'throughput' else (lambda v: f"{v / 1024:,.1f} KiB")
+        allowed = f"-{row['tolerance']:.0%}" if row['metric'] == 'throughput' else f"+{row['tolerance']:.0%}"
+        lines.append(f"{row['stage']:<22} {row['metric']:<12} {unit_format(row['baseline']):>14} {unit_format(row['current']):>14} "
+                     f"{row['change']:>+9.1%} {allowed:>9}  {'REGRESSED' if row['regressed'] else 'ok'}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when benchmark stages regress against the committed baseline.")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON path (default: benchmarks/baseline.json).")
+    parser.add_argument("--update-baseline", action='store_true', help="Run the workload and overwrite the baseline (tolerances are kept).")
+    parser.add_argument("--repeat", type=int, help="Override the workload's timed runs per stage.")
+    args = parser.parse_args()
+
+    existing_baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else None
+    if existing_baseline is None and not args.update_baseline:
+        print(f"No baseline at {args.baseline}; create one with --update-baseline.", file=sys.stderr)
+        sys.exit(2)
+
+    workload = dict(DEFAULT_WORKLOAD)
+    if existing_baseline:
+        workload.update(existing_baseline.get('workload', {}))
+    if args.repeat:
+        workload['repeat'] = args.repeat
+
+    print(f"Running workload {workload}:", file=sys.stderr)
+    current = run_benchmarks(workload['years'], workload['seed'], workload['repeat'], stage_names=set(GATED_STAGES),
+                             min_seconds=workload['min_seconds'], last_year=workload['last_year'])
+    current['stages'] = {name: result for name, result in current['stages'].items() if name in GATED_STAGES}
+
+    if args.update_baseline:
+        current['workload'] = workload
+        current['tolerances'] = existing_baseline.get('tolerances', {'default': DEFAULT_TOLERANCES, 'stages': {}}) if existing_baseline else {'default': DEFAULT_TOLERANCES, 'stages': {}}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+
+    baseline_meta = existing_baseline.get('meta', {})
+    if baseline_meta.get('python') != platform.python_version() or baseline_meta.get('platform') != platform.platform():
+        print(f"Note: baseline was recorded on Python {baseline_meta.get('python')} / {baseline_meta.get('platform')}; "
+              f"throughput comparisons across machines are only indicative.", file=sys.stderr)
+
+    differences = corpus_differences(existing_baseline, current)
+    if differences:
+        print("The generated corpus differs from the baseline's, so the results are not comparable:", file=sys.stderr)
+        for key, (baseline_value, current_value) in differences.items():
+            print(f"  {key}: baseline {baseline_value}, current {current_value}", file=sys.stderr)
+        print("Re-record the baseline with --update-baseline if the workload change is intended.", file=sys.stderr)
+        sys.exit(2)
+
+    rows = compare_results(existing_baseline, current)
+    print(format_report(rows))
+    regressed = [row for row in rows if row['regressed']]
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) beyond tolerance: "
+              f"{', '.join(sorted({row['stage'] + '.' + row['metric'] for row in regressed}))}")
+        sys.exit(1)
+    print("\nNo regressions beyond tolerance.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# benchmarks/corpus_generator.py
+import os
+import sys
+import json
+import random
+import argparse
+import datetime
+import calendar
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VALIDATOR_CONFIG_FILE = os.path.join(REPO_ROOT, 'tools', 'format_validator_config.json')
+REPLACEMENT_MAP_FILE = os.path.join(REPO_ROOT, 'tools', 'interval_processor.json')
+
+# Relative weight of each top-level category when picking the next activity
+CATEGORY_WEIGHTS = {
+    'study': 10, 'code': 3, 'routine': 3, 'meal': 3, 'rest': 2, 'recreation': 4,
+    'exercise': 1, 'arrange': 1, 'other': 1, 'break': 1,
+}
+EXCLUDED_LABELS = {'break_allday'} # Labels that do not make sense inside a normal day
+LATE_NIGHT_SHARE = 0.25 # Share of days whose last activities run past midnight (up to 02:00)
+
+
+def load_label_pool(config_file_path=VALIDATOR_CONFIG_FILE):
+    """Returns (labels, weights) for every allowed label of the weighted categories."""
+    with open(config_file_path, 'r', encoding='utf-8') as f:
+        parent_categories = json.load(f)['PARENT_CATEGORIES']
+    labels, weights = [], []
+    for category, category_labels in parent_categories.items():
+        category_weight = CATEGORY_WEIGHTS.get(category)
+        if not category_weight:
+            continue
+        usable_labels = [label for label in category_labels if label not in EXCLUDED_LABELS]
+        for label in usable_labels:
+            labels.append(label)
+            weights.append(category_weight / len(usable_labels))
+    return labels, weights
+
+
+def load_raw_aliases(replacement_map_file=REPLACEMENT_MAP_FILE):
+    """Returns {label: [raw texts]} from the flat (exact) entries of the replacement map."""
+    with open(replacement_map_file, 'r', encoding='utf-8') as f:
+        replacement_map = json.load(f)
+    aliases = {}
+    for raw_text, label in replacement_map.items():
+        if isinstance(label, str):
+            aliases.setdefault(label, []).append(raw_text)
+    return aliases
+
+
+class CorpusGenerator:
+    """
+    Writes a seeded synthetic corpus of realistic daily logs, one file per month,
+    in both formats:
+
+        raw/<year>/<year>_<MM>.txt                  MMDD date lines and HHMM<text> events
+        duration/<year>/Duration_<year>_<MM>.txt   what interval_processor makes of them
+
+    Every day starts with a wake-up event and ends with the next day's wake-up
+    (sleep_night), exactly as interval_processor converts it, so converting the raw
+    corpus reproduces the Duration corpus.
+    """
+    def __init__(self, seed=42, labels=None, weights=None, aliases=None):
+        self.random = random.Random(seed)
+        if labels is None:
+            labels, weights = load_label_pool()
+        self.labels = labels
+        self.weights = weights
+        self.aliases = aliases if aliases is not None else load_raw_aliases()
+
+    def _generate_day(self, date):
+        """
+        Returns {'date', 'getup', 'activities': [(end_minute, label)]} with times as minutes after
+        the day's midnight, so activities after the next midnight are at 1440 and above.
+        """
+        getup = self.random.randint(6 * 60, 9 * 60)
+        if self.random.random() < LATE_NIGHT_SHARE: # Stays up past midnight; the next getup is drawn independently
+            bedtime = self.random.randint(24 * 60, 26 * 60)
+        else:
+            bedtime = self.random.randint(22 * 60, 23 * 60 + 50)
+        activities = []
+        current = getup
+        while current < bedtime:
+            end = min(bedtime, current + self.random.choice((10, 15, 20, 30, 45, 60, 60, 90, 120)))
+            activities.append((end, self.random.choices(self.labels, self.weights)[0]))
+            current = end
+        return {'date': date, 'getup': getup, 'activities': activities}
+
+    def _raw_text(self, label):
+        raw_texts = self.aliases.get(label)
+        if raw_texts and self.random.random() < 0.5:
+            return self.random.choice(raw_texts)
+        return label
+
+    def _render_month(self, days):
+        raw_lines, duration_lines = [], []
+        for i, day in enumerate(days):
+            date = day['date']
+            raw_lines.append(f"{date.month:02d}{date.day:02d}")
+            raw_lines.append(f"{_hhmm(day['getup'])}醒")
+
+            labels = [label for _, label in day['activities']]
+            if duration_lines:
+                duration_lines.append("")
+            duration_lines.append(f"Date:{date.strftime('%Y%m%d')}")
+            duration_lines.append(f"Status:{any('study' in label for label in labels)}")
+            duration_lines.append(f"Getup:{_clock(day['getup'])}")
+            duration_lines.append("Remark:")
+
+            start = day['getup']
+            for end, label in day['activities']:
+                raw_lines.append(f"{_hhmm(end)}{self._raw_text(label)}")
+                duration_lines.append(f"{_clock(start)}~{_clock(end)}{label}")
+                start = end
+            if i + 1 < len(days): # interval_processor only knows the next wake-up within the same file
+                duration_lines.append(f"{_clock(start)}~{_clock(days[i + 1]['getup'])}sleep_night")
+        return raw_lines, duration_lines
+
+    def write_corpus(self, output_dir, years):
+        """
+        Writes one raw and one Duration file per month of the given years.
+
+        Returns:
+            dict: Corpus statistics (files, days, lines, bytes per format).
+        """
+        stats = {'years': list(years), 'months': 0, 'days': 0, 'raw_lines': 0, 'raw_bytes': 0,
+                 'duration_lines': 0, 'duration_bytes': 0}
+        for year in years:
+            raw_dir = os.path.join(output_dir, 'raw', str(year))
+            duration_dir = os.path.join(output_dir, 'duration', str(year))
+            os.makedirs(raw_dir, exist_ok=True)
+            os.makedirs(duration_dir, exist_ok=True)
+            for month in range(1, 13):
+                days = [self._generate_day(datetime.date(year, month, day))
+                        for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+                raw_lines, duration_lines = self._render_month(days)
+                for path, lines, prefix in ((os.path.join(raw_dir, f"{year}_{month:02d}.txt"), raw_lines, 'raw'),
+                                            (os.path.join(duration_dir, f"Duration_{year}_{month:02d}.txt"), duration_lines, 'duration')):
+                    content = '\n'.join(lines) + '\n'
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    stats[f'{prefix}_lines'] += len(lines)
+                    stats[f'{prefix}_bytes'] += len(content.encode('utf-8'))
+                stats['months'] += 1
+                stats['days'] += len(days)
+        return stats
+
+
+def _hhmm(minutes):
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}{minutes % 60:02d}"
+
+def _clock(minutes):
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic corpus of raw and Duration-format logs.")
+    parser.add_argument("output_dir", help="Directory to write raw/ and duration/ into.")
+    parser.add_argument("--years", type=int, default=1, help="Number of years, ending with --last-year (default: 1).")
+    parser.add_argument("--last-year", type=int, default=datetime.date.today().year, help="Last year of the corpus (default: the current year).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42).")
+    args = parser.parse_args()
+
+    stats = CorpusGenerator(seed=args.seed).write_corpus(args.output_dir, range(args.last_year - args.years + 1, args.last_year + 1))
+    json.dump(stats, sys.stdout, indent=2)
+    print()
+
+if __name__ == '__main__':
+    main()
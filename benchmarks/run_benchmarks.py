@@ -0,0 +1,309 @@
+# benchmarks/run_benchmarks.py
+import os
+import sys
+import io
+import json
+import time
+import sqlite3
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import contextlib
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT) # The project modules live in the repository root, not in an installed package
+
+import data_parser as dp
+import database_importer as di
+import database_querier as dq
+import heatmap_generator as hg
+import ingest_pipeline as ip
+from tools.interval_processor import LogProcessor, AliasMatcher, DEFAULT_REPLACEMENT_MAP_FILE
+from tools.format_validator import CONFIG_FILE_PATH, ConfigManager, LineValidator, FileProcessor
+from corpus_generator import CorpusGenerator
+
+RESULTS_FORMAT_VERSION = 1
+
+
+class Stage:
+    """
+    One benchmarked stage.
+
+    Args:
+        name (str): Stage name, the key in the results JSON.
+        run (callable): The measured work; returns the number of items it processed.
+        unit (str): What an item is (lines, days, queries, ...).
+        setup (callable): Optional un-timed reset run before every measurement.
+    """
+    def __init__(self, name, run, unit, setup=None):
+        self.name = name
+        self.run = run
+        self.unit = unit
+        self.setup = setup
+
+
+def measure_stage(stage, repeat, min_seconds=0.0):
+    """
+    Times the stage `repeat` times (best and median are reported), then runs it once
+    more under tracemalloc for the peak memory, so tracing does not distort the timings.
+    Each timing sample repeats the run until it has lasted min_seconds and reports the
+    time per run, which steadies millisecond-scale stages (not for stages with a setup).
+
+    Returns:
+        dict: seconds, median_seconds, items, unit, items_per_second, peak_memory_bytes.
+    """
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        if stage.setup:
+            stage.setup()
+        runs = 0
+        start_time = time.perf_counter()
+        while True:
+            items = stage.run()
+            runs += 1
+            elapsed = time.perf_counter() - start_time
+            if stage.setup or elapsed >= min_seconds:
+                break
+        timings.append(elapsed / runs)
+
+    if stage.setup:
+        stage.setup()
+    tracemalloc.start()
+    try:
+        stage.run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'seconds': best,
+        'median_seconds': sorted(timings)[len(timings) // 2],
+        'items': items,
+        'unit': stage.unit,
+        'items_per_second': items / best if best > 0 else None,
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def _list_files(directory):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(directory) for name in names if name.endswith('.txt'))
+
+def _count_lines(paths):
+    total = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def _check_corpus_is_valid(duration_files, file_processor):
+    """
+    Fails if the validator reports an error in the generated Duration corpus. The corpus is
+    valid by construction (including days that run past midnight into a later getup), so an
+    error here is a validator regression, and the stages would otherwise time rejections.
+
+    Raises:
+        RuntimeError: Naming the first error found.
+    """
+    for path in duration_files:
+        for diagnostic in file_processor.process_and_validate_file_contents(path) or ():
+            if diagnostic.severity == 'error':
+                raise RuntimeError(f"Generated corpus fails validation: {path}: {diagnostic.message}")
+
+
+def build_stages(work_dir, corpus_stats):
+    """Builds every stage over the corpus in work_dir (the current directory while they run)."""
+    raw_files = _list_files(os.path.join(work_dir, 'raw'))
+    duration_files = _list_files(os.path.join(work_dir, 'duration'))
+    raw_line_count = _count_lines(raw_files)
+    duration_line_count = _count_lines(duration_files)
+    years = corpus_stats['years']
+    period_end_date = f"{years[-1]}1231" # Period windows end with the corpus, not with today
+    conversion_dir = os.path.join(work_dir, 'converted')
+    os.makedirs(conversion_dir, exist_ok=True)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        config_manager = ConfigManager(CONFIG_FILE_PATH)
+        config_manager.load()
+        pipeline = ip.IngestPipeline()
+    file_processor = FileProcessor(LineValidator(config_manager))
+    _check_corpus_is_valid(duration_files, file_processor)
+    with contextlib.redirect_stderr(io.StringIO()):
+        alias_matcher = AliasMatcher.from_config(LogProcessor._load_replacement_map(DEFAULT_REPLACEMENT_MAP_FILE))
+    parsed_data = [day for path in duration_files for day in dp.parse_file(path)]
+
+    def interval_conversion():
+        for path in raw_files:
+            year = int(os.path.basename(os.path.dirname(path)))
+            output_path = os.path.join(conversion_dir, os.path.basename(path))
+            with open(path, 'r', encoding='utf-8') as input_file, open(output_path, 'w', encoding='utf-8') as output_file:
+                LogProcessor(year=year, output_file_stream=output_file, alias_matcher=alias_matcher).process_log_stream(input_file)
+        return raw_line_count
+
+    def validation():
+        for path in duration_files:
+            file_processor.process_and_validate_file_contents(path)
+        return duration_line_count
+
+    def parsing():
+        for path in duration_files:
+            dp.parse_file(path)
+        return duration_line_count
+
+    def ingest():
+        for path in duration_files:
+            pipeline.ingest_file(path)
+        return duration_line_count
+
+    def reset_database():
+        if os.path.exists('time_data.db'):
+            os.remove('time_data.db')
+
+    def database_import():
+        conn = di.init_db()
+        di.import_to_db(conn, parsed_data)
+        conn.close()
+        return len(parsed_data)
+
+    stages = [
+        Stage('interval_conversion', interval_conversion, 'lines'),
+        Stage('validation', validation, 'lines'),
+        Stage('parsing', parsing, 'lines'),
+        Stage('ingest_pipeline', ingest, 'lines'),
+        Stage('import', database_import, 'days', setup=reset_database),
+    ]
+
+    # Report stages run against the database the import stage leaves behind
+    def with_connection(report):
+        def run():
+            conn = sqlite3.connect('time_data.db')
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return report(conn)
+            finally:
+                conn.close()
+        return run
+
+    sample_dates = sorted(day['date'] for day in parsed_data)[::max(1, len(parsed_data) // 50)]
+    months = [f"{year}{month:02d}" for year in years for month in range(1, 13)]
+
+    def query_days(conn):
+        for date in sample_dates:
+            dq.query_day(conn, date)
+        return len(sample_dates)
+
+    def query_days_raw(conn):
+        for date in sample_dates:
+            dq.query_day_raw(conn, date)
+        return len(sample_dates)
+
+    def query_periods(days):
+        def run(conn):
+            dq.query_period(conn, days, period_end_date)
+            return 1
+        return run
+
+    def query_months(conn):
+        for year_month in months:
+            dq.query_month_summary(conn, year_month)
+        return len(months)
+
+    def heatmap(drilldown):
+        def run(conn):
+            fetcher = hg.HeatmapDataFetcher(conn)
+            for year in years:
+                study_data = fetcher.fetch_yearly_study_times(year)
+                drilldown_data = fetcher.fetch_yearly_day_breakdowns(year) if drilldown else None
+                generator = hg.HeatmapGenerator(year, study_data, drilldown_data=drilldown_data)
+                generator.generate_html_output(f"study_heatmap_{year}.html")
+            return len(years)
+        return run
+
+    stages += [
+        Stage('query_day', with_connection(query_days), 'queries'),
+        Stage('query_day_raw', with_connection(query_days_raw), 'queries'),
+        Stage('query_period_7', with_connection(query_periods(7)), 'queries'),
+        Stage('query_period_14', with_connection(query_periods(14)), 'queries'),
+        Stage('query_period_30', with_connection(query_periods(30)), 'queries'),
+        Stage('query_month_summary', with_connection(query_months), 'queries'),
+        Stage('heatmap', with_connection(heatmap(False)), 'years'),
+        Stage('heatmap_drilldown', with_connection(heatmap(True)), 'years'),
+    ]
+    return stages
+
+
+def run_benchmarks(years=1, seed=42, repeat=3, work_dir=None, stage_names=None, min_seconds=0.0, last_year=None):
+    """
+    Generates the corpus (years years ending with last_year, default the current year)
+    and measures every stage. Pass last_year for a workload that must not change with
+    the calendar.
+
+    Returns:
+        dict: The results document (meta, corpus, stages).
+    """
+    owns_work_dir = work_dir is None
+    work_dir = os.path.abspath(work_dir or tempfile.mkdtemp(prefix='time_master_bench_'))
+    os.makedirs(work_dir, exist_ok=True)
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir) # database_importer.init_db and the heatmap write into the current directory
+    try:
+        last_year = last_year or datetime.date.today().year
+        corpus_stats = CorpusGenerator(seed=seed).write_corpus(work_dir, range(last_year - years + 1, last_year + 1))
+
+        results = {}
+        for stage in build_stages(work_dir, corpus_stats):
+            if stage_names and stage.name not in stage_names and stage.name != 'import':
+                continue # The report stages need the database, so import always runs
+            results[stage.name] = measure_stage(stage, repeat, min_seconds)
+            print(f"  {stage.name:<22} {results[stage.name]['seconds']:>9.4f}s  "
+                  f"{results[stage.name]['items_per_second'] or 0:>12.1f} {stage.unit}/s  "
+                  f"peak {results[stage.name]['peak_memory_bytes'] / 1024:>9.1f} KiB", file=sys.stderr)
+    finally:
+        os.chdir(previous_cwd)
+        if owns_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'corpus_years': corpus_stats['years'],
+            'repeat': repeat,
+            'min_seconds': min_seconds,
+        },
+        'corpus': corpus_stats,
+        'stages': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks over a seeded synthetic corpus.")
+    parser.add_argument("--years", type=int, default=1, help="Years of daily logs to generate (default: 1).")
+    parser.add_argument("--last-year", type=int, help="Last corpus year (default: the current year).")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus random seed (default: 42).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage; the best is reported (default: 3).")
+    parser.add_argument("--min-seconds", type=float, default=0.0, help="Repeat each timing sample until it lasts this long (default: 0).")
+    parser.add_argument("--stages", help="Comma-separated stage names to run (default: all).")
+    parser.add_argument("--work-dir", help="Keep the corpus and database in this directory instead of a temporary one.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Results JSON path (default: benchmark_results.json).")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    stage_names = set(args.stages.split(',')) if args.stages else None
+    print(f"Benchmarking {args.years} year(s), seed {args.seed}, best of {args.repeat}:", file=sys.stderr)
+    results = run_benchmarks(args.years, args.seed, max(1, args.repeat), args.work_dir, stage_names, args.min_seconds, args.last_year)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+    print(f"Results written to {output_path}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
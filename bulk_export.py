@@ -0,0 +1,168 @@
+# bulk_export.py
+import os
+import sys
+import csv
+import gzip
+import json
+import argparse
+import database_importer as di
+import instrumentation
+
+EXPORT_FORMATS = ('text', 'csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 2000
+CSV_COLUMNS = ('date', 'status', 'getup_time', 'remark', 'start', 'end', 'project_path', 'duration')
+
+
+def iter_days(conn, start_date=None, end_date=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Streams stored days in date order from a single ordered cursor, fetching batch_size
+    rows at a time, so memory use does not grow with the range. A day's records come in
+    file order: from the getup on, with those after midnight (starting before the getup
+    time) last.
+
+    Args:
+        start_date, end_date (str): Optional inclusive YYYYMMDD bounds.
+
+    Yields:
+        dict: {'date', 'status', 'getup_time', 'remark', 'records': [(start, end, project_path, duration)]}
+    """
+    conditions, params = [], []
+    if start_date:
+        conditions.append('d.date >= ?')
+        params.append(start_date)
+    if end_date:
+        conditions.append('d.date <= ?')
+        params.append(end_date)
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT d.date, d.status, d.getup_time, d.remark, t.start, t.end, t.project_path, t.duration
+        FROM days d
+        LEFT JOIN time_records t ON t.date = d.date
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY d.date, t.start < d.getup_time, t.start
+    ''', params)
+
+    day = None
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for date, status, getup_time, remark, start, end, project_path, duration in rows:
+            if day is None or day['date'] != date:
+                if day is not None:
+                    yield day
+                day = {'date': date, 'status': status, 'getup_time': getup_time, 'remark': remark or '', 'records': []}
+            if start is not None:
+                day['records'].append((start, end, project_path, duration))
+    if day is not None:
+        yield day
+
+
+# --- Writers ---
+def _write_text(days, output):
+    """The Date:/Status:/Getup:/Remark: input format, which the parser and validator read back."""
+    first = True
+    for day in days:
+        lines = [f"Date:{day['date']}", f"Status:{day['status']}", f"Getup:{day['getup_time']}", f"Remark:{day['remark']}"]
+        lines.extend(f"{start}~{end}{project_path}" for start, end, project_path, _ in day['records'])
+        output.write(('' if first else '\n') + '\n'.join(lines) + '\n')
+        first = False
+        yield day
+
+def _write_csv(days, output):
+    """One row per record; a day without records gets one row with empty record columns."""
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(CSV_COLUMNS)
+    for day in days:
+        day_columns = (day['date'], day['status'], day['getup_time'], day['remark'])
+        if day['records']:
+            writer.writerows(day_columns + record for record in day['records'])
+        else:
+            writer.writerow(day_columns + ('', '', '', ''))
+        yield day
+
+def _write_jsonl(days, output):
+    """One JSON object per day."""
+    for day in days:
+        output.write(json.dumps({
+            'date': day['date'], 'status': day['status'], 'getup_time': day['getup_time'], 'remark': day['remark'],
+            'records': [{'start': start, 'end': end, 'project_path': project_path, 'duration': duration}
+                        for start, end, project_path, duration in day['records']],
+        }, ensure_ascii=False) + '\n')
+        yield day
+
+_WRITERS = {'text': _write_text, 'csv': _write_csv, 'jsonl': _write_jsonl}
+
+
+def export_records(conn, output, output_format='text', start_date=None, end_date=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Streams the stored days of a date range to an open text stream.
+
+    Args:
+        conn (sqlite3.Connection): The database connection object.
+        output (file): A writable text stream (e.g. from open_export_file).
+        output_format (str): 'text', 'csv' or 'jsonl'.
+        start_date, end_date (str): Optional inclusive YYYYMMDD bounds.
+
+    Returns:
+        dict: {'days': exported day count, 'records': exported record count}
+    """
+    if output_format not in _WRITERS:
+        raise ValueError(f"Unknown export format '{output_format}'. Expected one of {EXPORT_FORMATS}.")
+    counts = {'days': 0, 'records': 0}
+    with instrumentation.span('bulk_export', format=output_format) as span:
+        for day in _WRITERS[output_format](iter_days(conn, start_date, end_date, batch_size), output):
+            counts['days'] += 1
+            counts['records'] += len(day['records'])
+        span.count('days_exported', counts['days'])
+        span.count('records_exported', counts['records'])
+    return counts
+
+
+def open_export_file(path, compress=None):
+    """Opens path for a text export; gzip-compressed when compress is True or, if None, when path ends in .gz."""
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def guess_format(path):
+    """Picks the export format from the file name (.csv, .jsonl, otherwise text), ignoring a .gz suffix."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    return 'text'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored days to the text input format, CSV or JSON Lines.")
+    parser.add_argument("output", help="Output file ('-' for stdout); a .gz suffix compresses it.")
+    parser.add_argument("--db", default=di.DEFAULT_DB_PATH, help=f"Database file (default: {di.DEFAULT_DB_PATH}).")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Export format (default: from the file name, else text).")
+    parser.add_argument("--from", dest='start_date', help="First date to export (YYYYMMDD).")
+    parser.add_argument("--to", dest='end_date', help="Last date to export (YYYYMMDD).")
+    parser.add_argument("--gzip", action='store_true', help="Compress even without a .gz suffix.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Rows fetched per batch (default: {DEFAULT_BATCH_SIZE}).")
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        parser.error(f"database not found: {args.db}")
+
+    instrumentation.enable_from_environment()
+    output_format = args.format or guess_format(args.output)
+    conn = di.init_db(args.db)
+    try:
+        if args.output == '-':
+            counts = export_records(conn, sys.stdout, output_format, args.start_date, args.end_date, args.batch_size)
+        else:
+            with open_export_file(args.output, compress=True if args.gzip else None) as output:
+                counts = export_records(conn, output, output_format, args.start_date, args.end_date, args.batch_size)
+    finally:
+        conn.close()
+    print(f"Exported {counts['days']} day(s), {counts['records']} record(s).", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
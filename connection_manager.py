@@ -0,0 +1,66 @@
+# connection_manager.py
+import sqlite3
+import pathlib
+import threading
+import contextlib
+import database_importer as di
+
+
+class ConnectionManager:
+    """
+    Hands out SQLite connections for concurrent use of one database file.
+
+    The database is switched to WAL mode, so readers never block the writer or each
+    other. Every thread gets its own read-only connection from reader() (sqlite3
+    connections must not be shared between threads that run statements at the same
+    time), while all writes go through the single connection behind writer(), which
+    a lock serializes.
+
+    Args:
+        db_path (str): The database file (created with the schema if missing).
+    """
+    def __init__(self, db_path=di.DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock() # Guards _readers
+        self._write_lock = threading.Lock()
+        self._readers = []
+        self._writer = sqlite3.connect(db_path, check_same_thread=False) # Only used while holding _write_lock
+        di.create_schema(self._writer)
+        self._writer.execute('PRAGMA journal_mode=WAL')
+        self._read_uri = pathlib.Path(db_path).resolve().as_uri() + '?mode=ro'
+
+    def reader(self):
+        """Returns this thread's read-only connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False only so close() can close it from another thread
+            conn = sqlite3.connect(self._read_uri, uri=True, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    @contextlib.contextmanager
+    def writer(self):
+        """
+        Context manager yielding the shared write connection while holding the write lock.
+        Commits on success and rolls back if the block raises.
+        """
+        with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.rollback()
+                raise
+            else:
+                self._writer.commit()
+
+    def close(self):
+        """Closes the writer and every reader the manager has opened."""
+        with self._lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        with self._write_lock:
+            self._writer.close()
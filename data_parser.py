@@ -1,6 +1,7 @@
 # data_parser.py
 import re
 import os
+import instrumentation
 
 def time_to_seconds(t):
     """Converts HH:MM time string to seconds."""
@@ -114,17 +115,22 @@ class FileDataParser:
         self._reset_daily_data()
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line_num, line_text in enumerate(f, 1):
-                    try:
-                        self._process_line(line_text, filepath, line_num)
-                    except Exception as e:
-                        print(f"Error parsing line {line_num} in {os.path.basename(filepath)}: '{line_text.strip()}'")
-                        print(f"Specific error: {str(e)}")
-
-            if self.current_date:
-                self._package_previous_date_data()
-
+            with instrumentation.span('parse_file', file=os.path.basename(filepath)) as span:
+                line_num = 0
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    for line_num, line_text in enumerate(f, 1):
+                        try:
+                            self._process_line(line_text, filepath, line_num)
+                        except Exception as e:
+                            print(f"Error parsing line {line_num} in {os.path.basename(filepath)}: '{line_text.strip()}'")
+                            print(f"Specific error: {str(e)}")
+
+                if self.current_date:
+                    self._package_previous_date_data()
+
+                span.count('lines_parsed', line_num)
+                span.count('days_parsed', len(self.parsed_data))
+                span.count('records_parsed', sum(len(day['time_records']) for day in self.parsed_data))
             return self.parsed_data
 
         except FileNotFoundError:
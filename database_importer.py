@@ -1,5 +1,7 @@
 # database_importer.py
 import sqlite3
+import instrumentation
+import snapshot
 
 class DatabaseImporter:
     """Handles all database operations: initialization and data import."""
@@ -43,33 +45,55 @@ class DatabaseImporter:
         Args:
             parsed_data (list): The intermediate data from FileDataParser.
         """
-        for day_data in parsed_data:
-            date = day_data['date']
-            info = day_data['day_info']
-            
-            # Insert or ignore the date first to ensure it exists
-            self.cursor.execute(
-                'INSERT OR IGNORE INTO days (date, status, remark, getup_time) VALUES (?, ?, ?, ?)',
-                (date, 'False', '', '00:00')
-            )
-            # Then update it with the parsed details
-            self.cursor.execute(
-                'UPDATE days SET status=?, remark=?, getup_time=? WHERE date=?',
-                (info['status'], info['remark'], info['getup_time'], date)
-            )
-
-            for start, end, project_path, duration in day_data['time_records']:
-                self.cursor.execute('''
-                    INSERT OR REPLACE INTO time_records
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (date, start, end, project_path, duration))
-                self._update_parent_child_hierarchy(project_path)
-        
-        self.conn.commit()
-
-def init_db():
-    """Initializes the database and creates tables if they don't exist."""
-    conn = sqlite3.connect('time_data.db')
+        with instrumentation.span('import_data') as span:
+            rows_written = 0
+            for day_data in parsed_data:
+                date = day_data['date']
+                info = day_data['day_info']
+
+                # Insert or ignore the date first to ensure it exists
+                self.cursor.execute(
+                    'INSERT OR IGNORE INTO days (date, status, remark, getup_time) VALUES (?, ?, ?, ?)',
+                    (date, 'False', '', '00:00')
+                )
+                # Then update it with the parsed details
+                self.cursor.execute(
+                    'UPDATE days SET status=?, remark=?, getup_time=? WHERE date=?',
+                    (info['status'], info['remark'], info['getup_time'], date)
+                )
+
+                for start, end, project_path, duration in day_data['time_records']:
+                    self.cursor.execute('''
+                        INSERT OR REPLACE INTO time_records
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (date, start, end, project_path, duration))
+                    self._update_parent_child_hierarchy(project_path)
+                rows_written += len(day_data['time_records'])
+
+            with instrumentation.span('commit'):
+                self.conn.commit()
+            snapshot.mark_stale(self.conn) # Rebuilt once per batch by snapshot.refresh_stale()
+            span.count('days_written', len(parsed_data))
+            span.count('rows_written', rows_written)
+
+    def replace_days(self, parsed_data):
+        """
+        Imports parsed day objects, first deleting any time records already stored
+        for those dates, so that edited or removed activities do not linger.
+
+        Args:
+            parsed_data (list): The intermediate data from FileDataParser.
+        """
+        with instrumentation.span('replace_days') as span:
+            for day_data in parsed_data:
+                self.cursor.execute('DELETE FROM time_records WHERE date = ?', (day_data['date'],))
+                span.count('rows_deleted', self.cursor.rowcount)
+            self.import_data(parsed_data)
+
+DEFAULT_DB_PATH = 'time_data.db'
+
+def create_schema(conn):
+    """Creates the tables if they don't exist and seeds the top-level categories."""
     cursor = conn.cursor()
 
     cursor.executescript('''
@@ -100,6 +124,11 @@ def init_db():
             (child, parent)
         )
     conn.commit()
+
+def init_db(db_path=DEFAULT_DB_PATH):
+    """Initializes the database at db_path and creates tables if they don't exist."""
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
     return conn
 
 def import_to_db(conn, parsed_data):
@@ -107,4 +136,11 @@ def import_to_db(conn, parsed_data):
     Public function to import parsed data using the DatabaseImporter class.
     """
     importer = DatabaseImporter(conn)
-    importer.import_data(parsed_data)
\ No newline at end of file
+    importer.import_data(parsed_data)
+
+def replace_days_in_db(conn, parsed_data):
+    """
+    Public function to re-import whole days using the DatabaseImporter class.
+    """
+    importer = DatabaseImporter(conn)
+    importer.replace_days(parsed_data)
\ No newline at end of file
@@ -1,8 +1,7 @@
 import sqlite3
 import re
 from datetime import datetime, timedelta
-from collections import defaultdict
-import calendar
+import instrumentation
 # 这个程序用于数据库查询
 # --- Utility Functions ---
 def time_format_duration(seconds, avg_days=1):
@@ -47,7 +46,64 @@ def generate_sorted_output(node, avg_days=1, indent=0):
     return lines
 
 
+def build_project_tree(records, parent_map):
+    """
+    Aggregates (project_path, duration) rows into a project hierarchy.
+
+    Args:
+        records (iterable): (project_path, duration) pairs.
+        parent_map (dict): child -> parent mapping from the parent_child table.
+
+    Returns:
+        dict: Maps each top-level category (e.g. 'STUDY') to a node of the form
+              {'duration': seconds, 'children': {name: node, ...}}.
+    """
+    tree = {}
+    records_aggregated = 0
+    for project_path, duration in records:
+        records_aggregated += 1
+        parts = project_path.split('_')
+        top_level_category = parent_map.get(parts[0], parts[0].upper())
+
+        current_node = tree.setdefault(top_level_category, {'duration': 0, 'children': {}})
+        current_node['duration'] += duration
+        for child_name in parts[1:]:
+            current_node = current_node['children'].setdefault(child_name, {'duration': 0, 'children': {}})
+            current_node['duration'] += duration
+    instrumentation.add_count('records_aggregated', records_aggregated)
+    return tree
+
+def merge_project_trees(trees):
+    """
+    Merges trees from build_project_tree (e.g. one per user) by adding up the
+    durations of matching nodes. The input trees are left untouched.
+
+    Args:
+        trees (iterable): Trees as returned by build_project_tree.
+
+    Returns:
+        dict: A new tree of the same shape.
+    """
+    merged = {}
+    for tree in trees:
+        _merge_tree_nodes(merged, tree)
+    return merged
+
+def _merge_tree_nodes(target_nodes, source_nodes):
+    for name, source_node in source_nodes.items():
+        target_node = target_nodes.setdefault(name, {'duration': 0, 'children': {}})
+        target_node['duration'] += source_node['duration']
+        _merge_tree_nodes(target_node['children'], source_node['children'])
+
+
 # --- Database Query Functions ---
+def get_parent_map(conn):
+    """Fetches the child -> parent mapping used to resolve top-level categories."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT child, parent FROM parent_child")
+    return {child: parent_val for child, parent_val in cursor.fetchall()}
+
+@instrumentation.instrumented()
 def get_study_times(conn, year):
     """Fetches daily study times for a given year for heatmap generation."""
     cursor = conn.cursor()
@@ -63,85 +119,159 @@ def get_study_times(conn, year):
     study_times = {date: duration for date, duration in cursor.fetchall()}
     return study_times
 
-def query_day(conn, date):
-    """Queries and displays statistics for a specific day."""
+# --- Report Results ---
+class DayReport:
+    """
+    Statistics for one day.
+
+    Attributes:
+        date (str): YYYYMMDD.
+        found (bool): False if the day is not in the database (the other fields are then empty).
+        status, remark, getup (str): The day's header values.
+        total_duration (int): Seconds recorded that day.
+        tree (dict): The build_project_tree hierarchy of the day's records.
+    """
+    __slots__ = ('date', 'found', 'status', 'remark', 'getup', 'total_duration', 'tree')
+
+    def __init__(self, date, found=False, status=None, remark=None, getup=None, total_duration=0, tree=None):
+        self.date = date
+        self.found = found
+        self.status = status
+        self.remark = remark
+        self.getup = getup
+        self.total_duration = total_duration
+        self.tree = tree or {}
+
+    def to_dict(self):
+        return {'report': 'day', **{name: getattr(self, name) for name in self.__slots__}}
+
+
+class PeriodReport:
+    """
+    Statistics for the last N days.
+
+    Attributes:
+        days_to_query (int): N.
+        start_date, end_date (str): The YYYYMMDD range covered.
+        total_duration (int): Seconds recorded in the range.
+        days_with_records (int): Days that have time records; averages are per such day.
+        true_days, false_days (int): Days with Status True / False.
+        tree (dict): The build_project_tree hierarchy of the range's records.
+    """
+    __slots__ = ('days_to_query', 'start_date', 'end_date', 'total_duration', 'days_with_records',
+                 'true_days', 'false_days', 'tree')
+
+    def __init__(self, days_to_query, start_date, end_date, total_duration=0, days_with_records=0,
+                 true_days=0, false_days=0, tree=None):
+        self.days_to_query = days_to_query
+        self.start_date = start_date
+        self.end_date = end_date
+        self.total_duration = total_duration
+        self.days_with_records = days_with_records
+        self.true_days = true_days
+        self.false_days = false_days
+        self.tree = tree or {}
+
+    @property
+    def average_days(self):
+        """The divisor for per-day averages: days with records, at least 1."""
+        return self.days_with_records if self.days_with_records > 0 else 1
+
+    def to_dict(self):
+        return {'report': 'period', **{name: getattr(self, name) for name in self.__slots__}}
+
+
+class DayRawReport:
+    """
+    One day's data as it is stored, for output in the original text format.
+
+    Attributes:
+        date (str): YYYYMMDD.
+        found (bool): False if the day is not in the database.
+        status, getup, remark (str): The day's header values.
+        total_duration (int): Seconds recorded that day.
+        records (list): (start, end, project_path) tuples ordered by start.
+    """
+    __slots__ = ('date', 'found', 'status', 'getup', 'remark', 'total_duration', 'records')
+
+    def __init__(self, date, found=False, status=None, getup=None, remark=None, total_duration=0, records=None):
+        self.date = date
+        self.found = found
+        self.status = status
+        self.getup = getup
+        self.remark = remark
+        self.total_duration = total_duration
+        self.records = records or []
+
+    def to_dict(self):
+        return {'report': 'day_raw', **{name: getattr(self, name) for name in self.__slots__},
+                'records': [{'start': start, 'end': end, 'project_path': project} for start, end, project in self.records]}
+
+
+class MonthReport:
+    """
+    Statistics for one month.
+
+    Attributes:
+        year_month (str): YYYYMM.
+        total_duration (int): Seconds recorded in the month.
+        days_with_records (int): Days that have time records; averages are per such day.
+        tree (dict): The build_project_tree hierarchy of the month's records.
+    """
+    __slots__ = ('year_month', 'total_duration', 'days_with_records', 'tree')
+
+    def __init__(self, year_month, total_duration=0, days_with_records=0, tree=None):
+        self.year_month = year_month
+        self.total_duration = total_duration
+        self.days_with_records = days_with_records
+        self.tree = tree or {}
+
+    @property
+    def average_days(self):
+        """The divisor for per-day averages: days with records, at least 1."""
+        return self.days_with_records if self.days_with_records > 0 else 1
+
+    def to_dict(self):
+        return {'report': 'month', **{name: getattr(self, name) for name in self.__slots__}}
+
+
+# --- Report Queries ---
+def _sum_day_duration(cursor, date):
+    cursor.execute('SELECT SUM(duration) FROM time_records WHERE date = ?', (date,))
+    total_duration_result = cursor.fetchone()
+    return total_duration_result[0] if total_duration_result and total_duration_result[0] is not None else 0
+
+@instrumentation.instrumented('query_day')
+def day_report(conn, date):
+    """Queries the statistics for a specific day. Returns a DayReport."""
     cursor = conn.cursor()
     cursor.execute('SELECT status, remark, getup_time FROM days WHERE date = ?', (date,))
     day_data = cursor.fetchone()
 
     if not day_data:
-        print(f"\n[{date}]\nNo records found for this date.")
-        return
+        return DayReport(date)
 
     status, remark, getup = day_data
-    
-    # Calculate and prepare total duration string first
-    cursor.execute('SELECT SUM(duration) FROM time_records WHERE date = ?', (date,))
-    total_duration_result = cursor.fetchone()
-    total_duration = total_duration_result[0] if total_duration_result and total_duration_result[0] is not None else 0
-    
-    output = [f"\nDate: {date}"]
-    output.append(f"Total Time: {time_format_duration(total_duration)} ({total_duration // 60} minutes)") # Total for the day
-    output.append(f"Status: {status}")
-    output.append(f"Getup: {getup}")
-    if remark and remark.strip():
-        output.append(f"Remark: {remark}")
+    total_duration = _sum_day_duration(cursor, date)
 
     cursor.execute('SELECT project_path, duration FROM time_records WHERE date = ?', (date,))
     records = cursor.fetchall()
-
-    if records:
-        # Build the project tree
-        tree = defaultdict(lambda: {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})})
-        
-        # Fetch parent mappings
-        cursor.execute("SELECT child, parent FROM parent_child")
-        parent_map = {child: parent_val for child, parent_val in cursor.fetchall()}
-
-        for project_path, duration_val in records: # Renamed duration to duration_val to avoid conflict
-            parts = project_path.split('_')
-            if not parts: continue
-
-            current_level_path = parts[0]
-            top_level_category = parent_map.get(current_level_path, current_level_path.upper())
-
-            if top_level_category not in tree:
-                tree[top_level_category] = {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})}
-            tree[top_level_category]['duration'] += duration_val
-            
-            current_node = tree[top_level_category]
-            for i in range(len(parts)): 
-                if i > 0 : 
-                    child_name = parts[i]
-                    if child_name not in current_node['children']:
-                         current_node['children'][child_name] = {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})}
-                    current_node['children'][child_name]['duration'] += duration_val
-                    current_node = current_node['children'][child_name]
-                elif len(parts) == 1 : 
-                    pass 
-
-        sorted_top_level = sorted(tree.items(), key=lambda x: x[1]['duration'], reverse=True)
-        for top_level, subtree_data in sorted_top_level:
-            percentage = (subtree_data['duration'] / total_duration * 100) if total_duration else 0
-            output.append(f"\n{top_level}: {time_format_duration(subtree_data['duration'])} ({percentage:.2f}%)")
-            output.extend(generate_sorted_output(subtree_data, avg_days=1, indent=1))
-    else:
-        output.append("No time records for this day.")
-
-    print('\n'.join(output))
-
-
-def query_period(conn, days_to_query):
-    """Queries and displays statistics for a recent period (last N days)."""
+    tree = build_project_tree(records, get_parent_map(conn)) if records else {}
+    return DayReport(date, True, status, remark, getup, total_duration, tree)
+
+@instrumentation.instrumented('query_period')
+def period_report(conn, days_to_query, end_date=None):
+    """
+    Queries the statistics for a recent period (last N days). Returns a PeriodReport.
+    end_date (YYYYMMDD) is the period's last day; it defaults to today.
+    """
     cursor = conn.cursor()
-    end_date_dt = datetime.now()
+    end_date_dt = datetime.strptime(end_date, "%Y%m%d") if end_date else datetime.now()
     start_date_dt = end_date_dt - timedelta(days=days_to_query - 1)
     
     end_date_str = end_date_dt.strftime("%Y%m%d")
     start_date_str = start_date_dt.strftime("%Y%m%d")
 
-    print(f"\n[Last {days_to_query} Days Statistics] ({start_date_str} - {end_date_str})")
-
     # Fetch all records for the period to calculate total duration first
     cursor.execute('SELECT project_path, duration FROM time_records WHERE date BETWEEN ? AND ?',
                    (start_date_str, end_date_str))
@@ -154,13 +284,6 @@ def query_period(conn, days_to_query):
         WHERE date BETWEEN ? AND ?
     ''', (start_date_str, end_date_str))
     actual_days_with_time_records = cursor.fetchone()[0] or 0
-    
-    overall_total_duration_seconds = sum(item[1] for item in records)
-    # Use actual_days_with_time_records for averaging, default to 1 to avoid division by zero
-    avg_days_for_calc = actual_days_with_time_records if actual_days_with_time_records > 0 else 1
-    
-    print(f"Overall Total Time: {time_format_duration(overall_total_duration_seconds, avg_days_for_calc)}")
-    print(f"Days with time records: {actual_days_with_time_records} day(s)")
 
     # Get status counts
     cursor.execute('''
@@ -174,61 +297,13 @@ def query_period(conn, days_to_query):
     true_count = status_data[0] if status_data and status_data[0] is not None else 0
     false_count = status_data[1] if status_data and status_data[1] is not None else 0
 
-    if actual_days_with_time_records > 0:
-        print("Status Distribution (for days with records):")
-        print(f"  True: {true_count} day(s) ({(true_count / actual_days_with_time_records * 100):.1f}%)")
-        print(f"  False: {false_count} day(s) ({(false_count / actual_days_with_time_records * 100):.1f}%)")
-    else:
-        recorded_status_days = true_count + false_count
-        if recorded_status_days > 0:
-            print("Status Distribution (overall days with status entries):")
-            print(f"  True: {true_count} day(s)")
-            print(f"  False: {false_count} day(s)")
-        else:
-            print("Status Distribution: No status information available for this period.")
-
-
-    if not records:
-        print("\nNo time records found for this period.")
-        return
-
-    # Build project tree
-    tree = defaultdict(lambda: {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})})
-    cursor.execute("SELECT child, parent FROM parent_child")
-    parent_map = {child: parent_val for child, parent_val in cursor.fetchall()}
+    tree = build_project_tree(records, get_parent_map(conn)) if records else {}
+    return PeriodReport(days_to_query, start_date_str, end_date_str, sum(item[1] for item in records),
+                        actual_days_with_time_records, true_count, false_count, tree)
 
-    for project_path, duration in records:
-        parts = project_path.split('_')
-        if not parts: continue
-
-        current_level_path = parts[0]
-        top_level_category = parent_map.get(current_level_path, current_level_path.upper())
-        
-        if top_level_category not in tree:
-            tree[top_level_category] = {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})}
-        tree[top_level_category]['duration'] += duration
-        
-        current_node = tree[top_level_category]
-        for i in range(len(parts)):
-            if i > 0 :
-                child_name = parts[i]
-                if child_name not in current_node['children']:
-                    current_node['children'][child_name] = {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})}
-                current_node['children'][child_name]['duration'] += duration
-                current_node = current_node['children'][child_name]
-            elif len(parts) == 1:
-                pass
-
-    sorted_top_level = sorted(tree.items(), key=lambda x: x[1]['duration'], reverse=True)
-
-    for top_level, subtree_data in sorted_top_level:
-        output_lines = [f"\n{top_level}: {time_format_duration(subtree_data['duration'], avg_days_for_calc)}"]
-        output_lines.extend(generate_sorted_output(subtree_data, avg_days=avg_days_for_calc, indent=1))
-        print('\n'.join(output_lines))
-
-
-def query_day_raw(conn, date):
-    """Outputs raw data for a specific day as it would appear in a text file."""
+@instrumentation.instrumented('query_day_raw')
+def day_raw_report(conn, date):
+    """Queries a specific day's stored data. Returns a DayRawReport."""
     cursor = conn.cursor()
     cursor.execute('''
         SELECT date, status, getup_time, remark
@@ -238,21 +313,10 @@ def query_day_raw(conn, date):
     day_data = cursor.fetchone()
 
     if not day_data:
-        print(f"No records found for date {date}")
-        return
+        return DayRawReport(date)
 
     db_date, status, getup, remark = day_data
-    
-    # Get total duration for the day
-    cursor.execute('SELECT SUM(duration) FROM time_records WHERE date = ?', (date,))
-    total_duration_result = cursor.fetchone()
-    total_duration_day = total_duration_result[0] if total_duration_result and total_duration_result[0] is not None else 0
-
-    output = [f"Date:{db_date}"]
-    output.append(f"Total Time:{time_format_duration(total_duration_day)}") # Added total time here
-    output.append(f"Status:{status}")
-    output.append(f"Getup:{getup}")
-    output.append(f"Remark:{remark if remark and remark.strip() else ''}")
+    total_duration_day = _sum_day_duration(cursor, date)
 
     cursor.execute('''
         SELECT start, end, project_path
@@ -260,35 +324,21 @@ def query_day_raw(conn, date):
         WHERE date = ?
         ORDER BY start
     ''', (date,))
-    records = cursor.fetchall()
+    return DayRawReport(db_date, True, status, getup, remark, total_duration_day, cursor.fetchall())
 
-    for start, end, project in records:
-        output.append(f"{start}~{end} {project}") 
-
-    print('\n'.join(output))
-
-
-def query_month_summary(conn, year_month):
-    """Queries and displays statistics for a specific month."""
-    cursor = conn.cursor()
+@instrumentation.instrumented('query_month_summary')
+def month_report(conn, year_month):
+    """
+    Queries the statistics for a specific month. Returns a MonthReport.
 
+    Raises:
+        ValueError: If year_month is not YYYYMM.
+    """
     if not re.match(r'^\d{6}$', year_month):
-        print("Invalid month format. Please use YYYYMM.")
-        return
-
-    year = int(year_month[:4])
-    month = int(year_month[4:6])
-    
-    try:
-        # num_days_in_month = calendar.monthrange(year, month)[1] # Not directly used for avg calc anymore
-        pass
-    except calendar.IllegalMonthError:
-        print(f"Invalid month: {month}")
-        return
-        
-    date_prefix = f"{year}{month:02d}%" # For LIKE query
+        raise ValueError("Invalid month format. Please use YYYYMM.")
+    cursor = conn.cursor()
+    date_prefix = f"{year_month}%" # For LIKE query
 
-    # Fetch all records for the month to calculate total duration first
     cursor.execute('''
         SELECT project_path, SUM(duration) as total_duration_for_project
         FROM time_records
@@ -304,86 +354,128 @@ def query_month_summary(conn, year_month):
         WHERE date LIKE ?
     ''', (date_prefix,))
     actual_days_with_time_records = cursor.fetchone()[0] or 0
-    
-    avg_days_for_calc = actual_days_with_time_records if actual_days_with_time_records > 0 else 1
-    
-    # Calculate overall total duration for the month from the grouped records
-    month_total_duration_seconds = sum(item[1] for item in records_grouped)
 
-    output = [f"\n[{year_month} Monthly Statistics ({actual_days_with_time_records} day(s) with records)]"]
-    output.append(f"Overall Total Time: {time_format_duration(month_total_duration_seconds, avg_days_for_calc)}")
+    # records_grouped holds one (project_path, SUM(duration)) row per project for the month,
+    # which builds the same tree as the individual records would.
+    tree = build_project_tree(records_grouped, get_parent_map(conn)) if records_grouped else {}
+    return MonthReport(year_month, sum(item[1] for item in records_grouped), actual_days_with_time_records, tree)
+
 
+# --- Text Output ---
+def _iter_tree_sections(tree, avg_days, total_for_percentage=None):
+    """Yields one block per top-level category, largest first, with its sorted sub-tree."""
+    for top_level, subtree_data in sorted(tree.items(), key=lambda x: x[1]['duration'], reverse=True):
+        if total_for_percentage is None:
+            header = f"\n{top_level}: {time_format_duration(subtree_data['duration'], avg_days)}"
+        else:
+            percentage = (subtree_data['duration'] / total_for_percentage * 100) if total_for_percentage else 0
+            header = f"\n{top_level}: {time_format_duration(subtree_data['duration'])} ({percentage:.2f}%)"
+        yield '\n'.join([header] + generate_sorted_output(subtree_data, avg_days=avg_days, indent=1))
 
-    if not records_grouped: # Check if any records were found
-        print('\n'.join(output)) # Print header and total time (which will be 0m)
-        print(f"No records found for {year_month}.")
+def _iter_day_lines(report):
+    if not report.found:
+        yield f"\n[{report.date}]\nNo records found for this date."
         return
+    yield f"\nDate: {report.date}"
+    yield f"Total Time: {time_format_duration(report.total_duration)} ({report.total_duration // 60} minutes)" # Total for the day
+    yield f"Status: {report.status}"
+    yield f"Getup: {report.getup}"
+    if report.remark and report.remark.strip():
+        yield f"Remark: {report.remark}"
+    if report.tree:
+        yield from _iter_tree_sections(report.tree, 1, total_for_percentage=report.total_duration)
+    else:
+        yield "No time records for this day."
+
+def _iter_period_lines(report):
+    yield f"\n[Last {report.days_to_query} Days Statistics] ({report.start_date} - {report.end_date})"
+    yield f"Overall Total Time: {time_format_duration(report.total_duration, report.average_days)}"
+    yield f"Days with time records: {report.days_with_records} day(s)"
+    if report.days_with_records > 0:
+        yield "Status Distribution (for days with records):"
+        yield f"  True: {report.true_days} day(s) ({(report.true_days / report.days_with_records * 100):.1f}%)"
+        yield f"  False: {report.false_days} day(s) ({(report.false_days / report.days_with_records * 100):.1f}%)"
+    elif report.true_days + report.false_days > 0:
+        yield "Status Distribution (overall days with status entries):"
+        yield f"  True: {report.true_days} day(s)"
+        yield f"  False: {report.false_days} day(s)"
+    else:
+        yield "Status Distribution: No status information available for this period."
+    if not report.tree:
+        yield "\nNo time records found for this period."
+        return
+    yield from _iter_tree_sections(report.tree, report.average_days)
 
-    # Build project tree
-    tree = defaultdict(lambda: {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})})
-    cursor.execute("SELECT child, parent FROM parent_child")
-    parent_map = {child: parent_val for child, parent_val in cursor.fetchall()}
-
-    # Re-fetch individual records for tree building if needed, or use records_grouped if structure is appropriate
-    # The current tree building logic expects (project_path, duration) for each entry,
-    # not (project_path, sum_duration_for_project).
-    # So we need to fetch the individual records again, or adapt the tree building.
-    # For simplicity and consistency with other functions, let's use the full records for tree building logic.
-    # However, the prompt's original code already iterated `records` which was `GROUP BY project_path`.
-    # This implies the tree building logic was intended to work with summed durations per project_path for the month.
-    # Let's stick to the original logic for tree building using the grouped records.
-
-    for project_path, duration in records_grouped: # project_path here is unique for the month
-        parts = project_path.split('_')
-        if not parts: continue
-
-        current_level_path = parts[0]
-        top_level_category = parent_map.get(current_level_path, current_level_path.upper())
-
-        if top_level_category not in tree:
-            tree[top_level_category] = {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})}
-        
-        # Since duration is already SUM(duration) for this project_path for the entire month,
-        # we add it to the top-level and potentially to one child if path is compound.
-        # The original logic seems to sum durations again, which might be incorrect if `records`
-        # already contains summed durations.
-        # Correct approach for monthly summary based on `GROUP BY project_path`:
-        
-        # Add total duration for this project_path to the top-level category
-        tree[top_level_category]['duration'] += duration 
-        
-        current_node = tree[top_level_category]
-        # If project_path is compound (e.g., study_ml), add this duration to the sub-category as well.
-        # The duration is for the *entire* project_path, not just the part.
-        
-        # The original loop structure for parts was designed for individual time entries.
-        # For monthly summary with pre-grouped project_paths, the logic needs adjustment
-        # if we want to build a fine-grained tree from individual records.
-        # However, the current structure of query_month_summary's tree building iterates through `parts`
-        # as if building a hierarchy from a single `project_path` string that represents the entire month's
-        # activity for that specific path. This means if `project_path` is `study_ml`, `study` gets the duration,
-        # and then `ml` (as a child of `study`) also gets that same duration. This is how it was.
-        # To make it more accurate for a summary view:
-        # The duration for 'study_ml' should contribute to 'study' (top-level) and then 'ml' (child).
-        # The current code correctly adds to `tree[top_level_category]['duration']`.
-        # Then, for sub-parts:
-        
-        temp_node_for_path_traversal = tree[top_level_category]
-        if len(parts) > 1: # Only if there are sub-parts like 'study_ml'
-            for i in range(1, len(parts)): # Start from the first sub-part
-                child_name = parts[i]
-                if child_name not in temp_node_for_path_traversal['children']:
-                    temp_node_for_path_traversal['children'][child_name] = {'duration': 0, 'children': defaultdict(lambda: {'duration': 0, 'children': defaultdict(dict)})}
-                # The duration here is the total for project_path for the month
-                temp_node_for_path_traversal['children'][child_name]['duration'] += duration 
-                temp_node_for_path_traversal = temp_node_for_path_traversal['children'][child_name]
-
-
-    sorted_top_level = sorted(tree.items(), key=lambda x: x[1]['duration'], reverse=True)
-    for top_level, subtree_data in sorted_top_level:
-        output_lines_detail = [f"\n{top_level}: {time_format_duration(subtree_data['duration'], avg_days_for_calc)}"]
-        # Pass the correct subtree_data to generate_sorted_output
-        output_lines_detail.extend(generate_sorted_output(subtree_data, avg_days=avg_days_for_calc, indent=1))
-        output.append('\n'.join(output_lines_detail)) # Append to the main output list
-    
-    print('\n'.join(output))
\ No newline at end of file
+def _iter_day_raw_lines(report):
+    if not report.found:
+        yield f"No records found for date {report.date}"
+        return
+    yield f"Date:{report.date}"
+    yield f"Total Time:{time_format_duration(report.total_duration)}"
+    yield f"Status:{report.status}"
+    yield f"Getup:{report.getup}"
+    yield f"Remark:{report.remark if report.remark and report.remark.strip() else ''}"
+    for start, end, project in report.records:
+        yield f"{start}~{end} {project}"
+
+def _iter_month_lines(report):
+    yield f"\n[{report.year_month} Monthly Statistics ({report.days_with_records} day(s) with records)]"
+    yield f"Overall Total Time: {time_format_duration(report.total_duration, report.average_days)}"
+    if not report.tree:
+        yield f"No records found for {report.year_month}."
+        return
+    yield from _iter_tree_sections(report.tree, report.average_days)
+
+_TEXT_LINE_ITERATORS = {
+    DayReport: _iter_day_lines,
+    PeriodReport: _iter_period_lines,
+    DayRawReport: _iter_day_raw_lines,
+    MonthReport: _iter_month_lines,
+}
+
+def iter_report_lines(report):
+    """
+    Streams a report object as the text the query_* functions print, one chunk at a time
+    (a chunk may span several lines; joining the chunks with newlines gives the full text).
+    """
+    return _TEXT_LINE_ITERATORS[type(report)](report)
+
+
+# --- Printing Wrappers ---
+def query_day_text(conn, date):
+    """Builds the statistics report text for a specific day."""
+    return '\n'.join(iter_report_lines(day_report(conn, date)))
+
+def query_day(conn, date):
+    """Queries and displays statistics for a specific day."""
+    print(query_day_text(conn, date))
+
+
+def query_period_text(conn, days_to_query, end_date=None):
+    """Builds the statistics report text for a recent period (last N days, up to end_date or today)."""
+    return '\n'.join(iter_report_lines(period_report(conn, days_to_query, end_date)))
+
+def query_period(conn, days_to_query, end_date=None):
+    """Queries and displays statistics for a recent period (last N days, up to end_date or today)."""
+    print(query_period_text(conn, days_to_query, end_date))
+
+
+def query_day_raw_text(conn, date):
+    """Builds the raw data of a specific day as it would appear in a text file."""
+    return '\n'.join(iter_report_lines(day_raw_report(conn, date)))
+
+def query_day_raw(conn, date):
+    """Outputs raw data for a specific day as it would appear in a text file."""
+    print(query_day_raw_text(conn, date))
+
+
+def query_month_summary_text(conn, year_month):
+    """Builds the statistics report text for a specific month."""
+    try:
+        return '\n'.join(iter_report_lines(month_report(conn, year_month)))
+    except ValueError as e:
+        return str(e)
+
+def query_month_summary(conn, year_month):
+    """Queries and displays statistics for a specific month."""
+    print(query_month_summary_text(conn, year_month))
@@ -0,0 +1,128 @@
+# directory_watcher.py
+import os
+import time
+import argparse
+import instrumentation
+import database_importer as di
+import ingest_pipeline as ip
+import snapshot
+
+DEFAULT_POLL_INTERVAL = 2.0 # Seconds between directory scans
+
+
+class DirectoryWatcher:
+    """
+    Polls a directory for changed .txt files and imports only the days that changed.
+
+    Every tick walks the directory with os.scandir and compares each file's
+    (mtime, size) with the previous tick. Changed files are validated and parsed
+    in one pass by the ingest pipeline; their accepted days are compared with the
+    days imported from that file last time, and only new or edited days are
+    written to the database. Days that become invalid while a file is being
+    edited are skipped, so the last good version stays in the database.
+    on_import, if given, is called with the number of days after every tick that
+    wrote some (e.g. InMemoryDatabase.after_write).
+    """
+    def __init__(self, conn, directory, pipeline, interval=DEFAULT_POLL_INTERVAL, on_import=None):
+        self.conn = conn
+        self.directory = directory
+        self.pipeline = pipeline
+        self.interval = interval
+        self.on_import = on_import
+        self.file_stats = {} # path -> (mtime_ns, size) seen on the last tick
+        self.imported_days = {} # path -> {date: parsed day object} last imported from that file
+
+    def _scan(self):
+        """Returns {path: (mtime_ns, size)} for every .txt file under the directory."""
+        stats = {}
+        pending_dirs = [self.directory]
+        while pending_dirs:
+            try:
+                with os.scandir(pending_dirs.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append(entry.path)
+                        elif entry.name.lower().endswith('.txt') and entry.is_file():
+                            try:
+                                stat = entry.stat()
+                            except OSError:
+                                continue # File vanished between listing and stat
+                            stats[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError as e:
+                print(f"Warning: could not scan directory: {e}")
+        return stats
+
+    def tick(self):
+        """
+        Runs one scan and imports changed days.
+
+        Returns:
+            int: The number of days written to the database.
+        """
+        current_stats = self._scan()
+        changed_files = sorted(path for path, stat in current_stats.items() if self.file_stats.get(path) != stat)
+        for path in self.file_stats.keys() - current_stats.keys():
+            self.imported_days.pop(path, None) # Deleted files: forget them, leave their data in the database
+        self.file_stats = current_stats
+
+        imported_count = 0
+        for path in changed_files:
+            result = self.pipeline.ingest_file(path)
+            if result.read_failed:
+                self.file_stats.pop(path, None) # Retry on the next tick
+                continue
+
+            previous_days = self.imported_days.setdefault(path, {})
+            changed_days = [day for day in result.parsed_data if previous_days.get(day['date']) != day]
+            if changed_days:
+                di.replace_days_in_db(self.conn, changed_days)
+                for day in changed_days:
+                    previous_days[day['date']] = day
+                imported_count += len(changed_days)
+                print(f"{time.strftime('%H:%M:%S')} {path}: imported {len(changed_days)} changed day(s): "
+                      f"{', '.join(day['date'] for day in changed_days)}")
+            if result.rejected:
+                print(f"{time.strftime('%H:%M:%S')} {path}: skipped {len(result.rejected)} day(s) with errors")
+        if imported_count:
+            snapshot.refresh_stale() # Once per tick, however many files changed
+        if imported_count and self.on_import:
+            self.on_import(imported_count)
+        return imported_count
+
+    def run(self, max_ticks=None):
+        """
+        Polls until interrupted (Ctrl+C) or until max_ticks scans have run.
+        """
+        print(f"Watching {self.directory} every {self.interval}s. Press Ctrl+C to stop.")
+        ticks = 0
+        try:
+            while max_ticks is None or ticks < max_ticks:
+                started = time.monotonic()
+                self.tick()
+                ticks += 1
+                if max_ticks is None or ticks < max_ticks:
+                    time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a directory and import changed days as files are edited.")
+    parser.add_argument("directory", help="Directory containing the .txt data files.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help=f"Seconds between scans (default: {DEFAULT_POLL_INTERVAL}).")
+    parser.add_argument("--policy", choices=ip.INGEST_POLICIES, default='reject', help="How to handle days with errors (default: reject).")
+    parser.add_argument("--quarantine-dir", default=ip.DEFAULT_QUARANTINE_DIR, help=f"Where the quarantine policy writes rejected days (default: {ip.DEFAULT_QUARANTINE_DIR}).")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    instrumentation.enable_from_environment()
+    pipeline = ip.IngestPipeline(policy=args.policy, quarantine_dir=args.quarantine_dir)
+    conn = di.init_db()
+    try:
+        DirectoryWatcher(conn, os.path.normpath(args.directory), pipeline, interval=args.interval).run()
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
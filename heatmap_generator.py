@@ -1,4 +1,14 @@
+import base64
+import bisect
+import gzip
+import json
+import os
+import statistics
 from datetime import datetime, timedelta
+from itertools import groupby
+
+import database_querier as dq
+import instrumentation
 
 # --- Color & Style Constants ---
 GITHUB_GREEN_LIGHT = ['#ebedf0', '#9be9a8', '#40c463', '#30a14e', '#216e39']
@@ -15,6 +25,95 @@ DEFAULT_COLOR_PALETTE = GITHUB_GREEN_LIGHT
 GOLD = "#fbff24"
 ORANGE = "#f97148"
 
+# Upper bounds (in hours) of the non-zero color buckets in 'fixed' mode.
+# Anything at or above the last bound is drawn in ORANGE.
+FIXED_THRESHOLD_HOURS = (4, 8, 10, 12)
+THRESHOLD_MODES = ('fixed', 'quantile')
+DRILLDOWN_MODES = ('embedded', 'sidecar')
+
+# Client-side code for the drill-down panel. Month chunks are only decoded
+# (embedded mode) or fetched (sidecar mode) the first time one of their days is clicked.
+DRILLDOWN_SCRIPT_TEMPLATE = r"""
+    <script>
+    (function() {
+        const MODE = "__MODE__";
+        const SIDECAR_DIR = "__SIDECAR_DIR__";
+        const monthCache = {};
+        const pendingSidecars = {};
+
+        window.registerDrilldownMonth = function(month, data) {
+            if (pendingSidecars[month]) {
+                pendingSidecars[month](data);
+                delete pendingSidecars[month];
+            }
+        };
+
+        async function decodeEmbeddedMonth(month) {
+            const el = document.getElementById('drilldown-' + month);
+            if (!el) return {};
+            const bytes = Uint8Array.from(atob(el.textContent.trim()), c => c.charCodeAt(0));
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+            return await new Response(stream).json();
+        }
+
+        function loadSidecarMonth(month) {
+            return new Promise(resolve => {
+                pendingSidecars[month] = resolve;
+                const script = document.createElement('script');
+                script.src = SIDECAR_DIR + '/' + month + '.js';
+                script.onerror = () => resolve({});
+                document.head.appendChild(script);
+            });
+        }
+
+        function loadMonth(month) {
+            if (!monthCache[month]) {
+                monthCache[month] = MODE === 'sidecar' ? loadSidecarMonth(month) : decodeEmbeddedMonth(month);
+            }
+            return monthCache[month];
+        }
+
+        function formatDuration(seconds) {
+            const hours = Math.floor(seconds / 3600);
+            const minutes = Math.floor((seconds % 3600) / 60);
+            return hours > 0 ? hours + 'h' + String(minutes).padStart(2, '0') + 'm' : minutes + 'm';
+        }
+
+        function renderNodes(nodes, indent, lines) {
+            for (const [name, duration, children] of nodes) {
+                lines.push('  '.repeat(indent) + '- ' + name + ': ' + formatDuration(duration));
+                renderNodes(children, indent + 1, lines);
+            }
+        }
+
+        function renderDay(date, day) {
+            if (!day) return '[' + date + ']\nNo records found for this date.';
+            const lines = ['Date: ' + date,
+                           'Total Time: ' + formatDuration(day.total) + ' (' + Math.floor(day.total / 60) + ' minutes)',
+                           'Status: ' + day.status,
+                           'Getup: ' + day.getup];
+            if (day.remark) lines.push('Remark: ' + day.remark);
+            if (!day.projects.length) lines.push('No time records for this day.');
+            for (const [name, duration, children] of day.projects) {
+                const percentage = day.total ? (duration / day.total * 100).toFixed(2) : '0.00';
+                lines.push('', name + ': ' + formatDuration(duration) + ' (' + percentage + '%)');
+                renderNodes(children, 1, lines);
+            }
+            return lines.join('\n');
+        }
+
+        const panel = document.getElementById('drilldown-panel');
+        document.querySelector('.heatmap-container svg').addEventListener('click', async event => {
+            const date = event.target.getAttribute('data-date');
+            if (!date) return;
+            panel.textContent = 'Loading ' + date + '...';
+            const monthData = await loadMonth(date.slice(0, 6));
+            panel.textContent = renderDay(date, monthData[date]);
+        });
+    })();
+    </script>
+"""
+
 
 class HeatmapDataFetcher:
     """
@@ -29,6 +128,7 @@ class HeatmapDataFetcher:
         """
         self.conn = conn
 
+    @instrumentation.instrumented()
     def fetch_yearly_study_times(self, year):
         """
         Fetches daily total study times for a given year from the database.
@@ -51,13 +151,55 @@ class HeatmapDataFetcher:
         ''', (start_date_str, end_date_str))
         return dict(cursor.fetchall())
 
+    @instrumentation.instrumented()
+    def fetch_yearly_day_breakdowns(self, year):
+        """
+        Fetches the per-day project breakdown that query_day displays, for every day of a year.
+
+        Args:
+            year (int): The year to fetch data for.
+
+        Returns:
+            dict: A dictionary mapping date strings ('YYYYMMDD') to
+                  {'status', 'getup', 'remark', 'total', 'tree'}, where 'tree' is the
+                  output of database_querier.build_project_tree for that day.
+        """
+        cursor = self.conn.cursor()
+        start_date_str = f"{year}0101"
+        end_date_str = f"{year}1231"
+        parent_map = dq.get_parent_map(self.conn)
+
+        cursor.execute('''
+            SELECT date, status, remark, getup_time
+            FROM days
+            WHERE date BETWEEN ? AND ?
+        ''', (start_date_str, end_date_str))
+        breakdowns = {
+            date: {'status': status, 'getup': getup, 'remark': remark or '', 'total': 0, 'tree': {}}
+            for date, status, remark, getup in cursor.fetchall()
+        }
+
+        cursor.execute('''
+            SELECT date, project_path, duration
+            FROM time_records
+            WHERE date BETWEEN ? AND ?
+            ORDER BY date
+        ''', (start_date_str, end_date_str))
+        for date, rows in groupby(cursor, key=lambda row: row[0]):
+            records = [(project_path, duration) for _, project_path, duration in rows]
+            day = breakdowns.setdefault(date, {'status': 'False', 'getup': '00:00', 'remark': '', 'total': 0, 'tree': {}})
+            day['total'] = sum(duration for _, duration in records)
+            day['tree'] = dq.build_project_tree(records, parent_map)
+        return breakdowns
+
 
 class HeatmapGenerator:
     """
     Generates an HTML/SVG study heatmap for a given year from pre-fetched data.
     """
 
-    def __init__(self, year, study_data):
+    def __init__(self, year, study_data, threshold_mode='fixed', color_palette=None,
+                 drilldown_data=None, drilldown_mode='embedded'):
         """
         Initializes the HeatmapGenerator.
 
@@ -65,11 +207,31 @@ class HeatmapGenerator:
             year (int): The year for which to generate the heatmap.
             study_data (dict): A dictionary of study times, mapping date strings 
                                to duration in seconds.
+            threshold_mode (str): 'fixed' uses the 4/8/10/12-hour cut-offs,
+                                  'quantile' places the bucket edges at quantiles
+                                  of the non-zero values in study_data.
+            color_palette (list): Colors from empty to most active, e.g. one of
+                                  the palettes in heatmap_colors_config.py.
+            drilldown_data (dict): Optional per-day breakdowns from
+                                   HeatmapDataFetcher.fetch_yearly_day_breakdowns.
+                                   When given, clicking a cell shows that day's project tree.
+            drilldown_mode (str): 'embedded' stores one gzip-compressed JSON chunk per month
+                                  inside the HTML, 'sidecar' writes them as separate
+                                  <output>_days/YYYYMM.js files next to it.
         """
+        if threshold_mode not in THRESHOLD_MODES:
+            raise ValueError(f"Unknown threshold mode '{threshold_mode}'. Expected one of {THRESHOLD_MODES}.")
+        if drilldown_mode not in DRILLDOWN_MODES:
+            raise ValueError(f"Unknown drill-down mode '{drilldown_mode}'. Expected one of {DRILLDOWN_MODES}.")
         self.year = year
         self.study_times = study_data  # Data is now passed in
+        self.threshold_mode = threshold_mode
+        self.color_palette = color_palette or DEFAULT_COLOR_PALETTE
+        self.drilldown_data = drilldown_data
+        self.drilldown_mode = drilldown_mode
         self.heatmap_data = []
         self.svg_params = {}
+        self.thresholds, self.bucket_colors = self._compute_color_thresholds()
 
     @staticmethod
     def _time_format_duration(seconds, avg_days=1):
@@ -92,23 +254,37 @@ class HeatmapGenerator:
         else:
             return time_str
 
+    def _compute_color_thresholds(self):
+        """
+        Computes the bucket edges (in seconds) and the color of each bucket.
+
+        Returns:
+            tuple: (thresholds, bucket_colors), where bucket_colors has one more
+                   entry than thresholds. A non-zero duration d falls into
+                   bucket_colors[bisect_right(thresholds, d)].
+        """
+        if self.threshold_mode == 'fixed':
+            thresholds = [hours * 3600 for hours in FIXED_THRESHOLD_HOURS]
+            bucket_colors = list(self.color_palette[1:len(thresholds) + 1]) + [ORANGE]
+            return thresholds, bucket_colors
+
+        bucket_colors = list(self.color_palette[1:])
+        non_zero_values = [seconds for seconds in self.study_times.values() if seconds]
+        if len(bucket_colors) < 2 or len(non_zero_values) < 2:
+            # Not enough data (or colors) to split, every active day gets the darkest color.
+            return [], bucket_colors[-1:]
+
+        # One sort over the whole range yields every cut point at once.
+        thresholds = statistics.quantiles(non_zero_values, n=len(bucket_colors), method='inclusive')
+        return thresholds, bucket_colors
+
     def _get_color_for_study_time(self, study_time_seconds):
         """
         Determines the heatmap cell color based on study duration.
         """
-        hours = study_time_seconds / 3600
-        if hours == 0:
-            return DEFAULT_COLOR_PALETTE[0]
-        elif hours < 4:
-            return DEFAULT_COLOR_PALETTE[1]
-        elif hours < 8:
-            return DEFAULT_COLOR_PALETTE[2]
-        elif hours < 10:
-            return DEFAULT_COLOR_PALETTE[3]
-        elif hours < 12:
-            return DEFAULT_COLOR_PALETTE[4]
-        else:
-            return ORANGE
+        if not study_time_seconds:
+            return self.color_palette[0]
+        return self.bucket_colors[bisect.bisect_right(self.thresholds, study_time_seconds)]
 
     def _prepare_heatmap_layout_data(self):
         """
@@ -234,11 +410,83 @@ class HeatmapGenerator:
             if date_obj is not None:
                 duration_str = self._time_format_duration(study_time_seconds)
                 title_text = f"{date_obj.strftime('%Y-%m-%d')}: {duration_str}"
-                svg_elements.append(f'  <rect width="{self.svg_params["cell_size"]}" height="{self.svg_params["cell_size"]}" x="{x_pos}" y="{y_pos}" fill="{color}" rx="2" ry="2">')
+                date_attr = f' data-date="{date_obj.strftime("%Y%m%d")}"' if self.drilldown_data is not None else ''
+                svg_elements.append(f'  <rect width="{self.svg_params["cell_size"]}" height="{self.svg_params["cell_size"]}" x="{x_pos}" y="{y_pos}" fill="{color}" rx="2" ry="2"{date_attr}>')
                 svg_elements.append(f'    <title>{title_text}</title>')
                 svg_elements.append(f'  </rect>')
         return svg_elements
 
+    @staticmethod
+    def _serialize_tree_nodes(children):
+        """
+        Converts build_project_tree nodes into compact, duration-sorted
+        [name, duration, children] lists, skipping the nodes query_day would not print.
+        """
+        sorted_children = sorted(children.items(), key=lambda x: x[1]['duration'], reverse=True)
+        return [
+            [name, node['duration'], HeatmapGenerator._serialize_tree_nodes(node['children'])]
+            for name, node in sorted_children
+            if node['duration'] > 0 or node['children']
+        ]
+
+    def _build_drilldown_month_chunks(self):
+        """
+        Groups the drill-down data into per-month JSON strings.
+
+        Returns:
+            dict: Maps 'YYYYMM' to the JSON text of that month's days.
+        """
+        month_days = {}
+        for date_str in sorted(self.drilldown_data):
+            day = self.drilldown_data[date_str]
+            month_days.setdefault(date_str[:6], {})[date_str] = {
+                'status': day['status'],
+                'getup': day['getup'],
+                'remark': day['remark'],
+                'total': day['total'],
+                'projects': self._serialize_tree_nodes(day['tree']),
+            }
+        return {
+            month: json.dumps(days, ensure_ascii=False, separators=(',', ':'))
+            for month, days in month_days.items()
+        }
+
+    def _generate_drilldown_html(self, output_filename):
+        """
+        Builds the drill-down panel, data chunks and script.
+        In sidecar mode the month chunks are written next to output_filename.
+
+        Returns:
+            str: HTML to place after the heatmap, or '' when drill-down is disabled.
+        """
+        if self.drilldown_data is None:
+            return ''
+
+        month_chunks = self._build_drilldown_month_chunks()
+        sidecar_dir_name = ''
+        html_parts = ['<pre id="drilldown-panel">Click a day to see its breakdown.</pre>']
+
+        if self.drilldown_mode == 'sidecar':
+            sidecar_dir = os.path.splitext(output_filename)[0] + '_days'
+            sidecar_dir_name = os.path.basename(sidecar_dir)
+            os.makedirs(sidecar_dir, exist_ok=True)
+            for month, chunk_json in month_chunks.items():
+                with open(os.path.join(sidecar_dir, f"{month}.js"), 'w', encoding='utf-8') as f:
+                    f.write(f'registerDrilldownMonth("{month}", {chunk_json});\n')
+        else:
+            for month, chunk_json in month_chunks.items():
+                compressed = gzip.compress(chunk_json.encode('utf-8'), mtime=0)
+                encoded = base64.b64encode(compressed).decode('ascii')
+                html_parts.append(f'<script type="application/octet-stream" id="drilldown-{month}">{encoded}</script>')
+
+        html_parts.append(
+            DRILLDOWN_SCRIPT_TEMPLATE
+            .replace('__MODE__', self.drilldown_mode)
+            .replace('__SIDECAR_DIR__', sidecar_dir_name)
+        )
+        return '\n'.join(html_parts)
+
+    @instrumentation.instrumented()
     def generate_html_output(self, output_filename):
         """
         Orchestrates the generation of the full SVG, embeds it in HTML, and writes to a file.
@@ -253,6 +501,7 @@ class HeatmapGenerator:
         svg_components.append('</svg>')
 
         full_svg_content = '\n'.join(svg_components)
+        drilldown_html = self._generate_drilldown_html(output_filename)
 
         html_content = f"""
     <!DOCTYPE html>
@@ -270,15 +519,20 @@ class HeatmapGenerator:
                 background-color: #ffffff;
             }}
              h2 {{ margin-left: {self.svg_params.get('margin_left', 35)}px; font-weight: 400; color: #24292f;}}
+             rect[data-date] {{ cursor: pointer; }}
+             #drilldown-panel {{ margin-left: {self.svg_params.get('margin_left', 35)}px; font-size: 13px; color: #24292f; }}
         </style>
     </head>
     <body>
         <div class="heatmap-container">
         <h2>Study Activity for {self.year}</h2>
         {full_svg_content}
+        {drilldown_html}
         </div>
     </body>
     </html>
     """
         with open(output_filename, 'w', encoding='utf-8') as f:
             f.write(html_content)
+        instrumentation.add_count('cells_rendered', len(self.heatmap_data))
+        instrumentation.add_count('html_chars_written', len(html_content))
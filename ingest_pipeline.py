@@ -0,0 +1,234 @@
+# ingest_pipeline.py
+import os
+import argparse
+import instrumentation
+from tools.format_validator import (CONFIG_FILE_PATH, ConfigManager, LineValidator,
+                                    StreamingFileValidator, sort_and_deduplicate_diagnostics)
+import database_importer as di
+import snapshot
+
+INGEST_POLICIES = ('reject', 'quarantine', 'strict')
+DEFAULT_QUARANTINE_DIR = 'quarantine'
+
+
+def day_block_to_parsed_day(block):
+    """
+    Converts a validated DayBlock into the day object shape produced by FileDataParser.
+
+    Args:
+        block (DayBlock): A structurally complete Date block from the validator.
+
+    Returns:
+        dict: {'date', 'day_info': {'status', 'remark', 'getup_time'}, 'time_records': [...]}
+    """
+    return {
+        'date': block.date,
+        'day_info': {
+            'status': block.status if block.status is not None else 'False',
+            'remark': block.remark if block.remark is not None else '',
+            'getup_time': block.getup if block.getup is not None else '00:00',
+        },
+        'time_records': [(start, end, label.lower().replace('stduy', 'study'), duration)
+                         for start, end, label, duration in block.time_records],
+    }
+
+
+class IngestResult:
+    """
+    Outcome of ingesting one file. Also serves as the block listener of the
+    validator's state machine, so days are collected while the file is read.
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.parsed_data = [] # Accepted days, in FileDataParser's shape
+        self.rejected = [] # {'date', 'lines', 'diagnostics'} for every day that was not accepted
+        self.diagnostics = [] # All diagnostics of the file, sorted by line
+        self.quarantine_path = None
+        self.read_failed = False
+        self._accepted_blocks = []
+
+    def on_day(self, block):
+        """Called by StreamingFileValidator for every structurally complete Date block."""
+        if block.has_errors:
+            self.rejected.append({'date': block.date, 'lines': block.raw_lines, 'diagnostics': block.diagnostics})
+        else:
+            self._accepted_blocks.append(block)
+
+    def on_malformed(self, raw_lines, diagnostics):
+        """Called for content that never formed a complete Date block (date is unknown or invalid)."""
+        self.rejected.append({'date': None, 'lines': raw_lines, 'diagnostics': diagnostics})
+
+    @property
+    def has_errors(self):
+        return any(d.severity == 'error' for d in self.diagnostics)
+
+
+class IngestPipeline:
+    """
+    Validates and parses time-tracking files in a single pass.
+
+    Each line is read once: the validator's state machine checks it and, at the
+    end of every Date block, hands over the block's already tokenized fields,
+    which become a parsed day object. Days with errors are handled by the policy:
+
+        reject      drop bad days, import the rest
+        quarantine  like reject, and write bad days' raw lines to the quarantine dir
+        strict      import nothing from a file that has any error
+    """
+    def __init__(self, config_file_path=CONFIG_FILE_PATH, policy='reject', quarantine_dir=DEFAULT_QUARANTINE_DIR):
+        if policy not in INGEST_POLICIES:
+            raise ValueError(f"Unknown ingest policy '{policy}'. Expected one of: {', '.join(INGEST_POLICIES)}")
+        self.policy = policy
+        self.quarantine_dir = quarantine_dir
+        config_manager = ConfigManager(config_file_path)
+        if not config_manager.load():
+            print("Warning: validator config could not be loaded; label rules will not be applied.")
+        self.line_validator = LineValidator(config_manager)
+
+    def ingest_file(self, filepath):
+        """
+        Validates and parses one file.
+
+        Returns:
+            IngestResult: Accepted days in result.parsed_data, everything else in result.rejected.
+        """
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return self.ingest_lines(f, filepath)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error: could not read {filepath}: {e}")
+            result = IngestResult(filepath)
+            result.read_failed = True
+            return result
+
+    def ingest_lines(self, lines, source_name):
+        """
+        Validates and parses Duration-format text lines from any iterable (an open file,
+        or a generator such as LogProcessor.iter_output_lines), without touching the disk.
+
+        Args:
+            lines (iterable): Text lines, with or without trailing newlines.
+            source_name (str): Name used for diagnostics and the quarantine file.
+
+        Returns:
+            IngestResult: Accepted days in result.parsed_data, everything else in result.rejected.
+        """
+        result = IngestResult(source_name)
+        errors = []
+        state_machine = StreamingFileValidator(self.line_validator, errors, block_listener=result)
+        with instrumentation.span('validate_lines', source=os.path.basename(source_name)) as span:
+            line_num = 0
+            for line_num, line in enumerate(lines, 1):
+                state_machine.feed(line_num, line.strip())
+            state_machine.finish()
+            span.count('lines_validated', line_num)
+
+        for error in errors:
+            error.file = source_name
+        result.diagnostics = sort_and_deduplicate_diagnostics(errors)
+
+        if self.policy == 'strict' and result.has_errors:
+            for block in result._accepted_blocks:
+                result.rejected.append({'date': block.date, 'lines': block.raw_lines, 'diagnostics': block.diagnostics})
+        else:
+            result.parsed_data = [day_block_to_parsed_day(block) for block in result._accepted_blocks]
+        result._accepted_blocks = []
+        result.rejected.sort(key=lambda r: r['lines'][0][0])
+
+        if self.policy == 'quarantine':
+            try:
+                self._write_quarantine(result)
+            except OSError as e:
+                print(f"Warning: could not write quarantine file for {source_name}: {e}")
+        return result
+
+    def _write_quarantine(self, result):
+        """
+        Writes rejected days' raw lines to <quarantine_dir>/<stem>.quarantine.txt (so they can be
+        fixed and re-ingested) and their diagnostics to <stem>.quarantine.log. A stale quarantine
+        file from an earlier run is removed when the file is now clean.
+        """
+        stem = os.path.splitext(os.path.basename(result.filepath))[0]
+        quarantine_path = os.path.join(self.quarantine_dir, f"{stem}.quarantine.txt")
+        log_path = os.path.join(self.quarantine_dir, f"{stem}.quarantine.log")
+
+        if not result.rejected:
+            for path in (quarantine_path, log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+
+        os.makedirs(self.quarantine_dir, exist_ok=True)
+        with open(quarantine_path, 'w', encoding='utf-8') as f:
+            f.write('\n\n'.join('\n'.join(line for _, line in r['lines']) for r in result.rejected) + '\n')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write(f"Source: {result.filepath}\n")
+            for r in result.rejected:
+                f.write(f"\n[{r['date'] or 'no valid date'}] line {r['lines'][0][0]}\n")
+                for diagnostic in r['diagnostics']:
+                    f.write(f"  {diagnostic.message}\n")
+        result.quarantine_path = quarantine_path
+
+
+def ingest_and_import(conn, filepath, pipeline):
+    """
+    Public function to ingest a file and import the accepted days in one step.
+
+    Returns:
+        IngestResult: The ingest outcome for the file.
+    """
+    with instrumentation.span('ingest_and_import', file=os.path.basename(filepath)) as span:
+        result = pipeline.ingest_file(filepath)
+        if result.parsed_data:
+            di.import_to_db(conn, result.parsed_data)
+        span.count('days_accepted', len(result.parsed_data))
+        span.count('days_rejected', len(result.rejected))
+    return result
+
+
+def print_ingest_summary(result):
+    """Prints a short per-file summary of an ingest run."""
+    if result.read_failed:
+        return
+    print(f"{result.filepath}: imported {len(result.parsed_data)} day(s), rejected {len(result.rejected)}.")
+    for r in result.rejected:
+        print(f"  [{r['date'] or 'no valid date'}] line {r['lines'][0][0]}")
+        for diagnostic in r['diagnostics']:
+            print(f"    {diagnostic.message}")
+    if result.quarantine_path:
+        print(f"  Rejected days written to {result.quarantine_path}")
+
+
+def iter_txt_files(input_path):
+    """Yields the .txt files at input_path (a file or a directory, searched recursively)."""
+    if os.path.isfile(input_path):
+        if input_path.lower().endswith('.txt'):
+            yield input_path
+        return
+    for root, _, files in os.walk(input_path):
+        for filename in sorted(files):
+            if filename.lower().endswith('.txt'):
+                yield os.path.join(root, filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate, parse and import time-tracking files in a single pass.")
+    parser.add_argument("paths", nargs='+', help=".txt files or directories to ingest.")
+    parser.add_argument("--policy", choices=INGEST_POLICIES, default='reject', help="How to handle days with errors (default: reject).")
+    parser.add_argument("--quarantine-dir", default=DEFAULT_QUARANTINE_DIR, help=f"Where the quarantine policy writes rejected days (default: {DEFAULT_QUARANTINE_DIR}).")
+    parser.add_argument("--config", default=CONFIG_FILE_PATH, help="Path to the validator config JSON file.")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_environment()
+    pipeline = IngestPipeline(args.config, policy=args.policy, quarantine_dir=args.quarantine_dir)
+    conn = di.init_db()
+    try:
+        for input_path in args.paths:
+            for filepath in iter_txt_files(os.path.normpath(input_path)):
+                print_ingest_summary(ingest_and_import(conn, filepath, pipeline))
+        snapshot.refresh_stale()
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+# instrumentation.py
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+import tracemalloc
+
+# Set TIME_MASTER_INSTRUMENT=stderr or TIME_MASTER_INSTRUMENT=json:<path> (optionally with
+# TIME_MASTER_INSTRUMENT_MEMORY=1) to turn instrumentation on without code changes.
+ENVIRONMENT_VARIABLE = 'TIME_MASTER_INSTRUMENT'
+MEMORY_ENVIRONMENT_VARIABLE = 'TIME_MASTER_INSTRUMENT_MEMORY'
+
+_enabled = False
+_sink = None
+_track_memory = False
+_started_tracemalloc = False
+_local = threading.local() # Per-thread stack of open spans
+
+
+class _NoOpSpan:
+    """Returned by span() while instrumentation is disabled; every operation does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def count(self, name, value=1):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+_NO_OP_SPAN = _NoOpSpan()
+
+
+class Span:
+    """
+    A timed region. Nested spans are recorded with their full path ("ingest_file/import_data").
+    Counters accumulate numbers such as lines parsed or rows written; attributes hold context
+    such as the file name.
+    """
+    __slots__ = ('name', 'path', 'attributes', 'counters', 'start_time', 'seconds',
+                 'start_memory', 'peak_memory_seen', 'peak_memory_bytes', 'error')
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.path = name
+        self.attributes = attributes
+        self.counters = {}
+        self.start_time = None
+        self.seconds = None
+        self.start_memory = None
+        self.peak_memory_seen = 0
+        self.peak_memory_bytes = None
+        self.error = None
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = _span_stack()
+        if stack:
+            self.path = f"{stack[-1].path}/{self.name}"
+        if _track_memory:
+            current_memory = _fold_memory_peak(stack)
+            tracemalloc.reset_peak()
+            self.start_memory = current_memory
+            self.peak_memory_seen = current_memory
+        stack.append(self)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds = time.perf_counter() - self.start_time
+        stack = _span_stack()
+        if _track_memory and self.start_memory is not None:
+            _fold_memory_peak(stack)
+            self.peak_memory_bytes = self.peak_memory_seen - self.start_memory
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        sink = _sink
+        if sink is not None:
+            sink.record(self.to_dict())
+        return False
+
+    def to_dict(self):
+        record = {'name': self.name, 'path': self.path, 'seconds': self.seconds, 'counters': self.counters}
+        if self.attributes:
+            record['attributes'] = self.attributes
+        if self.peak_memory_bytes is not None:
+            record['peak_memory_bytes'] = self.peak_memory_bytes
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+def _span_stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def _fold_memory_peak(stack):
+    """Credits the traced peak since the last reset to every open span; returns the current traced size."""
+    current_memory, peak_memory = tracemalloc.get_traced_memory()
+    for open_span in stack:
+        if peak_memory > open_span.peak_memory_seen:
+            open_span.peak_memory_seen = peak_memory
+    return current_memory
+
+
+def span(name, **attributes):
+    """
+    Context manager timing a region:
+
+        with instrumentation.span('parse_file', file=path) as s:
+            ...
+            s.count('lines', line_count)
+
+    Returns a shared no-op object while instrumentation is disabled.
+    """
+    if not _enabled:
+        return _NO_OP_SPAN
+    return Span(name, attributes)
+
+
+def instrumented(name=None):
+    """Decorator recording every call of the function as a span (named after the function by default)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_count(name, value=1):
+    """Adds to a counter of the innermost open span on this thread (no-op when disabled or outside a span)."""
+    if not _enabled:
+        return
+    stack = _span_stack()
+    if stack:
+        stack[-1].count(name, value)
+
+
+def is_enabled():
+    return _enabled
+
+
+# --- Sinks ---
+class MemorySink:
+    """Keeps every span record in a list; meant for tests and interactive inspection."""
+    def __init__(self):
+        self.records = []
+
+    def record(self, span_record):
+        self.records.append(span_record)
+
+    def by_name(self, name):
+        return [r for r in self.records if r['name'] == name]
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Appends one JSON object per finished span to a file, flushed immediately so a crash loses nothing."""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, span_record):
+        span_record = dict(span_record, timestamp=time.time(), pid=os.getpid())
+        line = json.dumps(span_record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class StderrSummarySink:
+    """Aggregates spans by path and prints a summary table to stderr when closed."""
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.summary = {} # path -> {'calls', 'seconds', 'max_seconds', 'counters', 'peak_memory_bytes'}
+        self._lock = threading.Lock()
+
+    def record(self, span_record):
+        with self._lock:
+            entry = self.summary.setdefault(span_record['path'], {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                                                  'counters': {}, 'peak_memory_bytes': None})
+            entry['calls'] += 1
+            entry['seconds'] += span_record['seconds']
+            entry['max_seconds'] = max(entry['max_seconds'], span_record['seconds'])
+            for counter_name, value in span_record['counters'].items():
+                entry['counters'][counter_name] = entry['counters'].get(counter_name, 0) + value
+            if 'peak_memory_bytes' in span_record:
+                entry['peak_memory_bytes'] = max(entry['peak_memory_bytes'] or 0, span_record['peak_memory_bytes'])
+
+    def close(self):
+        stream = self.stream or sys.stderr
+        if not self.summary:
+            return
+        print(f"\n{'span':<48} {'calls':>7} {'total s':>10} {'max s':>9} {'peak KiB':>10}  counters", file=stream)
+        for path, entry in sorted(self.summary.items(), key=lambda item: item[1]['seconds'], reverse=True):
+            peak = f"{entry['peak_memory_bytes'] / 1024:.1f}" if entry['peak_memory_bytes'] is not None else '-'
+            counters = ', '.join(f"{name}={value}" for name, value in sorted(entry['counters'].items()))
+            print(f"{path:<48} {entry['calls']:>7} {entry['seconds']:>10.4f} {entry['max_seconds']:>9.4f} {peak:>10}  {counters}", file=stream)
+
+
+# --- Switching on and off ---
+def enable(sink, track_memory=False):
+    """Turns instrumentation on, sending finished spans to sink. Replaces (and closes) any previous sink."""
+    global _enabled, _sink, _track_memory, _started_tracemalloc
+    if _enabled:
+        disable()
+    _sink = sink
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _enabled = True
+
+
+def disable():
+    """Turns instrumentation off and closes the sink (printing or writing any summary)."""
+    global _enabled, _sink, _track_memory, _started_tracemalloc
+    _enabled = False
+    sink, _sink = _sink, None
+    _track_memory = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    if sink is not None:
+        sink.close()
+
+
+def enable_from_environment():
+    """
+    Enables instrumentation according to TIME_MASTER_INSTRUMENT ('stderr' or 'json:<path>').
+    The sink is closed automatically at exit. Returns True if instrumentation was enabled.
+    """
+    setting = os.environ.get(ENVIRONMENT_VARIABLE, '').strip()
+    if not setting:
+        return False
+    if setting == 'stderr':
+        sink = StderrSummarySink()
+    elif setting.startswith('json:') and len(setting) > 5:
+        sink = JsonLinesSink(setting[5:])
+    else:
+        print(f"Warning: ignoring unknown {ENVIRONMENT_VARIABLE} value '{setting}' (expected 'stderr' or 'json:<path>').", file=sys.stderr)
+        return False
+    enable(sink, track_memory=os.environ.get(MEMORY_ENVIRONMENT_VARIABLE, '') not in ('', '0'))
+    atexit.register(disable)
+    return True
@@ -1,8 +1,14 @@
 import os
 import re
-import data_parser as dp # For parsing and db initialization
+import argparse
+import instrumentation # For optional stage timing (TIME_MASTER_INSTRUMENT)
+import database_importer as di # For db initialization
+import ingest_pipeline as ip # For validating, parsing and importing files
+import directory_watcher as dw # For watch mode
 import database_querier as dq # For querying
 import heatmap_generator as hg # For generating heatmap imports the module containing the class
+import memory_database as md # For the in-memory query mode
+import snapshot # For refreshing the snapshot after imports
 # 主程序
 def print_menu():
     """Prints the main menu options to the console."""
@@ -16,14 +22,16 @@ def print_menu():
     print("6. Generate study heatmap for a year")
     print("7. Query monthly statistics")
     print("8. Exit")
+    print("9. Watch a directory and import changes (Ctrl+C to stop)")
 
-def handle_menu_choice(choice, conn):
+def handle_menu_choice(choice, conn, memory_db=None):
     """
     Handles the user's menu choice.
 
     Args:
         choice (str): The user's selected option.
         conn (sqlite3.Connection): The database connection object.
+        memory_db (InMemoryDatabase): Set when conn is an in-memory copy; told about every import.
 
     Returns:
         bool: True if the application should continue, False if it should exit.
@@ -32,22 +40,20 @@ def handle_menu_choice(choice, conn):
         input_path = input("Enter the path to a .txt file or a directory containing .txt files: ").strip().strip('"') #
         input_path = os.path.normpath(input_path)
 
-        if os.path.isfile(input_path) and input_path.lower().endswith('.txt'): 
-            print(f"\nProcessing single file: {input_path}") 
-            dp.parse_file(conn, input_path) 
-            print(f"File processing complete for {input_path}") 
-        elif os.path.isdir(input_path):
-            print(f"\nScanning directory: {input_path}") 
+        if (os.path.isfile(input_path) and input_path.lower().endswith('.txt')) or os.path.isdir(input_path):
+            policy_choice = input("Days with errors - (r)eject, (q)uarantine, or (s)trict: reject the whole file [r]: ").strip().lower()
+            policy = {'q': 'quarantine', 's': 'strict'}.get(policy_choice, 'reject')
+            pipeline = ip.IngestPipeline(policy=policy)
             file_count = 0 
-            for root, _, files in os.walk(input_path): 
-                for filename in files: 
-                    if filename.lower().endswith('.txt'): 
-                        filepath = os.path.join(root, filename) 
-                        print(f"Found data file: {filepath}") 
-                        dp.parse_file(conn, filepath) 
-                        file_count += 1 
+            for filepath in ip.iter_txt_files(input_path): 
+                print(f"\nProcessing file: {filepath}") 
+                ip.print_ingest_summary(ip.ingest_and_import(conn, filepath, pipeline)) 
+                file_count += 1 
+            snapshot.refresh_stale()
             if file_count > 0: 
-                print(f"Directory scanning complete. Processed {file_count} data file(s).") #
+                if memory_db:
+                    memory_db.after_write()
+                print(f"Processing complete. Processed {file_count} data file(s).") #
             else: 
                 print(f"No .txt files found in directory: {input_path}") #
         else: 
@@ -75,12 +81,16 @@ def handle_menu_choice(choice, conn):
         year_str = input("Enter year for heatmap (YYYY): ") 
         if re.match(r'^\d{4}$', year_str): 
             year = int(year_str) 
-            output_file = f"study_heatmap_{year}.html" 
-            # MODIFIED PART
-            generator = hg.HeatmapGenerator(conn, year) # Instantiate the class
+            mode_choice = input("Color thresholds - (f)ixed hours or (q)uantiles of this year [f]: ").strip().lower()
+            threshold_mode = 'quantile' if mode_choice == 'q' else 'fixed'
+            drilldown_choice = input("Include clickable per-day breakdowns? (y/N): ").strip().lower()
+            output_file = f"study_heatmap_{year}.html"
+            fetcher = hg.HeatmapDataFetcher(conn)
+            study_data = fetcher.fetch_yearly_study_times(year)
+            drilldown_data = fetcher.fetch_yearly_day_breakdowns(year) if drilldown_choice == 'y' else None
+            generator = hg.HeatmapGenerator(year, study_data, threshold_mode=threshold_mode, drilldown_data=drilldown_data) # Instantiate the class
             generator.generate_html_output(output_file) # Call the main method
-            # END OF MODIFIED PART
-            print(f"Study heatmap generated: {output_file}") 
+            print(f"Study heatmap generated: {output_file}")
         else: 
             print("Invalid year format. Please use YYYY.") 
 
@@ -91,6 +101,19 @@ def handle_menu_choice(choice, conn):
         else: 
             print("Invalid year-month format. Please use YYYYMM.") 
 
+    elif choice == '9':
+        input_path = os.path.normpath(input("Enter the directory to watch: ").strip().strip('"'))
+        if os.path.isdir(input_path):
+            interval_str = input(f"Poll interval in seconds [{dw.DEFAULT_POLL_INTERVAL}]: ").strip()
+            try:
+                interval = float(interval_str) if interval_str else dw.DEFAULT_POLL_INTERVAL
+            except ValueError:
+                interval = dw.DEFAULT_POLL_INTERVAL
+            on_import = memory_db.after_write if memory_db else None
+            dw.DirectoryWatcher(conn, input_path, ip.IngestPipeline(), interval=interval, on_import=on_import).run()
+        else:
+            print(f"Error: Invalid directory: {input_path}")
+
     elif choice == '8': 
         print("Exiting application.") 
         return False # Signal to exit loop
@@ -100,17 +123,36 @@ def handle_menu_choice(choice, conn):
     return True # Signal to continue loop
 
 def main():
-    # Initialize DB connection using the parser module
-    conn = dp.init_db() 
+    parser = argparse.ArgumentParser(description="Import time-tracking files and query the statistics.")
+    parser.add_argument("--db", default=di.DEFAULT_DB_PATH, help=f"Database file (default: {di.DEFAULT_DB_PATH}).")
+    parser.add_argument("--in-memory", action='store_true', help="Load the database into memory at startup and serve all queries from it.")
+    parser.add_argument("--sync", choices=md.SYNC_MODES, default='write-through',
+                        help="With --in-memory: copy imports to disk immediately (write-through) or only at exit (flush).")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_environment()
+    memory_db = None
+    if args.in_memory:
+        memory_db = md.InMemoryDatabase(args.db, sync_mode=args.sync)
+        conn = memory_db.conn
+    else:
+        # Initialize DB connection using the importer module
+        conn = di.init_db(args.db)
 
-    while True: 
-        print_menu() 
-        choice = input("Please select an option: ") 
-        
-        if not handle_menu_choice(choice, conn): 
-            break 
+    try:
+        while True: 
+            print_menu() 
+            choice = input("Please select an option: ") 
 
-    conn.close() 
+            if not handle_menu_choice(choice, conn, memory_db): 
+                break 
+    finally:
+        if memory_db:
+            if memory_db.sync_mode == 'flush' and memory_db.dirty:
+                print(f"Writing in-memory changes to {args.db}...")
+            memory_db.close()
+        else:
+            conn.close() 
 
 if __name__ == '__main__':
     main() 
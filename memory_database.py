@@ -0,0 +1,70 @@
+# memory_database.py
+import sqlite3
+import database_importer as di
+import instrumentation
+import snapshot
+
+SYNC_MODES = ('write-through', 'flush')
+
+
+class InMemoryDatabase:
+    """
+    Copies the whole on-disk database into an in-memory SQLite database with the backup
+    API, so every query (database_querier, heatmap) is served from RAM without page I/O.
+
+    Writers use self.conn like any other connection and call after_write() afterwards.
+    In 'write-through' mode that copies the database back to disk straight away; in
+    'flush' mode the changes stay in memory until flush() or close(). The copy back
+    replaces the file's contents, so this process must be the database's only writer
+    while the in-memory copy is open.
+
+    Args:
+        db_path (str): The on-disk database (created with the schema if missing).
+        sync_mode (str): 'write-through' or 'flush'.
+    """
+    def __init__(self, db_path=di.DEFAULT_DB_PATH, sync_mode='write-through'):
+        if sync_mode not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode '{sync_mode}'. Expected one of {SYNC_MODES}.")
+        self.db_path = db_path
+        self.sync_mode = sync_mode
+        self.dirty = False
+        self.conn = sqlite3.connect(':memory:')
+        disk_conn = di.init_db(db_path)
+        try:
+            with instrumentation.span('load_into_memory'):
+                disk_conn.backup(self.conn)
+        finally:
+            disk_conn.close()
+
+    def after_write(self, *_):
+        """Records that self.conn was written to; in write-through mode the change goes to disk now."""
+        self.dirty = True
+        if self.sync_mode == 'write-through':
+            self.flush()
+
+    def flush(self):
+        """
+        Copies the in-memory database back to disk if it changed.
+
+        Returns:
+            bool: True if anything was written.
+        """
+        if not self.dirty:
+            return False
+        self.conn.commit()
+        disk_conn = sqlite3.connect(self.db_path)
+        try:
+            with instrumentation.span('flush_to_disk'):
+                self.conn.backup(disk_conn)
+        finally:
+            disk_conn.close()
+        snapshot.refresh_snapshot(self.conn, self.db_path) # Imports into self.conn can't see the file's snapshot
+        self.dirty = False
+        return True
+
+    def close(self):
+        """Flushes pending changes and closes the in-memory database."""
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
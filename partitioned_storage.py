@@ -0,0 +1,343 @@
+# partitioned_storage.py
+import os
+import json
+import stat
+import sqlite3
+import pathlib
+import argparse
+import contextlib
+import datetime
+import database_importer as di
+import database_querier as dq
+import heatmap_generator as hg
+import ingest_pipeline as ip
+import instrumentation
+import snapshot
+
+DEFAULT_STORE_DIR = 'time_data'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FORMAT_VERSION = 1
+# Tables exposed through the TEMP views of a multi-year connection
+UNION_ALL_TABLES = ('days', 'time_records')
+UNION_DISTINCT_TABLES = ('parent_child',) # Every partition carries the hierarchy, so duplicates are merged
+
+
+class PartitionedStore:
+    """
+    Stores each year in its own SQLite file (time_data_<year>.db, with the usual schema)
+    and keeps a manifest.json describing the partitions.
+
+    Readers open only the partitions their date range touches: a single year is opened
+    directly, several years are ATTACHed to an in-memory connection behind TEMP views
+    named like the real tables, so the database_querier and heatmap functions work on
+    either unchanged. Closed years are vacuumed, made read-only on disk and opened as
+    immutable, so SQLite skips locking and change detection for them.
+    """
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self.manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+
+    # --- Manifest ---
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'format_version': MANIFEST_FORMAT_VERSION, 'partitions': {}}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported manifest format version {manifest.get('format_version')} in {self.manifest_path}.")
+        return manifest
+
+    def _save_manifest(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(temp_path, self.manifest_path) # Readers never see a half-written manifest
+
+    def years(self):
+        """Returns the years that have a partition, in ascending order."""
+        return sorted(int(year) for year in self.manifest['partitions'])
+
+    def is_closed(self, year):
+        return self.manifest['partitions'].get(str(year), {}).get('closed', False)
+
+    def partition_path(self, year):
+        return os.path.join(self.store_dir, f"time_data_{year}.db")
+
+    def _partition_uri(self, year):
+        uri = pathlib.Path(self.partition_path(year)).resolve().as_uri()
+        return uri + ('?mode=ro&immutable=1' if self.is_closed(year) else '?mode=ro')
+
+    def _refresh_partition_stats(self, year, conn):
+        day_count, first_date, last_date = conn.execute('SELECT COUNT(*), MIN(date), MAX(date) FROM days').fetchone()
+        record_count = conn.execute('SELECT COUNT(*) FROM time_records').fetchone()[0]
+        self.manifest['partitions'][str(year)].update({
+            'days': day_count, 'records': record_count, 'first_date': first_date, 'last_date': last_date,
+        })
+
+    # --- Writing ---
+    def _open_for_write(self, year):
+        if self.is_closed(year):
+            raise ValueError(f"Partition {year} is closed (read-only); reopen it before writing.")
+        os.makedirs(self.store_dir, exist_ok=True)
+        conn = di.init_db(self.partition_path(year))
+        self.manifest['partitions'].setdefault(str(year), {'file': os.path.basename(self.partition_path(year)), 'closed': False})
+        return conn
+
+    def import_data(self, parsed_data, replace=False):
+        """
+        Routes parsed day objects to their year's partition, creating partitions as needed.
+
+        Args:
+            parsed_data (list): The intermediate data from FileDataParser.
+            replace (bool): Delete the stored records of each day first (see DatabaseImporter.replace_days).
+
+        Raises:
+            ValueError: If any of the days belongs to a closed year; nothing is written then.
+        """
+        days_by_year = {}
+        for day_data in parsed_data:
+            days_by_year.setdefault(int(day_data['date'][:4]), []).append(day_data)
+        closed_years = sorted(year for year in days_by_year if self.is_closed(year))
+        if closed_years:
+            raise ValueError(f"Cannot import into closed year(s) {', '.join(map(str, closed_years))}; reopen them first.")
+
+        with instrumentation.span('partitioned_import') as span:
+            for year, days in sorted(days_by_year.items()):
+                conn = self._open_for_write(year)
+                try:
+                    if replace:
+                        di.replace_days_in_db(conn, days)
+                    else:
+                        di.import_to_db(conn, days)
+                    self._refresh_partition_stats(year, conn)
+                finally:
+                    conn.close()
+            span.count('partitions_written', len(days_by_year))
+        self._save_manifest()
+
+    def migrate_from(self, source_db_path):
+        """
+        Splits an existing single-file database into year partitions.
+
+        Returns:
+            list: The years that were written.
+        """
+        source_path = os.path.abspath(source_db_path)
+        source = sqlite3.connect(pathlib.Path(source_path).as_uri() + '?mode=ro', uri=True)
+        try:
+            years = sorted({int(row[0]) for row in source.execute(
+                'SELECT substr(date, 1, 4) FROM days UNION SELECT substr(date, 1, 4) FROM time_records')})
+        finally:
+            source.close()
+        closed_years = [year for year in years if self.is_closed(year)]
+        if closed_years:
+            raise ValueError(f"Cannot migrate into closed year(s) {', '.join(map(str, closed_years))}; reopen them first.")
+
+        for year in years:
+            conn = self._open_for_write(year)
+            try:
+                conn.execute('ATTACH DATABASE ? AS source', (source_path,))
+                year_pattern = f"{year}%"
+                conn.execute('''
+                    INSERT OR REPLACE INTO days (date, status, remark, getup_time)
+                    SELECT date, status, remark, getup_time FROM source.days WHERE date LIKE ?
+                ''', (year_pattern,))
+                conn.execute('''
+                    INSERT OR REPLACE INTO time_records (date, start, end, project_path, duration)
+                    SELECT date, start, end, project_path, duration FROM source.time_records WHERE date LIKE ?
+                ''', (year_pattern,))
+                conn.execute('INSERT OR IGNORE INTO parent_child (child, parent) SELECT child, parent FROM source.parent_child')
+                conn.commit()
+                conn.execute('DETACH DATABASE source')
+                self._refresh_partition_stats(year, conn)
+            finally:
+                conn.close()
+        self._save_manifest()
+        return years
+
+    def close_year(self, year):
+        """Vacuums and analyzes a year's partition, then marks it closed and read-only."""
+        if str(year) not in self.manifest['partitions']:
+            raise ValueError(f"No partition for {year}.")
+        if self.is_closed(year):
+            return
+        conn = self._open_for_write(year)
+        try:
+            conn.execute('ANALYZE')
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        path = self.partition_path(year)
+        os.chmod(path, os.stat(path).st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+        self.manifest['partitions'][str(year)].update({'closed': True, 'closed_at': datetime.datetime.now().isoformat(timespec='seconds')})
+        self._save_manifest()
+
+    def close_past_years(self, current_year=None):
+        """Closes every partition older than current_year (default: this year). Returns the closed years."""
+        current_year = current_year or datetime.date.today().year
+        closed = [year for year in self.years() if year < current_year and not self.is_closed(year)]
+        for year in closed:
+            self.close_year(year)
+        return closed
+
+    def reopen_year(self, year):
+        """Makes a closed partition writable again."""
+        if not self.is_closed(year):
+            return
+        path = self.partition_path(year)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IWUSR)
+        self.manifest['partitions'][str(year)]['closed'] = False
+        self.manifest['partitions'][str(year)].pop('closed_at', None)
+        self._save_manifest()
+
+    def vacuum(self):
+        """Vacuums every open partition. Returns the vacuumed years."""
+        vacuumed = [year for year in self.years() if not self.is_closed(year)]
+        for year in vacuumed:
+            conn = sqlite3.connect(self.partition_path(year))
+            try:
+                conn.execute('VACUUM')
+            finally:
+                conn.close()
+        return vacuumed
+
+    # --- Reading ---
+    def connect_years(self, years):
+        """
+        Opens a read-only connection over the given years' partitions.
+
+        A single existing partition is opened directly. Several are ATTACHed to an
+        in-memory database with TEMP views over them; with none, the connection holds
+        the empty schema so every query simply finds no records.
+
+        Returns:
+            sqlite3.Connection: Queried like an ordinary time_data.db.
+        """
+        years = [year for year in sorted(set(years)) if str(year) in self.manifest['partitions']]
+        if len(years) == 1:
+            return sqlite3.connect(self._partition_uri(years[0]), uri=True)
+
+        conn = sqlite3.connect(':memory:', uri=True) # uri=True lets ATTACH take read-only URIs
+        if not years:
+            di.create_schema(conn)
+            return conn
+        for year in years:
+            conn.execute(f'ATTACH DATABASE ? AS p{year}', (self._partition_uri(year),))
+        for table in UNION_ALL_TABLES:
+            conn.execute(f"CREATE TEMP VIEW {table} AS " + ' UNION ALL '.join(f"SELECT * FROM p{year}.{table}" for year in years))
+        for table in UNION_DISTINCT_TABLES:
+            conn.execute(f"CREATE TEMP VIEW {table} AS " + ' UNION '.join(f"SELECT * FROM p{year}.{table}" for year in years))
+        return conn
+
+    def connect_range(self, start_date, end_date):
+        """Opens a read-only connection covering the YYYYMMDD dates start_date..end_date."""
+        return self.connect_years(range(int(start_date[:4]), int(end_date[:4]) + 1))
+
+    def connect_day(self, date):
+        return self.connect_range(date, date)
+
+    def connect_month(self, year_month):
+        return self.connect_years([int(year_month[:4])])
+
+    def connect_year(self, year):
+        return self.connect_years([year])
+
+    def connect_period(self, days_to_query, today=None):
+        """Covers the range query_period reads: the last days_to_query days up to today."""
+        end_date = today or datetime.datetime.now()
+        start_date = end_date - datetime.timedelta(days=days_to_query - 1)
+        return self.connect_range(start_date.strftime('%Y%m%d'), end_date.strftime('%Y%m%d'))
+
+
+def print_store_status(store):
+    """Prints one line per partition from the manifest."""
+    if not store.years():
+        print(f"No partitions in {store.store_dir}.")
+        return
+    for year in store.years():
+        info = store.manifest['partitions'][str(year)]
+        size = os.path.getsize(store.partition_path(year)) if os.path.exists(store.partition_path(year)) else 0
+        print(f"{year}: {info.get('days', 0)} day(s), {info.get('records', 0)} record(s), "
+              f"{info.get('first_date') or '-'}..{info.get('last_date') or '-'}, {size / 1024:.1f} KiB, "
+              f"{'closed' if info.get('closed') else 'open'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Year-partitioned time database: one SQLite file per year plus a manifest.")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help=f"Partition directory (default: {DEFAULT_STORE_DIR}).")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="List the partitions.")
+    migrate_parser = commands.add_parser('migrate', help="Split a single-file database into year partitions.")
+    migrate_parser.add_argument("source", nargs='?', default=di.DEFAULT_DB_PATH, help=f"Database to split (default: {di.DEFAULT_DB_PATH}).")
+    import_parser = commands.add_parser('import', help="Ingest .txt files into their years' partitions.")
+    import_parser.add_argument("paths", nargs='+', help=".txt files or directories to ingest.")
+    import_parser.add_argument("--policy", choices=ip.INGEST_POLICIES, default='reject', help="How to handle days with errors (default: reject).")
+    close_parser = commands.add_parser('close', help="Vacuum a year and make it read-only.")
+    close_parser.add_argument("year", nargs='?', type=int, help="Year to close (default: every year before the current one).")
+    reopen_parser = commands.add_parser('reopen', help="Make a closed year writable again.")
+    reopen_parser.add_argument("year", type=int)
+    commands.add_parser('vacuum', help="Vacuum the open partitions.")
+    day_parser = commands.add_parser('day', help="Daily statistics.")
+    day_parser.add_argument("date", help="YYYYMMDD")
+    period_parser = commands.add_parser('period', help="Statistics for the last N days.")
+    period_parser.add_argument("days", type=int)
+    month_parser = commands.add_parser('month', help="Monthly statistics.")
+    month_parser.add_argument("year_month", help="YYYYMM")
+    heatmap_parser = commands.add_parser('heatmap', help="Study heatmap for a year (opens only that partition).")
+    heatmap_parser.add_argument("year", type=int)
+    heatmap_parser.add_argument("--drilldown", action='store_true', help="Include clickable per-day breakdowns.")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_environment()
+    store = PartitionedStore(args.store)
+    try:
+        if args.command == 'status':
+            print_store_status(store)
+        elif args.command == 'migrate':
+            years = store.migrate_from(args.source)
+            print(f"Migrated {args.source} into {len(years)} partition(s): {', '.join(map(str, years)) or 'none'}.")
+        elif args.command == 'import':
+            pipeline = ip.IngestPipeline(policy=args.policy)
+            for input_path in args.paths:
+                for filepath in ip.iter_txt_files(os.path.normpath(input_path)):
+                    result = pipeline.ingest_file(filepath)
+                    if result.parsed_data:
+                        store.import_data(result.parsed_data)
+                    ip.print_ingest_summary(result)
+            snapshot.refresh_stale()
+        elif args.command == 'close':
+            if args.year:
+                store.close_year(args.year)
+                closed = [args.year]
+            else:
+                closed = store.close_past_years()
+            print(f"Closed: {', '.join(map(str, closed)) or 'nothing to close'}.")
+        elif args.command == 'reopen':
+            store.reopen_year(args.year)
+        elif args.command == 'vacuum':
+            print(f"Vacuumed: {', '.join(map(str, store.vacuum())) or 'no open partitions'}.")
+        elif args.command == 'day':
+            with contextlib.closing(store.connect_day(args.date)) as conn:
+                dq.query_day(conn, args.date)
+        elif args.command == 'period':
+            with contextlib.closing(store.connect_period(args.days)) as conn:
+                dq.query_period(conn, args.days)
+        elif args.command == 'month':
+            with contextlib.closing(store.connect_month(args.year_month)) as conn:
+                dq.query_month_summary(conn, args.year_month)
+        elif args.command == 'heatmap':
+            with contextlib.closing(store.connect_year(args.year)) as conn:
+                fetcher = hg.HeatmapDataFetcher(conn)
+                study_data = fetcher.fetch_yearly_study_times(args.year)
+                drilldown_data = fetcher.fetch_yearly_day_breakdowns(args.year) if args.drilldown else None
+            output_file = f"study_heatmap_{args.year}.html"
+            hg.HeatmapGenerator(args.year, study_data, drilldown_data=drilldown_data).generate_html_output(output_file)
+            print(f"Study heatmap generated: {output_file}")
+    except ValueError as e:
+        parser.exit(1, f"Error: {e}\n")
+
+if __name__ == '__main__':
+    main()
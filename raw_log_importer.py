@@ -0,0 +1,76 @@
+# raw_log_importer.py
+import os
+import argparse
+import instrumentation
+import datetime
+from tools.interval_processor import LogProcessor, DEFAULT_REPLACEMENT_MAP_FILE, print_unmapped_report
+import database_importer as di
+import ingest_pipeline as ip
+import snapshot
+
+
+@instrumentation.instrumented()
+def import_raw_log(conn, filepath, year, replacement_map_file=DEFAULT_REPLACEMENT_MAP_FILE, pipeline=None):
+    """
+    Imports a raw 4-digit-time log straight into the database, without writing
+    or re-reading a Duration_<stem>.txt file.
+
+    Without a pipeline, LogProcessor's day records go directly to DatabaseImporter.
+    With an IngestPipeline, the Duration-format lines LogProcessor would have
+    written are validated in memory first, and only accepted days are imported
+    (diagnostic line numbers then refer to those generated lines).
+
+    Args:
+        conn (sqlite3.Connection): The database connection object.
+        filepath (str): Path to the raw log file.
+        year (int): Year used for the log's MMDD date lines.
+        replacement_map_file (str): Text replacement map JSON for LogProcessor.
+        pipeline (IngestPipeline): Optional validator pipeline.
+
+    Returns:
+        IngestResult: The imported days in result.parsed_data.
+    """
+    processor = LogProcessor(year=year, replacement_map_file=replacement_map_file)
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            if pipeline is not None:
+                result = pipeline.ingest_lines(processor.iter_output_lines(f), filepath)
+            else:
+                result = ip.IngestResult(filepath)
+                result.parsed_data = list(processor.iter_day_records(f))
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: could not read {filepath}: {e}")
+        result = ip.IngestResult(filepath)
+        result.read_failed = True
+        return result
+
+    print_unmapped_report(processor.unmapped_event_counts)
+    if result.parsed_data:
+        di.import_to_db(conn, result.parsed_data)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert raw logs and import them into the database in one step.")
+    parser.add_argument("paths", nargs='+', help="Raw log .txt files or directories.")
+    current_year = datetime.datetime.now().year
+    parser.add_argument("--year", type=int, default=current_year, help=f"Year to use for the logs' dates (default: {current_year}).")
+    parser.add_argument("--config", default=DEFAULT_REPLACEMENT_MAP_FILE, help="Path to the text replacement map JSON file.")
+    parser.add_argument("--validate", action='store_true', help="Validate the converted days with the format validator before importing.")
+    parser.add_argument("--policy", choices=ip.INGEST_POLICIES, default='reject', help="With --validate: how to handle days with errors (default: reject).")
+    parser.add_argument("--quarantine-dir", default=ip.DEFAULT_QUARANTINE_DIR, help=f"With --validate: where the quarantine policy writes rejected days (default: {ip.DEFAULT_QUARANTINE_DIR}).")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_environment()
+    pipeline = ip.IngestPipeline(policy=args.policy, quarantine_dir=args.quarantine_dir) if args.validate else None
+    conn = di.init_db()
+    try:
+        for input_path in args.paths:
+            for filepath in ip.iter_txt_files(os.path.normpath(input_path)):
+                ip.print_ingest_summary(import_raw_log(conn, filepath, args.year, args.config, pipeline))
+        snapshot.refresh_stale()
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
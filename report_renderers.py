@@ -0,0 +1,135 @@
+# report_renderers.py
+import io
+import csv
+import json
+import database_querier as dq
+
+OUTPUT_FORMATS = ('text', 'json', 'csv', 'markdown')
+TREE_CSV_COLUMNS = ('path', 'depth', 'duration_seconds', 'average_seconds_per_day', 'share_percent')
+RAW_CSV_COLUMNS = ('date', 'start', 'end', 'project_path')
+
+
+def iter_tree_rows(tree):
+    """
+    Walks a build_project_tree hierarchy depth-first, largest nodes first (the text order).
+
+    Yields:
+        tuple: (path parts, node), e.g. (['STUDY', 'math'], {'duration': ..., 'children': ...}).
+    """
+    def by_duration(nodes): # Largest last, since the stack pops from the end; ties keep the text order
+        return reversed(sorted(nodes.items(), key=lambda x: x[1]['duration'], reverse=True))
+
+    pending = [([name], node) for name, node in by_duration(tree)]
+    while pending:
+        path, node = pending.pop()
+        yield path, node
+        pending.extend((path + [name], child) for name, child in by_duration(node['children']))
+
+
+def _average_days(report):
+    return getattr(report, 'average_days', 1)
+
+
+def _title(report):
+    if isinstance(report, dq.DayReport):
+        return f"Day {report.date}"
+    if isinstance(report, dq.PeriodReport):
+        return f"Last {report.days_to_query} days ({report.start_date} - {report.end_date})"
+    if isinstance(report, dq.DayRawReport):
+        return f"Raw data {report.date}"
+    return f"Month {report.year_month}"
+
+
+# --- Renderers (each yields chunks of output) ---
+def iter_text(report):
+    for i, chunk in enumerate(dq.iter_report_lines(report)):
+        yield chunk if i == 0 else '\n' + chunk
+
+def iter_json(report):
+    yield json.dumps(report.to_dict(), ensure_ascii=False, indent=2)
+
+def iter_csv(report):
+    """
+    Day raw reports become one row per record; the other reports one row per tree node,
+    with the node's path ('STUDY/math'), depth, seconds, per-day average and share of the total.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    if isinstance(report, dq.DayRawReport):
+        writer.writerow(RAW_CSV_COLUMNS)
+        for start, end, project in report.records:
+            writer.writerow((report.date, start, end, project))
+        yield flush()
+        return
+
+    writer.writerow(TREE_CSV_COLUMNS)
+    average_days = _average_days(report)
+    for path, node in iter_tree_rows(report.tree):
+        share = node['duration'] / report.total_duration * 100 if report.total_duration else 0
+        writer.writerow(('/'.join(path), len(path) - 1, node['duration'], round(node['duration'] / average_days), f"{share:.2f}"))
+        if buffer.tell() > 65536:
+            yield flush()
+    yield flush()
+
+def iter_markdown(report):
+    yield f"## {_title(report)}\n"
+    if isinstance(report, (dq.DayReport, dq.DayRawReport)) and not report.found:
+        yield "\nNo records found for this date.\n"
+        return
+
+    average_days = _average_days(report)
+    summary = [f"- Total time: {dq.time_format_duration(report.total_duration, average_days)}"]
+    if isinstance(report, (dq.DayReport, dq.DayRawReport)):
+        summary.append(f"- Status: {report.status}")
+        summary.append(f"- Getup: {report.getup}")
+        if report.remark and report.remark.strip():
+            summary.append(f"- Remark: {report.remark}")
+    else:
+        summary.append(f"- Days with time records: {report.days_with_records}")
+    if isinstance(report, dq.PeriodReport):
+        summary.append(f"- Status True / False: {report.true_days} / {report.false_days}")
+    yield '\n' + '\n'.join(summary) + '\n'
+
+    if isinstance(report, dq.DayRawReport):
+        if report.records:
+            yield "\n| Start | End | Project |\n| --- | --- | --- |\n"
+            yield ''.join(f"| {start} | {end} | {project} |\n" for start, end, project in report.records)
+        return
+    if not report.tree:
+        yield "\nNo time records.\n"
+        return
+    yield '\n'
+    for path, node in iter_tree_rows(report.tree):
+        name = f"**{path[0]}**" if len(path) == 1 else path[-1]
+        yield f"{'  ' * (len(path) - 1)}- {name}: {dq.time_format_duration(node['duration'], average_days)}\n"
+
+_RENDERERS = {
+    'text': iter_text,
+    'json': iter_json,
+    'csv': iter_csv,
+    'markdown': iter_markdown,
+}
+
+
+def iter_render(report, output_format='text'):
+    """
+    Streams a report object (from database_querier.day_report and friends) in the given format.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if output_format not in _RENDERERS:
+        raise ValueError(f"Unknown output format '{output_format}'. Expected one of {OUTPUT_FORMATS}.")
+    return _RENDERERS[output_format](report)
+
+
+def render(report, output_format='text'):
+    """Renders a report object to a string; the text format equals what the query_* functions print."""
+    return ''.join(iter_render(report, output_format))
@@ -0,0 +1,140 @@
+# report_runner.py
+import os
+import re
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import database_importer as di
+import database_querier as dq
+import heatmap_generator as hg
+import connection_manager as cm
+import report_renderers as rend
+import instrumentation
+
+
+def _heatmap_report(conn, year, output_file=None, drilldown=False, threshold_mode='fixed'):
+    year = int(year)
+    output_file = output_file or f"study_heatmap_{year}.html"
+    fetcher = hg.HeatmapDataFetcher(conn)
+    study_data = fetcher.fetch_yearly_study_times(year)
+    drilldown_data = fetcher.fetch_yearly_day_breakdowns(year) if drilldown else None
+    hg.HeatmapGenerator(year, study_data, threshold_mode=threshold_mode, drilldown_data=drilldown_data).generate_html_output(output_file)
+    return f"Study heatmap generated: {output_file}"
+
+# Report kind -> (function(conn, argument, **options) returning a report object or, for
+# reports that write a file, a message; argument pattern)
+REPORT_KINDS = {
+    'day': (dq.day_report, r'^\d{8}$'),
+    'raw': (dq.day_raw_report, r'^\d{8}$'),
+    'period': (lambda conn, days: dq.period_report(conn, int(days)), r'^\d+$'),
+    'month': (dq.month_report, r'^\d{6}$'),
+    'heatmap': (_heatmap_report, r'^\d{4}$'),
+}
+
+
+def run_report(conn, kind, argument, output_format='text', **options):
+    """
+    Runs one report of the given kind and renders it.
+
+    Args:
+        output_format (str): One of report_renderers.OUTPUT_FORMATS, or None for the report object itself.
+
+    Returns:
+        str or report object: Messages of file-writing reports are returned as they are.
+    """
+    result = REPORT_KINDS[kind][0](conn, argument, **options)
+    if output_format is None or isinstance(result, str):
+        return result
+    return rend.render(result, output_format)
+
+
+def parse_job(spec):
+    """
+    Parses a 'kind:argument' job spec such as 'day:20240105', 'period:7', 'month:202401' or 'heatmap:2024'.
+
+    Returns:
+        tuple: (kind, argument, options)
+
+    Raises:
+        ValueError: If the kind is unknown or the argument malformed.
+    """
+    kind, _, argument = spec.partition(':')
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report kind '{kind}' in '{spec}'. Expected one of {', '.join(REPORT_KINDS)}.")
+    if not re.match(REPORT_KINDS[kind][1], argument):
+        raise ValueError(f"Invalid argument '{argument}' for a {kind} report.")
+    return kind, argument, {}
+
+
+def generate_reports(jobs, manager, max_workers=None, output_format='text'):
+    """
+    Runs many reports at once in a thread pool, each on its thread's read-only connection
+    from the ConnectionManager, so their SQLite work overlaps.
+
+    Args:
+        jobs (list): (kind, argument) or (kind, argument, options) tuples; kinds are the
+                     keys of REPORT_KINDS, options are passed to the report function
+                     (heatmap: output_file, drilldown, threshold_mode).
+        manager (ConnectionManager): Provides the per-thread connections.
+        max_workers (int): Thread count (default: the ThreadPoolExecutor default).
+        output_format (str): How 'text' is rendered (see run_report); None keeps the report objects.
+
+    Returns:
+        list: One dict per job, in job order: {'kind', 'argument', 'text', 'error', 'seconds'};
+              'error' holds the exception message if the report failed, 'text' is None then.
+    """
+    def run(job):
+        kind, argument, options = job if len(job) == 3 else (*job, {})
+        start_time = time.perf_counter()
+        try:
+            with instrumentation.span('report', kind=kind, argument=argument):
+                text, error = run_report(manager.reader(), kind, argument, output_format, **options), None
+        except Exception as e:
+            text, error = None, f"{type(e).__name__}: {e}"
+        return {'kind': kind, 'argument': argument, 'text': text, 'error': error,
+                'seconds': time.perf_counter() - start_time}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many reports concurrently, e.g. for a nightly run.")
+    parser.add_argument("jobs", nargs='+', help="Report specs: day:YYYYMMDD, raw:YYYYMMDD, period:N, month:YYYYMM, heatmap:YYYY.")
+    parser.add_argument("--db", default=di.DEFAULT_DB_PATH, help=f"Database file (default: {di.DEFAULT_DB_PATH}).")
+    parser.add_argument("-j", "--workers", type=int, help="Worker threads (default: the thread pool default).")
+    parser.add_argument("--drilldown", action='store_true', help="Include clickable per-day breakdowns in heatmaps.")
+    parser.add_argument("--format", choices=rend.OUTPUT_FORMATS, default='text', help="Report output format (default: text).")
+    args = parser.parse_args()
+
+    try:
+        jobs = [parse_job(spec) for spec in args.jobs]
+    except ValueError as e:
+        parser.error(str(e))
+    if args.drilldown:
+        jobs = [(kind, argument, {'drilldown': True} if kind == 'heatmap' else options) for kind, argument, options in jobs]
+    if not os.path.exists(args.db):
+        parser.error(f"database not found: {args.db}")
+
+    instrumentation.enable_from_environment()
+    manager = cm.ConnectionManager(args.db)
+    try:
+        start_time = time.perf_counter()
+        results = generate_reports(jobs, manager, max_workers=args.workers, output_format=args.format)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        manager.close()
+
+    for result in results:
+        if result['error']:
+            print(f"\n[{result['kind']}:{result['argument']}] failed: {result['error']}", file=sys.stderr)
+        else:
+            print(result['text'])
+    failed_count = sum(1 for result in results if result['error'])
+    print(f"\nGenerated {len(results) - failed_count} of {len(results)} report(s) in {elapsed:.3f} seconds.", file=sys.stderr)
+    if failed_count:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
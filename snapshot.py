@@ -0,0 +1,346 @@
+# snapshot.py
+import os
+import mmap
+import array
+import atexit
+import bisect
+import struct
+import sqlite3
+import argparse
+import database_importer as di
+import heatmap_generator as hg
+import instrumentation
+
+SNAPSHOT_SUFFIX = '.snap'
+MAGIC = b'TMSNAP\r\n'
+VERSION = 1
+BYTE_ORDER_MARK = 0x01020304 # Written in the writer's byte order; a loader with another order refuses the file
+SECTIONS = (
+    # name, array typecode; every section starts on an 8-byte boundary
+    ('dates', 'I'),         # [days] YYYYMMDD as an integer, ascending
+    ('status', 'B'),        # [days] 1 if the day's status is 'True'
+    ('getup', 'h'),         # [days] getup time in minutes after midnight, -1 if unknown
+    ('parents', 'i'),       # [projects] index of the parent project, -1 for top-level names
+    ('name_offsets', 'I'),  # [projects + 1] byte offsets into names
+    ('names', 'B'),         # UTF-8 project names, back to back, sorted
+    ('matrix', 'I'),        # [days * projects] seconds recorded directly on each project, row per day
+)
+_HEADER = struct.Struct('=8sIIII' + 'QQ' * len(SECTIONS)) # magic, version, BOM, days, projects, (offset, length) per section
+
+
+def snapshot_path(db_path):
+    """The snapshot file kept next to a database file."""
+    return db_path + SNAPSHOT_SUFFIX
+
+
+def _getup_minutes(getup_time):
+    hours, _, minutes = (getup_time or '').partition(':')
+    if not (hours.isdigit() and minutes.isdigit()):
+        return -1
+    return int(hours) * 60 + int(minutes)
+
+
+def write_snapshot(conn, path):
+    """
+    Writes the day x project duration matrix, the project dictionary and hierarchy, and
+    the per-day status/getup arrays of a database to a snapshot file.
+
+    The file is written beside path and renamed over it, so processes that have the old
+    snapshot mapped keep reading it undisturbed.
+
+    Args:
+        conn (sqlite3.Connection): The database connection object.
+        path (str): The snapshot file.
+
+    Returns:
+        tuple: (day count, project count)
+    """
+    with instrumentation.span('write_snapshot') as span:
+        cursor = conn.cursor()
+        days = {date: (status, getup) for date, status, getup in cursor.execute('SELECT date, status, getup_time FROM days')}
+        cursor.execute('SELECT DISTINCT date FROM time_records')
+        for (date,) in cursor.fetchall():
+            days.setdefault(date, ('False', None))
+        dates = sorted(days)
+        day_index = {date: i for i, date in enumerate(dates)}
+
+        parent_map = dict(cursor.execute('SELECT child, parent FROM parent_child'))
+        cursor.execute('SELECT DISTINCT project_path FROM time_records')
+        names = sorted(set(parent_map) | set(parent_map.values()) | {path for (path,) in cursor.fetchall()})
+        project_index = {name: i for i, name in enumerate(names)}
+
+        encoded_names = [name.encode('utf-8') for name in names]
+        name_offsets = array.array('I', [0])
+        for encoded in encoded_names:
+            name_offsets.append(name_offsets[-1] + len(encoded))
+
+        project_count = len(names)
+        matrix = array.array('I', bytes(4 * len(dates) * project_count))
+        cursor.execute('SELECT date, project_path, SUM(duration) FROM time_records GROUP BY date, project_path')
+        for date, project_path, duration in cursor:
+            matrix[day_index[date] * project_count + project_index[project_path]] = duration
+
+        arrays = {
+            'dates': array.array('I', (int(date) for date in dates)),
+            'status': array.array('B', (days[date][0] == 'True' for date in dates)),
+            'getup': array.array('h', (_getup_minutes(days[date][1]) for date in dates)),
+            'parents': array.array('i', (project_index.get(parent_map.get(name), -1) for name in names)),
+            'name_offsets': name_offsets,
+            'names': array.array('B', b''.join(encoded_names)),
+            'matrix': matrix,
+        }
+
+        table, offset = [], _HEADER.size
+        for name, _ in SECTIONS:
+            offset = (offset + 7) // 8 * 8
+            length = len(arrays[name]) * arrays[name].itemsize
+            table += [offset, length]
+            offset += length
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(dates), project_count, *table))
+            for (name, _), section_offset in zip(SECTIONS, table[::2]):
+                f.write(bytes(section_offset - f.tell()))
+                arrays[name].tofile(f)
+        os.replace(temp_path, path)
+        span.count('days_written', len(dates))
+        span.count('projects_written', project_count)
+        span.count('bytes_written', offset)
+    return len(dates), project_count
+
+
+# Database files written since their snapshot was last rebuilt (see mark_stale)
+_stale_db_paths = set()
+_refresh_at_exit_registered = False
+
+
+def _connection_db_path(conn):
+    """The file behind conn's main database; '' for in-memory databases."""
+    return next((file for _, name, file in conn.execute('PRAGMA database_list') if name == 'main'), '')
+
+
+def mark_stale(conn):
+    """
+    Notes that conn's database was written to. If the database has a snapshot, it is rebuilt
+    by the next refresh_stale() call, so a batch of imports rebuilds it once rather than once
+    per import. Snapshots still stale when the process exits are rebuilt then.
+    """
+    global _refresh_at_exit_registered
+    db_path = _connection_db_path(conn)
+    if not db_path or not os.path.exists(snapshot_path(db_path)):
+        return
+    _stale_db_paths.add(db_path)
+    if not _refresh_at_exit_registered:
+        atexit.register(refresh_stale)
+        _refresh_at_exit_registered = True
+
+
+def refresh_stale():
+    """
+    Rebuilds every snapshot marked stale since the last call. Call it when a batch of imports
+    (a directory, a watcher tick) is done.
+
+    Returns:
+        int: The number of snapshots rebuilt.
+    """
+    rebuilt_count = 0
+    while _stale_db_paths:
+        db_path = _stale_db_paths.pop()
+        if not os.path.exists(snapshot_path(db_path)):
+            continue
+        conn = sqlite3.connect(db_path)
+        try:
+            write_snapshot(conn, snapshot_path(db_path))
+        finally:
+            conn.close()
+        rebuilt_count += 1
+    return rebuilt_count
+
+
+def refresh_snapshot(conn, db_path=None):
+    """
+    Rewrites a database's snapshot now, but only if one has been built for it.
+
+    Args:
+        conn (sqlite3.Connection): A connection with the current data.
+        db_path (str): The database file (default: the file conn is connected to;
+                       in-memory connections have none and are skipped).
+
+    Returns:
+        bool: True if the snapshot was rewritten.
+    """
+    if db_path is None:
+        db_path = _connection_db_path(conn)
+    if not db_path or not os.path.exists(snapshot_path(db_path)):
+        return False
+    write_snapshot(conn, snapshot_path(db_path))
+    _stale_db_paths.discard(db_path)
+    return True
+
+
+class Snapshot:
+    """
+    A snapshot file mapped into memory.
+
+    Opening one reads only the fixed-size header: the arrays are memoryviews cast straight
+    onto the mapping (dates, status, getup, parents, matrix), so pages are loaded by the OS
+    as they are touched and nothing is decoded up front. The matrix is flat; the seconds of
+    project p on day d are matrix[d * project_count + p]. Views taken from these arrays
+    must be released before close().
+
+    Use it as `with Snapshot(path) as snap: snap.daily_totals('study', '20240101', '20241231')`.
+
+    Raises:
+        ValueError: If the file is not a snapshot of this version and byte order.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER.size:
+                raise ValueError(f"{path} is not a snapshot file.")
+            magic, version, byte_order_mark, self.day_count, self.project_count, *table = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a snapshot file.")
+            if version != VERSION or byte_order_mark != BYTE_ORDER_MARK:
+                raise ValueError(f"{path} was written by another snapshot version or byte order; rebuild it.")
+            buffer = memoryview(self._mmap)
+            self._views = [buffer]
+            for (name, typecode), offset, length in zip(SECTIONS, table[::2], table[1::2]):
+                view = buffer[offset:offset + length].cast(typecode)
+                self._views.append(view)
+                setattr(self, name, view)
+        except BaseException:
+            self.close()
+            raise
+        self._names = None
+        self._project_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for view in reversed(getattr(self, '_views', [])):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    # --- Dictionaries (decoded on first use) ---
+    @property
+    def project_names(self):
+        if self._names is None:
+            offsets, raw = self.name_offsets, self.names.tobytes()
+            self._names = [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.project_count)]
+        return self._names
+
+    def project_index(self, name):
+        """Column of a project name; raises KeyError if the snapshot has no such project."""
+        if self._project_index is None:
+            self._project_index = {name: i for i, name in enumerate(self.project_names)}
+        return self._project_index[name]
+
+    def day_index(self, date):
+        """Row of a YYYYMMDD date, or None if the snapshot has no such day."""
+        key = int(date)
+        i = bisect.bisect_left(self.dates, key)
+        return i if i < self.day_count and self.dates[i] == key else None
+
+    def _day_range(self, start_date=None, end_date=None):
+        first = bisect.bisect_left(self.dates, int(start_date)) if start_date else 0
+        last = bisect.bisect_right(self.dates, int(end_date)) if end_date else self.day_count
+        return range(first, last)
+
+    # --- Queries ---
+    def subtree_columns(self, name):
+        """Columns of a project and all of its descendants in the parent_child hierarchy."""
+        root = self.project_index(name)
+        columns, depth_cache = [], {root: True}
+        for column in range(self.project_count):
+            chain, node = [], column
+            while node != -1 and node not in depth_cache:
+                chain.append(node)
+                node = self.parents[node]
+            inside = depth_cache.get(node, False)
+            for visited in chain:
+                depth_cache[visited] = inside
+            if inside:
+                columns.append(column)
+        return columns
+
+    def day_durations(self, date):
+        """Seconds recorded directly on each project on a day, as {project_path: seconds}."""
+        row = self.day_index(date)
+        if row is None:
+            return {}
+        base = row * self.project_count
+        names = self.project_names
+        return {names[p]: self.matrix[base + p] for p in range(self.project_count) if self.matrix[base + p]}
+
+    def daily_totals(self, name, start_date=None, end_date=None):
+        """
+        Seconds spent per day on a project including its sub-projects, e.g. daily_totals('study')
+        gives what HeatmapDataFetcher.fetch_yearly_study_times reads from SQLite.
+
+        Returns:
+            dict: {'YYYYMMDD': seconds} for the days in range with a non-zero total.
+        """
+        columns = self.subtree_columns(name)
+        totals = {}
+        for row in self._day_range(start_date, end_date):
+            base = row * self.project_count
+            total = sum(self.matrix[base + p] for p in columns)
+            if total:
+                totals[str(self.dates[row])] = total
+        return totals
+
+    def day_info(self, date):
+        """The (status, getup_time) of a day in the database's text form, or None if the day is missing."""
+        row = self.day_index(date)
+        if row is None:
+            return None
+        minutes = self.getup[row]
+        return ('True' if self.status[row] else 'False'), (f"{minutes // 60:02d}:{minutes % 60:02d}" if minutes >= 0 else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and use memory-mappable database snapshots.")
+    parser.add_argument("--db", default=di.DEFAULT_DB_PATH, help=f"Database file (default: {di.DEFAULT_DB_PATH}).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help="Write (or rewrite) the snapshot; imports keep it current afterwards.")
+    subparsers.add_parser('info', help="Show what the snapshot holds.")
+    heatmap_parser = subparsers.add_parser('heatmap', help="Generate a study heatmap from the snapshot alone.")
+    heatmap_parser.add_argument("year", type=int)
+    heatmap_parser.add_argument("-o", "--output", help="Output HTML file (default: study_heatmap_<year>.html).")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_environment()
+    path = snapshot_path(args.db)
+    if args.command == 'build':
+        if not os.path.exists(args.db):
+            parser.error(f"database not found: {args.db}")
+        conn = sqlite3.connect(args.db)
+        try:
+            day_count, project_count = write_snapshot(conn, path)
+        finally:
+            conn.close()
+        print(f"Snapshot written: {path} ({day_count} days x {project_count} projects, {os.path.getsize(path)} bytes)")
+        return
+
+    if not os.path.exists(path):
+        parser.error(f"snapshot not found: {path} (run 'build' first)")
+    with Snapshot(path) as snap:
+        if args.command == 'info':
+            first, last = (snap.dates[0], snap.dates[-1]) if snap.day_count else ('-', '-')
+            print(f"{path}: {snap.day_count} days ({first} - {last}), {snap.project_count} projects, {os.path.getsize(path)} bytes")
+        else:
+            output_file = args.output or f"study_heatmap_{args.year}.html"
+            study_data = snap.daily_totals('study', f"{args.year}0101", f"{args.year}1231")
+            hg.HeatmapGenerator(args.year, study_data).generate_html_output(output_file)
+            print(f"Study heatmap generated: {output_file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+# team_storage.py
+import os
+import re
+import sqlite3
+import pathlib
+import argparse
+import datetime
+import calendar
+from concurrent.futures import ThreadPoolExecutor
+import database_importer as di
+import database_querier as dq
+import heatmap_generator as hg
+import ingest_pipeline as ip
+import instrumentation
+import snapshot
+
+DEFAULT_TEAM_DIR = 'team_data'
+USER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$') # Shard file names are <user>.db
+HEATMAP_AGGREGATES = ('mean', 'sum')
+
+
+class TeamStore:
+    """
+    Keeps one SQLite shard per user (<team_dir>/<user>.db, with the usual schema), so
+    imports only ever touch one user's file and team reports fan out across the shards
+    in a thread pool. Each worker opens its own read-only connection; sqlite3 releases
+    the GIL while a statement runs, so the shards' queries overlap, and the per-user
+    results are merged afterwards (trees with database_querier.merge_project_trees).
+    """
+    def __init__(self, team_dir=DEFAULT_TEAM_DIR, max_workers=None):
+        self.team_dir = team_dir
+        self.max_workers = max_workers
+
+    def users(self):
+        """Returns the users that have a shard, sorted by name."""
+        if not os.path.isdir(self.team_dir):
+            return []
+        return sorted(name[:-3] for name in os.listdir(self.team_dir)
+                      if name.endswith('.db') and USER_NAME_PATTERN.match(name[:-3]))
+
+    def shard_path(self, user):
+        if not USER_NAME_PATTERN.match(user):
+            raise ValueError(f"Invalid user name '{user}': use letters, digits, '_', '-' and '.'.")
+        return os.path.join(self.team_dir, f"{user}.db")
+
+    def connect(self, user):
+        """Opens a read-only connection to a user's shard."""
+        return sqlite3.connect(pathlib.Path(self.shard_path(user)).resolve().as_uri() + '?mode=ro', uri=True)
+
+    def import_for_user(self, user, parsed_data, replace=False):
+        """
+        Imports parsed day objects into one user's shard, creating it if needed.
+
+        Args:
+            user (str): The user the days belong to.
+            parsed_data (list): The intermediate data from FileDataParser.
+            replace (bool): Delete the stored records of each day first (see DatabaseImporter.replace_days).
+        """
+        path = self.shard_path(user)
+        os.makedirs(self.team_dir, exist_ok=True)
+        conn = di.init_db(path)
+        try:
+            if replace:
+                di.replace_days_in_db(conn, parsed_data)
+            else:
+                di.import_to_db(conn, parsed_data)
+        finally:
+            conn.close()
+
+    def fan_out(self, job, users=None):
+        """
+        Runs job(conn) once per user shard in a thread pool.
+
+        Returns:
+            dict: user -> whatever job returned for that user's shard.
+        """
+        users = list(users) if users is not None else self.users()
+        if not users:
+            return {}
+
+        def run(user):
+            with instrumentation.span('shard_job', user=user):
+                conn = self.connect(user)
+                try:
+                    return job(conn)
+                finally:
+                    conn.close()
+
+        with instrumentation.span('team_fan_out') as span:
+            with ThreadPoolExecutor(max_workers=self.max_workers or min(len(users), (os.cpu_count() or 1) + 4)) as executor:
+                results = dict(zip(users, executor.map(run, users)))
+            span.count('shards', len(users))
+        return results
+
+    # --- Team reports ---
+    def range_summary(self, start_date, end_date, users=None):
+        """
+        Aggregates every user's records between two YYYYMMDD dates.
+
+        Returns:
+            dict: {'users': {user: {'total', 'days', 'status_true_days', 'tree'}},
+                   'total', 'user_days', 'tree'}, where 'user_days' counts (user, day)
+                   pairs with records and 'tree' is the merged project tree.
+        """
+        per_user = self.fan_out(lambda conn: _summarize_shard_range(conn, start_date, end_date), users)
+        return {
+            'users': per_user,
+            'total': sum(summary['total'] for summary in per_user.values()),
+            'user_days': sum(summary['days'] for summary in per_user.values()),
+            'tree': dq.merge_project_trees(summary['tree'] for summary in per_user.values()),
+        }
+
+    def fetch_team_study_times(self, year, aggregate='mean', users=None):
+        """
+        Daily study time across the team, for HeatmapGenerator.
+
+        Args:
+            year (int): The year to fetch.
+            aggregate (str): 'mean' averages over the users who studied that day (so the
+                             heatmap's per-person hour thresholds still apply), 'sum' adds them up.
+
+        Returns:
+            dict: Date strings ('YYYYMMDD') to study seconds.
+        """
+        if aggregate not in HEATMAP_AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}'. Expected one of {HEATMAP_AGGREGATES}.")
+        per_user = self.fan_out(lambda conn: hg.HeatmapDataFetcher(conn).fetch_yearly_study_times(year), users)
+        totals, user_counts = {}, {}
+        for study_times in per_user.values():
+            for date, seconds in study_times.items():
+                totals[date] = totals.get(date, 0) + seconds
+                user_counts[date] = user_counts.get(date, 0) + 1
+        if aggregate == 'sum':
+            return totals
+        return {date: round(total / user_counts[date]) for date, total in totals.items()}
+
+    def fetch_team_day_breakdowns(self, year, users=None):
+        """
+        Per-day breakdowns for the heatmap drill-down, merged across users: totals and
+        trees are added up, status counts the users whose day was True, getup shows the
+        earliest and latest wake-up and the remark lists who has records that day.
+        """
+        per_user = self.fan_out(lambda conn: hg.HeatmapDataFetcher(conn).fetch_yearly_day_breakdowns(year), users)
+        days_by_date = {}
+        for user, breakdowns in per_user.items():
+            for date, day in breakdowns.items():
+                days_by_date.setdefault(date, []).append((user, day))
+
+        merged = {}
+        for date, user_days in days_by_date.items():
+            getups = sorted(day['getup'] for _, day in user_days)
+            true_count = sum(1 for _, day in user_days if day['status'] == 'True')
+            merged[date] = {
+                'status': f"{true_count}/{len(user_days)} True",
+                'getup': getups[0] if getups[0] == getups[-1] else f"{getups[0]}-{getups[-1]}",
+                'remark': 'Users: ' + ', '.join(user for user, _ in user_days),
+                'total': sum(day['total'] for _, day in user_days),
+                'tree': dq.merge_project_trees(day['tree'] for _, day in user_days),
+            }
+        return merged
+
+
+def _summarize_shard_range(conn, start_date, end_date):
+    """Per-shard work of range_summary; the grouping is done by SQLite so little Python work holds the GIL."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT project_path, SUM(duration)
+        FROM time_records
+        WHERE date BETWEEN ? AND ?
+        GROUP BY project_path
+    ''', (start_date, end_date))
+    records = cursor.fetchall()
+    cursor.execute('SELECT COUNT(DISTINCT date) FROM time_records WHERE date BETWEEN ? AND ?', (start_date, end_date))
+    day_count = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT SUM(CASE WHEN status = 'True' THEN 1 ELSE 0 END) FROM days WHERE date BETWEEN ? AND ?",
+                   (start_date, end_date))
+    status_true_days = cursor.fetchone()[0] or 0
+    return {
+        'total': sum(duration for _, duration in records),
+        'days': day_count,
+        'status_true_days': status_true_days,
+        'tree': dq.build_project_tree(records, dq.get_parent_map(conn)),
+    }
+
+
+def print_team_summary(title, summary):
+    """Prints a range_summary result in the style of the single-user reports."""
+    avg_days = summary['user_days'] if summary['user_days'] > 0 else 1
+    print(f"\n{title}, {len(summary['users'])} user(s)")
+    print(f"Overall Total Time: {dq.time_format_duration(summary['total'], avg_days)}")
+    print(f"User-days with time records: {summary['user_days']}")
+    if summary['users']:
+        print("Per user:")
+        for user, user_summary in sorted(summary['users'].items(), key=lambda item: item[1]['total'], reverse=True):
+            print(f"  {user}: {dq.time_format_duration(user_summary['total'], user_summary['days'] or 1)}, "
+                  f"{user_summary['days']} day(s), {user_summary['status_true_days']} True")
+    if not summary['tree']:
+        print("\nNo time records found for this period.")
+        return
+    for top_level, subtree_data in sorted(summary['tree'].items(), key=lambda x: x[1]['duration'], reverse=True):
+        output_lines = [f"\n{top_level}: {dq.time_format_duration(subtree_data['duration'], avg_days)}"]
+        output_lines.extend(dq.generate_sorted_output(subtree_data, avg_days=avg_days, indent=1))
+        print('\n'.join(output_lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user time databases with team-wide reports.")
+    parser.add_argument("--team-dir", default=DEFAULT_TEAM_DIR, help=f"Directory holding one <user>.db per user (default: {DEFAULT_TEAM_DIR}).")
+    parser.add_argument("--workers", type=int, help="Threads for team reports (default: one per user, capped by the CPU count + 4).")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('users', help="List the users with a shard.")
+    import_parser = commands.add_parser('import', help="Ingest .txt files into one user's shard.")
+    import_parser.add_argument("user")
+    import_parser.add_argument("paths", nargs='+', help=".txt files or directories to ingest.")
+    import_parser.add_argument("--policy", choices=ip.INGEST_POLICIES, default='reject', help="How to handle days with errors (default: reject).")
+    import_tree_parser = commands.add_parser('import-tree', help="Ingest <root>/<user>/**.txt, routing each file to its user's shard.")
+    import_tree_parser.add_argument("root")
+    import_tree_parser.add_argument("--policy", choices=ip.INGEST_POLICIES, default='reject', help="How to handle days with errors (default: reject).")
+    period_parser = commands.add_parser('period', help="Team statistics for the last N days.")
+    period_parser.add_argument("days", type=int)
+    month_parser = commands.add_parser('month', help="Team statistics for a month.")
+    month_parser.add_argument("year_month", help="YYYYMM")
+    heatmap_parser = commands.add_parser('heatmap', help="Team study heatmap for a year.")
+    heatmap_parser.add_argument("year", type=int)
+    heatmap_parser.add_argument("--aggregate", choices=HEATMAP_AGGREGATES, default='mean', help="Per-day mean over active users or team sum (default: mean).")
+    heatmap_parser.add_argument("--drilldown", action='store_true', help="Include clickable per-day team breakdowns.")
+    args = parser.parse_args()
+
+    instrumentation.enable_from_environment()
+    store = TeamStore(args.team_dir, max_workers=args.workers)
+    try:
+        if args.command == 'users':
+            for user in store.users():
+                print(user)
+        elif args.command in ('import', 'import-tree'):
+            pipeline = ip.IngestPipeline(policy=args.policy)
+            if args.command == 'import':
+                store.shard_path(args.user) # Validate the name before reading anything
+                jobs = [(args.user, os.path.normpath(path)) for path in args.paths]
+            else:
+                root = os.path.normpath(args.root)
+                jobs = [(user, os.path.join(root, user)) for user in sorted(os.listdir(root))
+                        if os.path.isdir(os.path.join(root, user)) and USER_NAME_PATTERN.match(user)]
+            for user, input_path in jobs:
+                for filepath in ip.iter_txt_files(input_path):
+                    result = pipeline.ingest_file(filepath)
+                    if result.parsed_data:
+                        store.import_for_user(user, result.parsed_data)
+                    ip.print_ingest_summary(result)
+            snapshot.refresh_stale()
+        elif args.command == 'period':
+            end_date = datetime.datetime.now()
+            start_date = end_date - datetime.timedelta(days=args.days - 1)
+            start_str, end_str = start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d")
+            print_team_summary(f"[Team: Last {args.days} Days Statistics] ({start_str} - {end_str})", store.range_summary(start_str, end_str))
+        elif args.command == 'month':
+            if not re.match(r'^\d{6}$', args.year_month) or not 1 <= int(args.year_month[4:]) <= 12:
+                parser.error("Invalid month format. Please use YYYYMM.")
+            year, month = int(args.year_month[:4]), int(args.year_month[4:])
+            start_str, end_str = f"{args.year_month}01", f"{args.year_month}{calendar.monthrange(year, month)[1]:02d}"
+            print_team_summary(f"[Team: {args.year_month} Monthly Statistics]", store.range_summary(start_str, end_str))
+        elif args.command == 'heatmap':
+            study_data = store.fetch_team_study_times(args.year, aggregate=args.aggregate)
+            drilldown_data = store.fetch_team_day_breakdowns(args.year) if args.drilldown else None
+            output_file = f"team_study_heatmap_{args.year}.html"
+            hg.HeatmapGenerator(args.year, study_data, drilldown_data=drilldown_data).generate_html_output(output_file)
+            print(f"Team study heatmap generated: {output_file}")
+    except ValueError as e:
+        parser.exit(1, f"Error: {e}\n")
+
+if __name__ == '__main__':
+    main()
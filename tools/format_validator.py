@@ -4,6 +4,11 @@ import time  # 时间模块，用于计时操作
 import json  # JSON模块，用于处理JSON格式的配置文件
 import os   # 操作系统模块，用于文件和目录路径操作
 import argparse # 导入 argparse 模块
+import contextlib # 用于在工作进程中屏蔽配置加载时的重复输出
+import io # 配合 contextlib 丢弃输出
+import hashlib # 计算文件内容和配置的哈希，作为校验缓存的键
+import xml.etree.ElementTree as ET # 生成 JUnit-XML 报告
+from concurrent.futures import ProcessPoolExecutor # 进程池，用于 --jobs 并行校验
 
 # 定义一个类，用于在控制台输出带颜色的文本，以增强可读性
 class Colors:
@@ -12,8 +17,125 @@ class Colors:
     YELLOW = '\033[93m' # ANSI转义码：亮黄色
     RESET = '\033[0m'   # ANSI转义码：重置颜色，恢复到默认终端颜色
 
-# 定义配置文件的路径常量
-CONFIG_FILE_PATH = "activity_validator_config.json"
+# 定义配置文件的路径常量 (与本脚本位于同一目录，避免依赖当前工作目录)
+CONFIG_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "format_validator_config.json")
+
+# 校验结果缓存文件的默认路径 (位于当前工作目录)
+CACHE_FILE_PATH = ".format_validator_cache.json"
+# 缓存格式版本：校验规则或错误格式变化时递增，使旧缓存全部失效
+CACHE_FORMAT_VERSION = 6
+
+# 预编译的正则表达式，避免每一行都重新查找/编译模式
+DATE_LINE_PATTERN = re.compile(r'Date:\d{8}') # Date:YYYYMMDD
+STATUS_LINE_PATTERN = re.compile(r'Status:(True|False)') # Status:True 或 Status:False
+GETUP_LINE_PATTERN = re.compile(r'Getup:\d{2}:\d{2}') # Getup:HH:MM
+TIME_LINE_PATTERN = re.compile(r'^(\d{2}:\d{2})~(\d{2}:\d{2})([a-zA-Z0-9_-]+)$') # HH:MM~HH:MM文本内容
+ACTIVITY_TEXT_PATTERN = re.compile(r'^\d{2}:\d{2}~\d{2}:\d{2}(.*)$') # 提取活动行的文本部分
+
+# 前缀字典树中标记"此处结束一个 父类别_ 前缀"的键
+_TRIE_TERMINAL = None
+
+# 诊断代码 -> 消息模板。模板渲染后的文本与控制台输出的错误信息完全一致
+DIAGNOSTIC_MESSAGES = {
+    'date-prefix': "第{line}行错误:Date行缺少冒号或前缀不正确",
+    'date-format': "第{line}行错误:Date格式应为YYYYMMDD",
+    'status-value': "第{line}行错误:Status必须为True或False",
+    'getup-format': "第{line}行错误:Getup时间格式不正确 (应为 Getup:HH:MM)",
+    'getup-time': "第{line}行错误:Getup时间无效 ({time})",
+    'remark-prefix': "第{line}行错误:Remark格式不正确 (应以 'Remark:' 开头)",
+    'time-line-format': "第{line}行错误:时间行格式错误 (应为 HH:MM~HH:MM文本内容)",
+    'label-parent-only': "第{line}行错误:文本内容 '{label}' 为父级类别，不够具体，不能单独使用。",
+    'label-not-in-category': "第{line}行错误:文本内容 '{label}' 在类别 '{category}' 中无效。允许的 '{category}' 内容例如: {examples} 等。",
+    'label-unknown': "第{line}行错误:无效的文本内容 '{label}'。它不属于任何已定义的类别 (如 'code_', 'routine_') 或并非这些类别下允许的具体活动。允许的具体活动例如: {examples} 等。",
+    'label-no-categories': "第{line}行错误:无效的文本内容 '{label}'。没有定义允许的活动类别。",
+    'start-time-value': "第{line}行错误:开始时间值无效 ({time})",
+    'end-time-value': "第{line}行错误:结束时间值无效 ({time})",
+    'end-minute-before-start': "第{line}行错误:当小时相同时，结束时间分钟数({end_minute:02d})不应小于开始时间分钟数({start_minute:02d})",
+    'header-prefix': "第{line}行错误:应为 '{header}:' 开头，实际为 '{content}...'",
+    'header-missing': "文件在第{line}行的Date块后意外结束，缺少 {header} 行。",
+    'status-should-be-true': "第{line}行错误: Status应为 Status:True (因活动包含 'study')，但找到 Status:False。",
+    'status-should-be-false': "第{line}行错误: Status应为 Status:False (因活动不包含 'study')，但找到 Status:True。",
+    'file-start-not-date': "第{line}行错误: 文件应以 'Date:YYYYMMDD' 格式的行开始。当前行为: '{content}...'",
+    'unexpected-content': "第{line}行错误: 意外的内容，此处应为新的 'Date:' 块或文件末尾。内容: '{content}...'",
+    'no-date-block': "错误: 文件不包含任何以 'Date:YYYYMMDD' 开头的有效数据块。",
+    'interval-overlap': "第{line}行错误:时间段与第{other_line}行的时间段重叠了 {minutes} 分钟",
+    'interval-gap': "第{line}行警告:与第{other_line}行的时间段之间有 {minutes} 分钟的空档 (阈值为 {threshold} 分钟)",
+    'day-over-24h': "第{line}行警告:当天的时间段合计 {minutes} 分钟，超过了24小时 (实际覆盖 {covered_minutes} 分钟)",
+    'file-unreadable': "文件读取失败或无法访问。",
+}
+
+# 定义诊断信息类：一条结构化的校验结果 (代码、行号、严重程度、消息参数、文件)
+class Diagnostic:
+    __slots__ = ('code', 'line', 'severity', 'params', 'file')
+
+    def __init__(self, code, line=None, severity='error', file=None, **params):
+        """
+        构造函数，初始化一条诊断信息。
+        :param code: 诊断代码，对应 DIAGNOSTIC_MESSAGES 中的键。
+        :param line: 相关的行号 (从1开始)，与具体行无关时为None。
+        :param severity: 严重程度，'error' 或 'warning'。
+        :param file: 所属文件的路径。
+        :param params: 渲染消息模板所需的参数。
+        """
+        self.code = code
+        self.line = line
+        self.severity = severity
+        self.params = params
+        self.file = file
+
+    @property
+    def message(self):
+        """渲染后的中文消息文本。"""
+        return DIAGNOSTIC_MESSAGES[self.code].format(line=self.line, **self.params)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"Diagnostic({self.code!r}, line={self.line!r}, severity={self.severity!r}, params={self.params!r})"
+
+    def _key(self):
+        """用于去重和比较的键，只包含结构化字段。"""
+        return (self.file, self.line, self.code, self.severity, tuple(sorted(self.params.items())))
+
+    def __eq__(self, other):
+        return isinstance(other, Diagnostic) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def to_dict(self):
+        """
+        转换为可序列化为JSON的字典。
+        :return: 包含 code, line, severity, params, file, message 的字典。
+        """
+        return {
+            'code': self.code,
+            'line': self.line,
+            'severity': self.severity,
+            'params': self.params,
+            'file': self.file,
+            'message': self.message,
+        }
+
+    @classmethod
+    def from_dict(cls, data, file=None):
+        """
+        从 to_dict() 的结果重建诊断信息。
+        :param data: 字典。
+        :param file: 覆盖字典中的文件路径 (例如缓存条目被另一个同内容文件复用时)。
+        """
+        return cls(data['code'], data.get('line'), data.get('severity', 'error'),
+                   file if file is not None else data.get('file'), **data.get('params', {}))
+
+def sort_and_deduplicate_diagnostics(diagnostics):
+    """
+    对诊断信息去重，并按行号排序 (无行号的排在最前；同一行内保持产生的先后顺序)。
+    :param diagnostics: 诊断信息列表。
+    :return: 新的列表。
+    """
+    unique_diagnostics = dict.fromkeys(diagnostics) # 按首次出现的顺序去重
+    return sorted(unique_diagnostics, key=lambda d: d.line or 0)
 
 # 定义配置管理类，负责加载和管理程序的配置信息
 class ConfigManager:
@@ -25,6 +147,12 @@ class ConfigManager:
         self.config_file_path = config_file_path  # 存储配置文件路径
         self.parent_categories = {}  # 用于存储父类别及其允许的子标签集合的字典
         self.disallowed_standalone_categories = set() # 用于存储不允许单独使用的父类别名称的集合
+        # 以下索引在 load() 时一次性构建，使每行校验的开销只与标签长度有关
+        self.label_to_category = {} # 有效标签 -> 所属父类别
+        self.category_prefix_trie = {} # "父类别_" 前缀的字典树
+        self.category_examples = {} # 父类别 -> 预先拼接好的示例字符串
+        self.all_examples_text = "" # 所有类别的示例字符串 (为空表示配置中没有任何子标签)
+        self.gap_threshold_minutes = None # 同一天相邻时间段之间允许的最大空档 (分钟)，None表示不检查空档
 
     def load(self):
         """
@@ -62,9 +190,60 @@ class ConfigManager:
         self.parent_categories = loaded_parent_categories_temp # 更新实例的父类别字典
         # 不允许单独使用的类别即为所有父类别的名称
         self.disallowed_standalone_categories = set(self.parent_categories.keys())
+        self._build_label_index()
+
+        # 可选的 "GAP_THRESHOLD_MINUTES"：超过此长度的空档会被报告为警告
+        gap_threshold = config_data.get("GAP_THRESHOLD_MINUTES")
+        if gap_threshold is None or (isinstance(gap_threshold, int) and gap_threshold >= 0):
+            self.gap_threshold_minutes = gap_threshold
+        else:
+            print(f"警告: 配置项 'GAP_THRESHOLD_MINUTES' 应为非负整数，已忽略空档检查。")
+            self.gap_threshold_minutes = None
         print(f"配置已从 '{self.config_file_path}' 加载。")
         return True # 配置加载成功
 
+    def _build_label_index(self):
+        """
+        根据 parent_categories 构建查找索引：前缀字典树、有效标签映射和示例字符串。
+        """
+        # 前缀字典树：每个父类别插入 "父类别_"，终止节点记录 (配置中的顺序, 父类别)
+        trie = {}
+        for order, category in enumerate(self.parent_categories):
+            node = trie
+            for char in category + "_":
+                node = node.setdefault(char, {})
+            node[_TRIE_TERMINAL] = (order, category)
+        self.category_prefix_trie = trie
+
+        # 有效标签 -> 父类别：标签的前缀所解析到的父类别必须允许此标签
+        self.label_to_category = {}
+        all_examples = []
+        for category, allowed_children in self.parent_categories.items():
+            self.category_examples[category] = ', '.join(sorted(allowed_children)[:3])
+            all_examples.extend(allowed_children)
+            for label in allowed_children:
+                if self.find_category_for_label(label) == category:
+                    self.label_to_category[label] = category
+        self.all_examples_text = ', '.join(sorted(all_examples)[:3])
+
+    def find_category_for_label(self, label):
+        """
+        沿前缀字典树查找标签以哪个 "父类别_" 开头。
+        多个父类别同时匹配时，返回配置中靠前的那个。
+        :param label: 活动标签。
+        :return: 父类别名称，没有匹配时返回None。
+        """
+        node = self.category_prefix_trie
+        best_match = None
+        for char in label:
+            node = node.get(char)
+            if node is None:
+                break
+            terminal = node.get(_TRIE_TERMINAL)
+            if terminal is not None and (best_match is None or terminal < best_match):
+                best_match = terminal
+        return best_match[1] if best_match else None
+
 # 定义行校验器类，负责校验文件中每一行的格式和内容
 class LineValidator:
     def __init__(self, config_manager: ConfigManager):
@@ -100,10 +279,10 @@ class LineValidator:
         :return: True表示此行是有效的日期行结构（不保证日期本身逻辑正确，只保证格式），False表示结构错误。
         """
         if not line.startswith('Date:'): # 检查是否以 "Date:" 开头
-            errors.append(f"第{line_num}行错误:Date行缺少冒号或前缀不正确")
+            errors.append(Diagnostic('date-prefix', line_num))
             return False
-        elif not re.fullmatch(r'Date:\d{8}', line): # 使用正则表达式完整匹配 "Date:" 后跟8位数字
-            errors.append(f"第{line_num}行错误:Date格式应为YYYYMMDD")
+        elif not DATE_LINE_PATTERN.fullmatch(line): # 使用正则表达式完整匹配 "Date:" 后跟8位数字
+            errors.append(Diagnostic('date-format', line_num))
             return False
         return True # 格式正确
 
@@ -115,8 +294,8 @@ class LineValidator:
         :param errors: 用于收集错误信息的列表。
         """
         # 使用正则表达式完整匹配 "Status:" 后跟 "True" 或 "False"
-        if not re.fullmatch(r'Status:(True|False)', line):
-            errors.append(f"第{line_num}行错误:Status必须为True或False")
+        if not STATUS_LINE_PATTERN.fullmatch(line):
+            errors.append(Diagnostic('status-value', line_num))
 
     def check_getup_line(self, line, line_num, errors):
         """
@@ -126,12 +305,12 @@ class LineValidator:
         :param errors: 用于收集错误信息的列表。
         """
         # 使用正则表达式匹配 "Getup:" 后跟 HH:MM 格式
-        if not re.fullmatch(r'Getup:\d{2}:\d{2}', line):
-            errors.append(f"第{line_num}行错误:Getup时间格式不正确 (应为 Getup:HH:MM)")
+        if not GETUP_LINE_PATTERN.fullmatch(line):
+            errors.append(Diagnostic('getup-format', line_num))
         else:
             time_part = line[6:] # 提取时间部分 (HH:MM)
             if not self.validate_time_format(time_part): # 使用静态方法校验时间值的有效性
-                errors.append(f"第{line_num}行错误:Getup时间无效 ({time_part})")
+                errors.append(Diagnostic('getup-time', line_num, time=time_part))
 
     def check_remark_line(self, line, line_num, errors):
         """
@@ -141,7 +320,7 @@ class LineValidator:
         :param errors: 用于收集错误信息的列表。
         """
         if not line.startswith('Remark:'): # 检查是否以 "Remark:" 开头
-            errors.append(f"第{line_num}行错误:Remark格式不正确 (应以 'Remark:' 开头)")
+            errors.append(Diagnostic('remark-prefix', line_num))
 
     def check_time_line(self, line, line_num, errors):
         """
@@ -150,58 +329,45 @@ class LineValidator:
         :param line: 要校验的行内容。
         :param line_num: 当前行号。
         :param errors: 用于收集错误信息的列表。
+        :return: 时间有效时返回 (开始秒数, 结束秒数, 开始时间, 结束时间, 活动标签)，跨夜的时间段结束秒数加一天 (与 data_parser 一致)；否则返回None。
         """
         # 正则表达式匹配 "HH:MM~HH:MM文本内容"
         # ^(\d{2}:\d{2}) : 匹配开头的 HH:MM (开始时间)
         # ~ : 匹配波浪号分隔符
         # (\d{2}:\d{2}) : 匹配 HH:MM (结束时间)
         # ([a-zA-Z0-9_-]+)$ : 匹配由字母、数字、下划线、连字符组成的文本内容，直到行尾
-        match = re.match(r'^(\d{2}:\d{2})~(\d{2}:\d{2})([a-zA-Z0-9_-]+)$', line)
+        match = TIME_LINE_PATTERN.match(line)
         if not match: # 如果不匹配指定格式
-            errors.append(f"第{line_num}行错误:时间行格式错误 (应为 HH:MM~HH:MM文本内容)")
+            errors.append(Diagnostic('time-line-format', line_num))
             return # 格式错误，后续校验无意义
 
         start_time_str, end_time_str, activity_label = match.groups() # 获取匹配到的开始时间、结束时间、活动标签
-        error_added_for_label_check = False # 标记是否已因标签检查添加了错误
+        config = self.config_manager
 
         # 检查活动标签是否是不允许单独使用的父类别
-        if activity_label in self.config_manager.disallowed_standalone_categories:
-            errors.append(f"第{line_num}行错误:文本内容 '{activity_label}' 为父级类别，不够具体，不能单独使用。")
-            error_added_for_label_check = True
-        else:
-            # 如果不是禁止单独使用的父类别，则检查它是否是某个父类别下的有效子标签
-            found_matching_category = False # 标记是否找到了匹配的父类别
-            for parent_category, allowed_children in self.config_manager.parent_categories.items():
-                # 如果活动标签以 "父类别_" 开头 (例如 "code_python")
-                if activity_label.startswith(parent_category + "_"):
-                    found_matching_category = True
-                    # 检查此活动标签是否在允许的子标签集合中
-                    if activity_label not in allowed_children:
-                        # 如果不在，则报错，并给出一些允许的示例
-                        errors.append(f"第{line_num}行错误:文本内容 '{activity_label}' 在类别 '{parent_category}' 中无效。允许的 '{parent_category}' 内容例如: {', '.join(sorted(list(allowed_children))[:3])} 等。")
-                        error_added_for_label_check = True
-                    break # 找到对应的父类别前缀后，无需再检查其他父类别
-
-            # 如果没有找到匹配的父类别前缀，并且之前没有因为标签问题报错
-            if not found_matching_category and not error_added_for_label_check:
-                all_examples = [] # 收集所有配置中定义的子标签作为示例
-                for children in self.config_manager.parent_categories.values():
-                    all_examples.extend(list(children))
-                if all_examples:
-                    # 如果有配置的子标签，报错并给出示例
-                    errors.append(f"第{line_num}行错误:无效的文本内容 '{activity_label}'。它不属于任何已定义的类别 (如 'code_', 'routine_') 或并非这些类别下允许的具体活动。允许的具体活动例如: {', '.join(sorted(all_examples)[:3])} 等。")
-                else:
-                    # 如果配置中没有任何子标签定义
-                    errors.append(f"第{line_num}行错误:无效的文本内容 '{activity_label}'。没有定义允许的活动类别。")
+        if activity_label in config.disallowed_standalone_categories:
+            errors.append(Diagnostic('label-parent-only', line_num, label=activity_label))
+        elif activity_label not in config.label_to_category: # 有效标签直接命中索引，无需再查找父类别
+            # 沿前缀字典树找出标签所属的父类别 (例如 "code_python" -> "code")
+            parent_category = config.find_category_for_label(activity_label)
+            if parent_category is not None:
+                # 标签前缀属于某个父类别，但不在其允许的子标签集合中，报错并给出一些允许的示例
+                errors.append(Diagnostic('label-not-in-category', line_num, label=activity_label, category=parent_category, examples=config.category_examples[parent_category]))
+            elif config.all_examples_text:
+                # 如果有配置的子标签，报错并给出示例
+                errors.append(Diagnostic('label-unknown', line_num, label=activity_label, examples=config.all_examples_text))
+            else:
+                # 如果配置中没有任何子标签定义
+                errors.append(Diagnostic('label-no-categories', line_num, label=activity_label))
 
         # 校验开始时间和结束时间的时间格式
         start_valid = self.validate_time_format(start_time_str)
         end_valid = self.validate_time_format(end_time_str)
 
         if not start_valid:
-            errors.append(f"第{line_num}行错误:开始时间值无效 ({start_time_str})")
+            errors.append(Diagnostic('start-time-value', line_num, time=start_time_str))
         if not end_valid:
-            errors.append(f"第{line_num}行错误:结束时间值无效 ({end_time_str})")
+            errors.append(Diagnostic('end-time-value', line_num, time=end_time_str))
 
         # 如果开始或结束时间格式无效，则后续的时间逻辑比较无意义
         if not (start_valid and end_valid):
@@ -213,7 +379,314 @@ class LineValidator:
         # 检查时间逻辑：如果小时相同，结束时间的分钟数不应小于开始时间的分钟数
         # (注意：这里没有检查结束时间小于开始时间的情况，例如 10:00~09:00，这可能是一个更复杂的业务逻辑，当前脚本未处理跨天或整体时间顺序)
         if start_h == end_h and end_m < start_m:
-            errors.append(f"第{line_num}行错误:当小时相同时，结束时间分钟数({end_m:02d})不应小于开始时间分钟数({start_m:02d})")
+            errors.append(Diagnostic('end-minute-before-start', line_num, start_minute=start_m, end_minute=end_m))
+
+        start_seconds = start_h * 3600 + start_m * 60
+        end_seconds = end_h * 3600 + end_m * 60
+        if end_seconds < start_seconds: # 跨夜的时间段 (例如 23:00~07:00)
+            end_seconds += 86400
+        return start_seconds, end_seconds, start_time_str, end_time_str, activity_label
+
+    def check_day_intervals(self, intervals, date_line_num, errors):
+        """
+        对一天内的所有时间段做扫描线检查：重叠、超过阈值的空档、合计超过24小时。
+        :param intervals: (开始秒数, 结束秒数, 行号) 的列表，已按文件顺序展开到同一条时间线上 (过了午夜的时间段加上 86400)。
+        :param date_line_num: 当天Date行的行号，用于报告合计超过24小时的错误。
+        :param errors: 用于收集错误信息的列表。
+        """
+        gap_threshold_minutes = self.config_manager.gap_threshold_minutes
+        total_seconds = 0 # 所有时间段长度之和 (即报表中统计的时长)
+        covered_seconds = 0 # 所有时间段的并集长度
+        latest_end = None # 扫描到目前为止最晚的结束时间
+        latest_end_line = None # 该结束时间所在的行号
+
+        for start, end, line_num in sorted(intervals): # 按开始时间排序后线性扫描
+            total_seconds += end - start
+            if latest_end is None:
+                covered_seconds += end - start
+            elif start < latest_end:
+                errors.append(Diagnostic('interval-overlap', line_num, other_line=latest_end_line,
+                                         minutes=(min(end, latest_end) - start) // 60))
+                covered_seconds += max(0, end - latest_end)
+            else:
+                gap_minutes = (start - latest_end) // 60
+                if gap_threshold_minutes is not None and gap_minutes > gap_threshold_minutes:
+                    errors.append(Diagnostic('interval-gap', line_num, severity='warning', other_line=latest_end_line,
+                                             minutes=gap_minutes, threshold=gap_threshold_minutes))
+                covered_seconds += end - start
+            if latest_end is None or end > latest_end:
+                latest_end, latest_end_line = end, line_num
+
+        # 一天从起床算到次日起床 (sleep_night)，次日起得更晚时合计会正常地超过24小时；
+        # 真正的重复计时已经作为重叠错误报告，因此这里只作为警告
+        if total_seconds > 86400:
+            errors.append(Diagnostic('day-over-24h', date_line_num, severity='warning', minutes=total_seconds // 60,
+                                     covered_minutes=covered_seconds // 60))
+
+# 定义Date块类：一个结构完整的Date块校验后的结果，同时保存解析出的数据，供校验与解析合一的导入流程使用
+class DayBlock:
+    __slots__ = ('date', 'date_line_num', 'status', 'getup', 'remark', 'time_records', 'raw_lines', 'diagnostics')
+
+    def __init__(self, date, date_line_num, status, getup, remark, time_records, raw_lines, diagnostics):
+        """
+        构造函数，初始化Date块。
+        :param date: 日期字符串 (YYYYMMDD)。
+        :param date_line_num: Date行的行号。
+        :param status: Status行的值，前缀错误时为None。Getup、Remark同理。
+        :param time_records: (开始时间, 结束时间, 活动标签, 时长秒数) 的列表，只包含时间有效的活动行。
+        :param raw_lines: 此块的原始非空行 (行号, 内容) 列表。
+        :param diagnostics: 属于此块的诊断信息列表。
+        """
+        self.date = date
+        self.date_line_num = date_line_num
+        self.status = status
+        self.getup = getup
+        self.remark = remark
+        self.time_records = time_records
+        self.raw_lines = raw_lines
+        self.diagnostics = diagnostics
+
+    @property
+    def has_errors(self):
+        """此块是否有错误级别的诊断信息 (只有警告的块仍视为有效)。"""
+        return any(d.severity == 'error' for d in self.diagnostics)
+
+# 定义流式校验状态机，逐行接收文件内容 (Date -> Status -> Getup -> Remark -> 活动行)
+# 任意时刻只保存当前Date块的头部和活动行，内存占用与文件大小无关
+class StreamingFileValidator:
+    # 状态机的各个状态
+    SEEK_DATE = 0 # Date块之间：跳过空行，等待下一个 "Date:" 行
+    SKIP_TO_DATE = 1 # 跳过无效内容，直到下一个 "Date:" 行
+    HEADERS = 2 # 正在读取 Status / Getup / Remark 头部 (按位置，不论内容)
+    ACTIVITIES = 3 # 正在读取活动行，直到下一个 "Date:" 行
+
+    HEADER_NAMES = ('Status', 'Getup', 'Remark') # Date行之后依次应出现的头部
+
+    def __init__(self, line_validator: 'LineValidator', errors, block_listener=None):
+        """
+        构造函数，初始化状态机。
+        :param line_validator: LineValidator的实例。
+        :param errors: 用于收集错误信息的列表。
+        :param block_listener: 可选的监听器，需提供 on_day(DayBlock) 和 on_malformed(原始行列表, 诊断信息列表) 两个方法。
+                               每个结构完整的Date块校验完毕后调用 on_day；无法组成完整Date块的内容调用 on_malformed。
+        """
+        self.validator = line_validator # 存储行校验器实例
+        self.errors = errors # 错误信息列表
+        self.block_listener = block_listener
+        self.state = self.SEEK_DATE # 当前状态
+        self.processed_any_valid_date_header = False # 标记是否已处理过至少一个 "Date:" 头部
+        self.saw_non_empty_line = False # 标记文件是否有非空内容
+        self._block_error_start = 0 # 当前Date块的第一条诊断信息在错误列表中的下标
+        self._malformed_lines = None # 正在收集的无效区域的原始行 (仅在有监听器时使用)
+        self._malformed_error_start = 0
+        self._reset_block(None)
+
+    def _reset_block(self, date_line_num, date_line=None):
+        """
+        开始一个新的Date块，清空上一个块的状态。
+        :param date_line_num: Date行的行号。
+        :param date_line: Date行的内容。
+        """
+        self.date_line_num = date_line_num # 此Date块开始的实际行号
+        self.date_line = date_line
+        self.header_lines = [] # 已读取的头部行 (行号, 内容)
+        self.activity_lines = [] # 待校验的活动行 (行号, 内容)
+        self.day_contains_study_activity = False # 标记当天活动是否包含 "study"
+
+    def feed(self, line_num, line):
+        """
+        处理一行 (已去除首尾空白) 的内容。
+        :param line_num: 当前行号。
+        :param line: 当前行的内容。
+        """
+        if line:
+            self.saw_non_empty_line = True
+
+        if self.state == self.HEADERS:
+            self._handle_header_line(line_num, line)
+            return
+
+        if self.state == self.ACTIVITIES:
+            if not line.startswith('Date:'): # 直到遇到下一个Date行之前的行都属于当前块
+                if line: # 只处理非空行作为活动行
+                    self._collect_activity_line(line_num, line)
+                return
+            self._finish_block() # 遇到下一个Date行，当前块结束
+            self.state = self.SEEK_DATE
+
+        # 跳过 "Date:" 块之间的空行
+        if not line:
+            return
+
+        if line.startswith('Date:'):
+            self._start_block(line_num, line)
+        elif self.state == self.SKIP_TO_DATE:
+            if self._malformed_lines is not None:
+                self._malformed_lines.append((line_num, line))
+        elif self.state == self.SEEK_DATE:
+            self._begin_malformed_region(len(self.errors), line_num, line)
+            # 如果这是文件开头的一些非 "Date:" 行 (且非空)
+            if not self.processed_any_valid_date_header:
+                self.errors.append(Diagnostic('file-start-not-date', line_num, content=line[:50]))
+                self.processed_any_valid_date_header = True # 标记此错误已报告，避免对后续每个前导非Date行都报告
+            # 如果已经处理过Date块，但现在又遇到一个非空且非Date开头的行
+            else:
+                self.errors.append(Diagnostic('unexpected-content', line_num, content=line[:50]))
+            self.state = self.SKIP_TO_DATE # 跳过这些内容，直到找到下一个 "Date:" 或文件末尾
+
+    def finish(self):
+        """
+        文件读取完毕后调用，结束最后一个Date块并进行最终检查。
+        """
+        if self.state == self.HEADERS:
+            # 文件在头部读取完之前就结束了
+            missing_header = self.HEADER_NAMES[len(self.header_lines)]
+            self.errors.append(Diagnostic('header-missing', self.date_line_num, header=missing_header))
+            # 跳过此Date块的后续处理：从Date行之后重新扫描已读取的头部行，寻找下一个Date行
+            buffered_header_lines = self.header_lines
+            self._begin_malformed_region(self._block_error_start, self.date_line_num, self.date_line)
+            self._reset_block(None)
+            self.state = self.SKIP_TO_DATE
+            for line_num, line in buffered_header_lines:
+                self.feed(line_num, line)
+            self.finish()
+            return
+
+        if self.state == self.ACTIVITIES:
+            self._finish_block()
+        self._flush_malformed_region()
+        self.state = self.SEEK_DATE
+
+        # 如果文件有内容，但从未处理过任何 "Date:" 头部 (例如，文件全是垃圾数据)
+        if not self.processed_any_valid_date_header and self.saw_non_empty_line:
+            # 检查是否已经因为第一行不是Date而报过错了
+            is_first_line_error_present = any(err.code == 'file-start-not-date' for err in self.errors)
+            if not is_first_line_error_present: # 如果没有报过第一行错误，则补充一个总的错误
+                self.errors.append(Diagnostic('no-date-block'))
+
+    def _start_block(self, line_num, line):
+        """
+        处理一个 "Date:" 行，开始新的日期记录块。
+        :param line_num: Date行的行号。
+        :param line: Date行的内容。
+        """
+        self.processed_any_valid_date_header = True # 标记已处理过Date头
+        self._flush_malformed_region()
+        error_start = len(self.errors)
+        if self.validator.check_date_line(line, line_num, self.errors):
+            self._reset_block(line_num, line)
+            self._block_error_start = error_start
+            self.state = self.HEADERS
+        else:
+            # Date行格式无效，跳过这个块，直到找到下一个 "Date:" 行或文件末尾
+            self._begin_malformed_region(error_start, line_num, line)
+            self.state = self.SKIP_TO_DATE
+
+    def _handle_header_line(self, line_num, line):
+        """
+        校验Date行之后的第1/2/3行 (Status / Getup / Remark)。
+        :param line_num: 当前行号。
+        :param line: 当前行的内容。
+        """
+        header_name = self.HEADER_NAMES[len(self.header_lines)]
+        self.header_lines.append((line_num, line))
+        if not line.startswith(f"{header_name}:"): # 检查前缀
+            self.errors.append(Diagnostic('header-prefix', line_num, header=header_name, content=line[:30]))
+
+        # 即使前缀可能错误，仍然调用对应的校验方法来检查格式
+        if header_name == 'Status':
+            self.validator.check_status_line(line, line_num, self.errors)
+        elif header_name == 'Getup':
+            self.validator.check_getup_line(line, line_num, self.errors)
+        else:
+            # Remark行通常只需要检查前缀，check_remark_line只做这个
+            self.validator.check_remark_line(line, line_num, self.errors)
+            self.state = self.ACTIVITIES # 头部结构完整，开始读取活动行
+
+    def _collect_activity_line(self, line_num, line):
+        """
+        暂存活动行，待整个Date块读取完后再校验。
+        :param line_num: 当前行号。
+        :param line: 活动行的内容。
+        """
+        self.activity_lines.append((line_num, line))
+        # 检查活动行是否包含 "study"，用于后续的Status校验规则
+        # 活动行格式: HH:MM~HH:MM文本内容
+        match = ACTIVITY_TEXT_PATTERN.match(line)
+        if match and "study" in match.group(1): # 大小写敏感地查找 "study"
+            self.day_contains_study_activity = True
+
+    def _finish_block(self):
+        """
+        当前Date块的所有活动行已读取完毕：应用基于 "study" 的Status规则，然后逐行校验活动行。
+        """
+        status_line_number_for_day, status_line_content_for_day = self.header_lines[0]
+        # 此规则仅在 Status 行本身格式为 "Status:True" 或 "Status:False" 时应用
+        # (格式本身有问题的Status行已由 check_status_line 报告)
+        actual_status_match = STATUS_LINE_PATTERN.fullmatch(status_line_content_for_day)
+        if actual_status_match:
+            actual_status_bool = actual_status_match.group(1) == "True" # 将Status值转为布尔型
+            expected_status_bool = self.day_contains_study_activity # 期望的Status值取决于当天是否有study活动
+            if actual_status_bool != expected_status_bool: # 如果实际值与期望值不符
+                code = 'status-should-be-true' if expected_status_bool else 'status-should-be-false'
+                self.errors.append(Diagnostic(code, status_line_number_for_day))
+
+        # 对收集到的所有活动行进行逐行校验，同时收集时间有效的时间段
+        # 时间段按文件顺序排到同一条时间线上 (从第一个开始时间算起)：一天从起床持续到次日起床，
+        # 开始时间第一次早于上一行的开始时间，说明已经过了午夜，之后的时间段都加上一天
+        intervals = []
+        time_records = [] # (开始时间, 结束时间, 活动标签, 时长秒数)，仅在有监听器时使用
+        day_offset = 0 # 过了午夜之后为 86400
+        previous_start = None # 上一个时间段在时间线上的开始秒数
+        for line_num, line in self.activity_lines:
+            parsed = self.validator.check_time_line(line, line_num, self.errors)
+            if parsed is not None:
+                start_seconds, end_seconds, start_time_str, end_time_str, activity_label = parsed
+                if day_offset == 0 and previous_start is not None and start_seconds < previous_start:
+                    day_offset = 86400
+                previous_start = start_seconds + day_offset
+                intervals.append((start_seconds + day_offset, end_seconds + day_offset, line_num))
+                time_records.append((start_time_str, end_time_str, activity_label, end_seconds - start_seconds))
+
+        # 当天时间段的重叠、空档和总时长检查
+        self.validator.check_day_intervals(intervals, self.date_line_num, self.errors)
+
+        if self.block_listener is not None:
+            raw_lines = [(self.date_line_num, self.date_line)] + self.header_lines + self.activity_lines
+            header_values = [self._header_value(name, line) for name, (_, line) in zip(self.HEADER_NAMES, self.header_lines)]
+            self.block_listener.on_day(DayBlock(self.date_line[5:].strip(), self.date_line_num, *header_values,
+                                                time_records, raw_lines, self.errors[self._block_error_start:]))
+        self._reset_block(None)
+
+    @staticmethod
+    def _header_value(header_name, line):
+        """
+        取出头部行冒号之后的值 (与 data_parser 的切片方式一致)。
+        :param header_name: 头部名称，例如 'Status'。
+        :param line: 头部行的内容。
+        :return: 前缀正确时返回去除空白后的值，否则返回None。
+        """
+        prefix = f"{header_name}:"
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+        return None
+
+    def _begin_malformed_region(self, error_start, line_num, line):
+        """
+        开始收集一段无法组成完整Date块的内容 (无效的Date块、截断的头部、Date块之外的内容)。
+        :param error_start: 此区域的第一条诊断信息在错误列表中的下标。
+        :param line_num: 区域第一行的行号。
+        :param line: 区域第一行的内容。
+        """
+        if self.block_listener is not None:
+            self._malformed_error_start = error_start
+            self._malformed_lines = [(line_num, line)]
+
+    def _flush_malformed_region(self):
+        """将已收集的无效区域交给监听器。"""
+        if self._malformed_lines is not None:
+            self.block_listener.on_malformed(self._malformed_lines, self.errors[self._malformed_error_start:])
+            self._malformed_lines = None
 
 # 定义文件处理器类，负责读取文件内容并调用行校验器进行校验
 class FileProcessor:
@@ -239,201 +712,251 @@ class FileProcessor:
         Date:YYYYMMDD
         ...
 
+        文件按行流式读取并交给 StreamingFileValidator，不会一次性载入整个文件。
+
         :param file_path: 要处理的文件的路径。
-        :return: 一个包含所有错误信息的列表。如果文件读取失败，则返回None。
+        :return: 一个包含所有诊断信息 (Diagnostic) 的列表。如果文件读取失败，则返回None。
         """
         errors = [] # 初始化错误列表
+        state_machine = StreamingFileValidator(self.validator, errors)
         try:
-            # 打开文件并读取所有行，去除每行末尾的空白字符
+            # 逐行读取文件，去除每行首尾的空白字符后交给状态机
             with open(file_path, 'r', encoding='utf-8') as f:
-                lines = [line.strip() for line in f.readlines()]
+                for line_num, line in enumerate(f, 1):
+                    state_machine.feed(line_num, line.strip())
         except FileNotFoundError:
-            # print(f"错误: 文件 '{file_path}' 未找到。") # 调用者会处理这个
             return None # 文件未找到，返回None表示读取错误
-        except Exception as e: # 捕获其他可能的读取错误
-            # print(f"读取文件 '{file_path}' 时发生错误: {e}") # 调试信息，由调用者处理
+        except (OSError, UnicodeDecodeError): # 捕获其他可能的读取错误
             return None # 其他读取错误，返回None
 
-        current_outer_line_idx = 0 # 主循环的当前行索引，用于遍历以"Date:"开头的块
-        total_lines = len(lines) # 文件总行数
-        processed_any_valid_date_header = False # 标记是否已处理过至少一个有效的 "Date:" 头部
-
-        # 主循环，按 "Date:" 块处理文件
-        while current_outer_line_idx < total_lines:
-            line_number_for_report = current_outer_line_idx + 1 # 用于报告的行号 (从1开始)
-            line_content_current_outer = lines[current_outer_line_idx] # 当前行的内容
-
-            # 跳过 "Date:" 块之间的空行
-            if not line_content_current_outer:
-                current_outer_line_idx += 1
-                continue
-
-            # 如果当前行以 "Date:" 开头，说明是一个新的日期记录块
-            if line_content_current_outer.startswith('Date:'):
-                processed_any_valid_date_header = True # 标记已处理过Date头
-                date_block_start_actual_line_num = line_number_for_report # 记录此Date块开始的实际行号
-
-                # 校验Date行的格式
-                is_date_line_valid = self.validator.check_date_line(line_content_current_outer, date_block_start_actual_line_num, errors)
-                if not is_date_line_valid: # 如果Date行格式无效
-                    # 跳过这个无效的Date块，直到找到下一个 "Date:" 行或文件末尾
-                    idx_after_bad_date = current_outer_line_idx + 1
-                    while idx_after_bad_date < total_lines and \
-                            (not lines[idx_after_bad_date].startswith('Date:') if lines[idx_after_bad_date] else True): # 空行也跳过
-                        idx_after_bad_date += 1
-                    current_outer_line_idx = idx_after_bad_date # 更新主循环索引到下一个Date块或文件尾
-                    continue # 继续主循环的下一次迭代
-
-                # Date行结构有效，继续处理这个块内的其他行
-                status_line_content_for_day = None # 当天Status行的内容
-                status_line_number_for_day = -1 # 当天Status行的行号
-                day_contains_study_activity = False # 标记当天活动是否包含 "study"
-
-                headers_structurally_present = True # 假设头部（Status, Getup, Remark）结构上都存在
-
-                # 检查 Status 头部 (Date行后的第一行)
-                status_idx_in_lines = current_outer_line_idx + 1
-                if status_idx_in_lines >= total_lines: # 如果文件在Date行后就结束了
-                    errors.append(f"文件在第{date_block_start_actual_line_num}行的Date块后意外结束，缺少 Status 行。")
-                    headers_structurally_present = False
-                else:
-                    status_line_content_for_day = lines[status_idx_in_lines]
-                    status_line_number_for_day = status_idx_in_lines + 1
-                    if not status_line_content_for_day.startswith("Status:"): # 检查前缀
-                        errors.append(f"第{status_line_number_for_day}行错误:应为 'Status:' 开头，实际为 '{status_line_content_for_day[:30]}...'")
-                    # 即使前缀可能错误，仍然调用check_status_line来检查 "Status:True/False" 格式
-                    self.validator.check_status_line(status_line_content_for_day, status_line_number_for_day, errors)
-
-                # 检查 Getup 头部 (Date行后的第二行)
-                getup_idx_in_lines = current_outer_line_idx + 2
-                if headers_structurally_present: # 仅当之前的头部（Status）被认为结构上存在时才检查
-                    if getup_idx_in_lines >= total_lines:
-                        errors.append(f"文件在第{date_block_start_actual_line_num}行的Date块后意外结束，缺少 Getup 行。")
-                        headers_structurally_present = False
-                    else:
-                        getup_line_content = lines[getup_idx_in_lines]
-                        getup_line_number = getup_idx_in_lines + 1
-                        if not getup_line_content.startswith("Getup:"):
-                            errors.append(f"第{getup_line_number}行错误:应为 'Getup:' 开头，实际为 '{getup_line_content[:30]}...'")
-                        self.validator.check_getup_line(getup_line_content, getup_line_number, errors)
-
-                # 检查 Remark 头部 (Date行后的第三行)
-                remark_idx_in_lines = current_outer_line_idx + 3
-                if headers_structurally_present: # 仅当之前的头部（Status, Getup）被认为结构上存在时才检查
-                    if remark_idx_in_lines >= total_lines:
-                        errors.append(f"文件在第{date_block_start_actual_line_num}行的Date块后意外结束，缺少 Remark 行。")
-                        headers_structurally_present = False
-                    else:
-                        remark_line_content = lines[remark_idx_in_lines]
-                        remark_line_number = remark_idx_in_lines + 1
-                        if not remark_line_content.startswith("Remark:"):
-                            errors.append(f"第{remark_line_number}行错误:应为 'Remark:' 开头，实际为 '{remark_line_content[:30]}...'")
-                        # Remark行通常只需要检查前缀，check_remark_line只做这个
-                        self.validator.check_remark_line(remark_line_content, remark_line_number, errors)
-
-                # 如果头部结构不完整 (例如，文件提前结束)，则跳过此Date块的后续活动行处理
-                if not headers_structurally_present:
-                    idx_scanner = current_outer_line_idx + 1 # 从Date行之后开始扫描
-                    # 跳到下一个Date行或文件末尾
-                    while idx_scanner < total_lines and \
-                            (not lines[idx_scanner].startswith('Date:') if lines[idx_scanner] else True):
-                        idx_scanner += 1
-                    current_outer_line_idx = idx_scanner
-                    continue # 继续主循环
-
-                # --- 活动行处理 (仅当头部结构完整时) ---
-                first_activity_line_idx_in_lines = current_outer_line_idx + 4 # Date, Status, Getup, Remark 之后的行
-
-                current_activity_processing_idx = first_activity_line_idx_in_lines
-                activity_lines_data_for_validation = [] # 存储待校验的活动行及其行号
-
-                # 循环读取属于当前Date块的活动行
-                while current_activity_processing_idx < total_lines and \
-                        (not lines[current_activity_processing_idx].startswith('Date:')): # 直到遇到下一个Date行或文件末尾
-                    
-                    activity_content = lines[current_activity_processing_idx]
-                    activity_num = current_activity_processing_idx + 1
-
-                    if activity_content: # 只处理非空行作为活动行
-                        activity_lines_data_for_validation.append({'content': activity_content, 'num': activity_num})
-                        
-                        # 检查活动行是否包含 "study"，用于后续的Status校验规则
-                        # 活动行格式: HH:MM~HH:MM文本内容
-                        match = re.match(r'^\d{2}:\d{2}~\d{2}:\d{2}(.*)$', activity_content)
-                        if match:
-                            activity_text_part = match.group(1) # 提取文本内容部分
-                            if "study" in activity_text_part: # 大小写敏感地查找 "study"
-                                day_contains_study_activity = True
-                    
-                    current_activity_processing_idx += 1 # 处理下一行
-                
-                # 应用新的基于 "study" 的 Status 校验规则
-                # 此规则仅在 Status 行本身格式为 "Status:True" 或 "Status:False" 时应用
-                if status_line_content_for_day is not None and status_line_number_for_day != -1:
-                    # 再次确认Status行格式是否为 Status:True 或 Status:False
-                    actual_status_match = re.fullmatch(r'Status:(True|False)', status_line_content_for_day)
-                    if actual_status_match: # 如果Status行格式正确
-                        actual_status_bool = actual_status_match.group(1) == "True" # 将Status值转为布尔型
-                        expected_status_bool = day_contains_study_activity # 期望的Status值取决于当天是否有study活动
-
-                        if actual_status_bool != expected_status_bool: # 如果实际值与期望值不符
-                            reason_verb = "包含" if day_contains_study_activity else "不包含"
-                            errors.append(
-                                f"第{status_line_number_for_day}行错误: Status应为 Status:{str(expected_status_bool)} (因活动{reason_verb} 'study')，但找到 Status:{actual_status_match.group(1)}。"
-                            )
-                    # 如果 actual_status_match 为 None，表示 Status 行格式本身就有问题 (例如 "Status:Maybe")
-                    # 这种结构性错误已由 self.validator.check_status_line 捕获。
-                    # 新的 "study" 规则只在Status本身可以被解析为 True 或 False 时才应用。
-                
-                # 对收集到的所有活动行进行逐行校验
-                for act_line_info in activity_lines_data_for_validation:
-                    self.validator.check_time_line(act_line_info['content'], act_line_info['num'], errors)
-
-                # 更新主循环的索引到下一个块的开始位置 (即当前活动块的结束位置)
-                current_outer_line_idx = current_activity_processing_idx
-                continue # 继续主循环处理下一个 "Date:" 块
-                
-            else: # 当前行不是以 "Date:" 开头 (也不是在主循环开头被跳过的空行)
-                # 如果这是文件开头的一些非 "Date:" 行 (且非空)
-                if not processed_any_valid_date_header and line_content_current_outer:
-                    errors.append(f"第{line_number_for_report}行错误: 文件应以 'Date:YYYYMMDD' 格式的行开始。当前行为: '{line_content_current_outer[:50]}...'")
-                    processed_any_valid_date_header = True # 标记此错误已报告，避免对后续每个前导非Date行都报告
-                    
-                    # 跳过这些无效的前导行，直到找到第一个 "Date:" 或文件末尾
-                    idx_scanner = current_outer_line_idx + 1
-                    while idx_scanner < total_lines and \
-                            (not lines[idx_scanner].startswith('Date:') if lines[idx_scanner] else True):
-                        idx_scanner += 1
-                    current_outer_line_idx = idx_scanner
-                    continue # 继续主循环
-
-                # 如果已经处理过Date块，但现在又遇到一个非空且非Date开头的行
-                # 这意味着在一个Date块结束后，下一个Date块开始前，出现了不应有的内容
-                elif line_content_current_outer:
-                    errors.append(f"第{line_number_for_report}行错误: 意外的内容，此处应为新的 'Date:' 块或文件末尾。内容: '{line_content_current_outer[:50]}...'")
-                    # 跳过这些意外内容，直到找到下一个 "Date:" 或文件末尾
-                    idx_scanner = current_outer_line_idx + 1
-                    while idx_scanner < total_lines and \
-                            (not lines[idx_scanner].startswith('Date:') if lines[idx_scanner] else True):
-                        idx_scanner += 1
-                    current_outer_line_idx = idx_scanner
-                    continue # 继续主循环
-                else: 
-                    # 此情况理论上不应到达，因为主循环开头的 `if not line_content_current_outer:` 会处理空行。
-                    # 作为安全措施，如果是一个空行到达这里，则前进索引。
-                    current_outer_line_idx += 1
-
-
-        # 文件处理完毕后的最终检查
-        # 如果文件有内容，但从未处理过任何有效的 "Date:" 头部 (例如，文件全是垃圾数据或只有空行)
-        if not processed_any_valid_date_header and any(l.strip() for l in lines): # `any(l.strip() for l in lines)` 检查文件是否真的有非空内容
-            # 检查是否已经因为第一行不是Date而报过错了
-            is_first_line_error_present = any("文件应以 'Date:YYYYMMDD' 格式的行开始" in err for err in errors)
-            if not is_first_line_error_present: # 如果没有报过第一行错误，则补充一个总的错误
-                errors.append(f"错误: 文件不包含任何以 'Date:YYYYMMDD' 开头的有效数据块。")
-        
+        state_machine.finish()
+        for error in errors:
+            error.file = file_path # 标记诊断信息所属的文件
         return errors # 返回收集到的所有错误信息
 
+# 定义校验结果缓存类，跨运行保存 "文件路径 -> (内容哈希, 校验结果)"
+# 每个文件只保留最新内容的一个条目，文件被编辑后旧结果直接被覆盖，缓存大小不随编辑次数增长
+# 所有条目都属于同一个配置哈希；配置文件 (或缓存格式版本) 一旦变化，全部条目失效
+class ValidationCache:
+    def __init__(self, cache_file_path, config_file_path):
+        """
+        构造函数，初始化校验缓存。
+        :param cache_file_path: 缓存文件的路径。
+        :param config_file_path: 校验所用配置文件的路径，其内容哈希决定缓存是否有效。
+        """
+        self.cache_file_path = cache_file_path # 存储缓存文件路径
+        config_content_hash = self.hash_file(config_file_path) or "missing"
+        self.config_hash = f"{CACHE_FORMAT_VERSION}:{config_content_hash}" # 当前配置对应的哈希
+        self.entries = {} # 文件绝对路径 -> {"hash": 文件内容哈希, "diagnostics": 诊断信息字典的列表}
+        self.dirty = False # 标记缓存是否有需要写回的变更
+
+    @staticmethod
+    def hash_file(file_path):
+        """
+        分块计算文件内容的SHA-256哈希。
+        :param file_path: 文件路径。
+        :return: 十六进制哈希字符串；文件无法读取时返回None。
+        """
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def load(self):
+        """
+        从缓存文件加载条目。缓存文件不存在、损坏或配置哈希不一致时，从空缓存开始。
+        """
+        try:
+            with open(self.cache_file_path, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+        except (OSError, ValueError):
+            return # 没有可用的缓存
+        if not isinstance(cache_data, dict) or cache_data.get("config_hash") != self.config_hash:
+            self.dirty = True # 配置已变化，旧条目全部作废，退出时写回空缓存
+            return
+        self.entries = cache_data.get("entries", {})
+
+    def get(self, file_path, content_hash):
+        """
+        :param file_path: 文件路径，写入返回的诊断信息。
+        :param content_hash: 文件当前的内容哈希，与条目记录的哈希一致才算命中。
+        :return: 缓存的诊断信息列表；未命中时返回None。
+        """
+        cached_entry = self.entries.get(os.path.abspath(file_path))
+        if content_hash is None or cached_entry is None or cached_entry.get("hash") != content_hash:
+            return None
+        return [Diagnostic.from_dict(item, file=file_path) for item in cached_entry["diagnostics"]]
+
+    def put(self, file_path, content_hash, errors):
+        """
+        记录一个文件的校验结果，替换该文件之前的条目。读取失败 (errors为None) 的结果不缓存。
+        :param file_path: 文件路径。
+        :param content_hash: 文件内容哈希。
+        :param errors: 诊断信息列表。
+        """
+        if content_hash is None or errors is None:
+            return
+        self.entries[os.path.abspath(file_path)] = {
+            "hash": content_hash,
+            "diagnostics": [
+                {key: value for key, value in error.to_dict().items() if key not in ('file', 'message')}
+                for error in errors
+            ],
+        }
+        self.dirty = True
+
+    def save(self):
+        """
+        将缓存写回文件，同时丢弃已不存在的文件的条目。先写临时文件再替换，避免中断时留下损坏的缓存。
+        """
+        missing_paths = [file_path for file_path in self.entries if not os.path.exists(file_path)]
+        for file_path in missing_paths:
+            del self.entries[file_path]
+        if not self.dirty and not missing_paths:
+            return
+        temp_path = self.cache_file_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"config_hash": self.config_hash, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(temp_path, self.cache_file_path)
+        self.dirty = False
+
+# 每个工作进程各自持有的文件处理器，由 _init_worker 在进程启动时创建一次
+_worker_file_processor = None
+
+def _init_worker(config_file_path):
+    """
+    进程池初始化函数：每个工作进程只加载一次配置并构建校验器。
+    :param config_file_path: 配置文件的路径。
+    """
+    global _worker_file_processor
+    config_manager = ConfigManager(config_file_path)
+    with contextlib.redirect_stdout(io.StringIO()): # 主进程已经输出过配置加载信息，这里不再重复
+        config_manager.load()
+    _worker_file_processor = FileProcessor(LineValidator(config_manager))
+
+def _validate_file_in_worker(file_path):
+    """
+    在工作进程中校验单个文件。
+    :param file_path: 要校验的文件路径。
+    :return: (错误列表或None, 校验耗时秒数)
+    """
+    start_time = time.perf_counter()
+    errors = _worker_file_processor.process_and_validate_file_contents(file_path)
+    return errors, time.perf_counter() - start_time
+
+def _iter_uncached_results(files_to_validate, file_processor, jobs):
+    """
+    校验未命中缓存的文件，按顺序产出 (错误列表或None, 校验耗时秒数)。jobs > 1 时在进程池中并行校验。
+    """
+    if jobs <= 1 or len(files_to_validate) <= 1:
+        for file_path in files_to_validate:
+            start_time = time.perf_counter()
+            errors = file_processor.process_and_validate_file_contents(file_path)
+            yield errors, time.perf_counter() - start_time
+        return
+
+    config_file_path = file_processor.validator.config_manager.config_file_path
+    # 每个进程一次领取多个文件，减少进程间通信的次数
+    chunksize = max(1, len(files_to_validate) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config_file_path,)) as executor:
+        # executor.map 按提交顺序返回结果，因此报告顺序与文件顺序一致
+        yield from executor.map(_validate_file_in_worker, files_to_validate, chunksize=chunksize)
+
+def iter_validation_results(files_to_process, file_processor, jobs=1, cache=None):
+    """
+    按原始文件顺序逐个产出校验结果。jobs > 1 时在进程池中并行校验。
+    :param files_to_process: 待校验的文件路径列表。
+    :param file_processor: 单进程模式下使用的 FileProcessor (其配置路径也用于初始化工作进程)。
+    :param jobs: 并行的工作进程数。
+    :param cache: 可选的 ValidationCache；命中的文件直接返回上次的结果，不再校验。
+    :return: 生成器，产出 (文件路径, 错误列表或None, 校验耗时秒数, 是否来自缓存)。
+    """
+    if cache is None:
+        for file_path, (errors, elapsed) in zip(files_to_process, _iter_uncached_results(files_to_process, file_processor, jobs)):
+            yield file_path, errors, elapsed, False
+        return
+
+    # 先一次性确定每个文件是否命中缓存，未命中的文件交给校验流程
+    content_hashes = [ValidationCache.hash_file(file_path) for file_path in files_to_process]
+    cached_results = [cache.get(file_path, content_hash) for file_path, content_hash in zip(files_to_process, content_hashes)]
+    files_to_validate = [
+        file_path for file_path, cached_errors in zip(files_to_process, cached_results)
+        if cached_errors is None
+    ]
+    uncached_results = _iter_uncached_results(files_to_validate, file_processor, jobs)
+    for file_path, content_hash, cached_errors in zip(files_to_process, content_hashes, cached_results):
+        if cached_errors is not None:
+            yield file_path, cached_errors, 0.0, True
+            continue
+        errors, elapsed = next(uncached_results)
+        cache.put(file_path, content_hash, errors)
+        yield file_path, errors, elapsed, False
+
+def _report_file_status(errors):
+    """
+    :param errors: 文件的诊断信息列表，读取失败时为None。
+    :return: 'unreadable'、'error' 或 'ok'。
+    """
+    if errors is None:
+        return 'unreadable'
+    return 'error' if any(error.severity == 'error' for error in errors) else 'ok'
+
+def write_json_report(file_results, output_path):
+    """
+    将校验结果写成JSON报告。
+    :param file_results: (文件路径, 诊断信息列表或None) 的列表，按文件顺序排列。
+    :param output_path: 报告文件路径。
+    """
+    files_report = []
+    for file_path, errors in file_results:
+        diagnostics = [Diagnostic('file-unreadable', file=file_path)] if errors is None else sort_and_deduplicate_diagnostics(errors)
+        files_report.append({
+            'file': file_path,
+            'status': _report_file_status(errors),
+            'diagnostics': [diagnostic.to_dict() for diagnostic in diagnostics],
+        })
+    report = {
+        'summary': {
+            'files': len(file_results),
+            'files_with_errors': sum(1 for entry in files_report if entry['status'] != 'ok'),
+            'diagnostics': sum(len(entry['diagnostics']) for entry in files_report),
+        },
+        'files': files_report,
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def write_junit_report(file_results, output_path, total_seconds=0.0):
+    """
+    将校验结果写成 JUnit-XML 报告：每个文件一个 testcase，格式错误记为 failure，读取失败记为 error。
+    :param file_results: (文件路径, 诊断信息列表或None) 的列表，按文件顺序排列。
+    :param output_path: 报告文件路径。
+    :param total_seconds: 整个批处理的耗时。
+    """
+    suite = ET.Element('testsuite', name='format_validator', tests=str(len(file_results)), time=f"{total_seconds:.6f}")
+    failure_count = error_count = 0
+    for file_path, errors in file_results:
+        case = ET.SubElement(suite, 'testcase', classname='format_validator', name=file_path)
+        status = _report_file_status(errors)
+        if status == 'unreadable':
+            error_count += 1
+            ET.SubElement(case, 'error', type='file-unreadable', message=DIAGNOSTIC_MESSAGES['file-unreadable'])
+            continue
+        diagnostics = sort_and_deduplicate_diagnostics(errors)
+        if status == 'error':
+            failure_count += 1
+            failure = ET.SubElement(case, 'failure', type='format-error', message=f"{len(diagnostics)} 个问题")
+            failure.text = '\n'.join(f"[{d.severity}] {d.code}: {d.message}" for d in diagnostics)
+        elif diagnostics: # 只有警告的文件仍然算通过，警告写入 system-out
+            ET.SubElement(case, 'system-out').text = '\n'.join(f"[{d.severity}] {d.code}: {d.message}" for d in diagnostics)
+    suite.set('failures', str(failure_count))
+    suite.set('errors', str(error_count))
+    ET.ElementTree(suite).write(output_path, encoding='utf-8', xml_declaration=True)
+
 def main():
     """
     主函数，程序的入口点。
@@ -441,8 +964,14 @@ def main():
     # 设置命令行参数解析器
     parser = argparse.ArgumentParser(description="校验TXT日志文件的格式和内容。")
     parser.add_argument("input_path", help="要校验的TXT文件路径或包含TXT文件的目录路径。")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行校验的进程数 (默认: 1；0 表示使用全部CPU核心)。")
+    parser.add_argument("--cache-file", default=CACHE_FILE_PATH, help=f"校验结果缓存文件的路径 (默认: {CACHE_FILE_PATH})。")
+    parser.add_argument("--no-cache", action="store_true", help="不读取也不写入校验结果缓存，重新校验所有文件。")
+    parser.add_argument("--json-report", metavar="PATH", help="额外把结构化的校验结果写入此JSON文件。")
+    parser.add_argument("--junit-report", metavar="PATH", help="额外把校验结果写入此 JUnit-XML 文件。")
     args = parser.parse_args()
     target_path = args.input_path
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
     # 初始化配置管理器并加载配置
     config_manager = ConfigManager(CONFIG_FILE_PATH)
@@ -453,6 +982,12 @@ def main():
     line_validator = LineValidator(config_manager)
     file_processor = FileProcessor(line_validator)
 
+    # 初始化校验结果缓存：文件内容和配置都未变化的文件直接复用上次的结果
+    validation_cache = None
+    if not args.no_cache:
+        validation_cache = ValidationCache(args.cache_file, CONFIG_FILE_PATH)
+        validation_cache.load()
+
     print("欢迎使用TXT文件校验工具。")
     print("========================================")
 
@@ -496,44 +1031,46 @@ def main():
     batch_overall_start_time = time.perf_counter()
     total_files_in_batch = len(files_to_process)
     files_with_errors_count_in_batch = 0 # 批处理中有错误的文件计数
+    cached_files_count_in_batch = 0 # 批处理中直接使用缓存结果的文件计数
+    file_results = [] # (文件路径, 诊断信息列表或None)，用于生成JSON/JUnit报告
 
     try:
-        # 遍历所有待处理的文件
-        for i, current_file_path in enumerate(files_to_process):
-            file_process_start_time = time.perf_counter() # 单个文件处理开始计时
-            
-            # 调用FileProcessor处理并校验文件内容
-            validation_errors = file_processor.process_and_validate_file_contents(current_file_path)
-
+        # 按原始顺序遍历所有文件的校验结果 (jobs > 1 时由进程池并行计算)
+        validation_results = iter_validation_results(files_to_process, file_processor, jobs, validation_cache)
+        for i, (current_file_path, validation_errors, file_process_duration, from_cache) in enumerate(validation_results):
+            file_results.append((current_file_path, validation_errors))
             current_file_has_errors = False # 标记当前文件是否有错误
             if validation_errors is None: # 文件读取失败
                 files_with_errors_count_in_batch += 1
                 current_file_has_errors = True
-            elif validation_errors: # 文件有格式错误
+            elif any(error.severity == 'error' for error in validation_errors): # 文件有格式错误 (只有警告的文件不算)
                 files_with_errors_count_in_batch += 1
                 current_file_has_errors = True
             
             # 根据是否有错误设置输出颜色和进度指示
             indicator_color = Colors.RED if current_file_has_errors else Colors.GREEN
             progress_indicator = f"[{i+1}/{total_files_in_batch}]" # 例如: [1/5]
-            print(f"\n{indicator_color}{progress_indicator}{Colors.RESET} 开始处理文件: {current_file_path}")
+            cache_note = f" {Colors.YELLOW}(文件与配置均未变化，使用缓存结果){Colors.RESET}" if from_cache else ""
+            print(f"\n{indicator_color}{progress_indicator}{Colors.RESET} 开始处理文件: {current_file_path}{cache_note}")
+            if from_cache:
+                cached_files_count_in_batch += 1
 
 
             if validation_errors is None: # 文件读取失败
                 print(f"注意: 文件 '{current_file_path}' 读取失败或无法访问。")
-            elif validation_errors: # 文件有格式错误
-                print(f"文件 '{current_file_path}' 发现以下错误:")
-                # 对错误信息去重并按行号排序
-                # 使用正则表达式从错误信息中提取行号用于排序
-                unique_errors = sorted(list(set(validation_errors)), 
-                                    key=lambda x: int(re.search(r'第(\d+)行', x).group(1)) if re.search(r'第(\d+)行', x) else 0)
+            elif validation_errors: # 文件有格式错误或警告
+                if current_file_has_errors:
+                    print(f"文件 '{current_file_path}' 发现以下错误:")
+                else:
+                    print(f"文件 '{current_file_path}' 格式正确，但有以下警告:")
+                # 对诊断信息去重并按行号 (整数字段) 排序
+                unique_errors = sort_and_deduplicate_diagnostics(validation_errors)
                 for error in unique_errors:
                     print(f"  {error}") # 缩进显示错误信息
             else: # 文件格式完全正确
                 print(f"文件 '{current_file_path}' 格式完全正确！")
 
-            file_process_end_time = time.perf_counter() # 单个文件处理结束计时
-            print(f"处理文件 '{current_file_path}' 时间: {file_process_end_time - file_process_start_time:.6f} 秒")
+            print(f"处理文件 '{current_file_path}' 时间: {file_process_duration:.6f} 秒")
             if i < total_files_in_batch - 1: # 如果不是最后一个文件，打印分隔线
                 print("---") 
 
@@ -542,12 +1079,21 @@ def main():
             batch_overall_end_time = time.perf_counter() # 批处理结束计时
             print("\n--- 处理总结 ---")
             print(f"总共处理 {total_files_in_batch} 个 .txt 文件。")
+            if cached_files_count_in_batch > 0:
+                print(f"其中 {cached_files_count_in_batch} 个文件未变化，直接使用了缓存的校验结果。")
             if files_with_errors_count_in_batch > 0:
                 print(f"{Colors.RED}其中 {files_with_errors_count_in_batch} 个文件存在格式错误或读取问题。{Colors.RESET}")
             else:
                 print(f"{Colors.GREEN}所有处理的文件均格式正确。{Colors.RESET}") # 已修正：确保此消息在无错误时显示
             print(f"所有文件处理总耗时: {batch_overall_end_time - batch_overall_start_time:.6f} 秒")
 
+            if args.json_report:
+                write_json_report(file_results, args.json_report)
+                print(f"JSON报告已写入: {args.json_report}")
+            if args.junit_report:
+                write_junit_report(file_results, args.junit_report, batch_overall_end_time - batch_overall_start_time)
+                print(f"JUnit-XML报告已写入: {args.junit_report}")
+
     except KeyboardInterrupt: # 捕获 Ctrl+C
         print("\n用户中断，程序已部分执行后退出。")
     except Exception as e: # 捕获其他意外的致命错误
@@ -555,6 +1101,8 @@ def main():
         import traceback # 导入traceback模块以打印详细的堆栈信息
         traceback.print_exc() # 打印异常的堆栈跟踪
     finally:
+        if validation_cache is not None:
+            validation_cache.save() # 即使中途中断，也保存已完成的校验结果
         print("程序已退出。")
 
 # Python的惯用写法，确保当脚本被直接执行时，main()函数会被调用
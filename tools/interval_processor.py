@@ -3,35 +3,200 @@ import datetime
 import json
 import os
 import time
+import re
 import argparse 
+import contextlib
+import io
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+class AliasMatcher:
+    """
+    Maps raw event text to a label using rules compiled once from the replacement map JSON.
+
+    Rule kinds:
+        exact     the whole text equals the pattern (every flat "text": "label" entry)
+        prefix    the text starts with the pattern ("PREFIX" section)
+        contains  the text contains the pattern anywhere ("CONTAINS" section)
+
+    A rule value is either a label or {"label": ..., "priority": N} (default priority 0).
+    When several rules match, the highest priority wins, then exact > prefix > contains,
+    then the longest matched pattern, then the earliest match in the text. Prefix rules live in a trie and contains rules in an
+    Aho-Corasick automaton, so one lookup costs O(len(text)) however many rules there are.
+    """
+    RULE_SECTIONS = {"EXACT": "exact", "PREFIX": "prefix", "CONTAINS": "contains"}
+    KIND_RANKS = {"exact": 2, "prefix": 1, "contains": 0} # Tie-break between kinds at equal priority
+    _TRIE_TERMINAL = None # Key marking "a prefix rule ends here" in the prefix trie
+
+    def __init__(self):
+        self.exact_rules = {} # text -> (priority, label)
+        self.prefix_trie = {}
+        # Aho-Corasick automaton for contains rules: per node, its transitions, failure link,
+        # and the best rule ending here or at any node on its failure chain ((priority, length), label)
+        self._ac_goto = [{}]
+        self._ac_fail = [0]
+        self._ac_best = [None]
+        self._match_cache = {} # Event vocabularies are small and repetitive; cache every lookup
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AliasMatcher":
+        matcher = cls()
+        contains_rules = []
+        for key, value in config.items():
+            if key in cls.RULE_SECTIONS and isinstance(value, dict):
+                kind = cls.RULE_SECTIONS[key]
+                for pattern, rule in value.items():
+                    matcher._add_rule(kind, pattern, rule, contains_rules)
+            else:
+                matcher._add_rule("exact", key, value, contains_rules)
+        matcher._build_automaton(contains_rules)
+        return matcher
+
+    def _add_rule(self, kind: str, pattern: str, rule, contains_rules: list):
+        if isinstance(rule, str):
+            label, priority = rule, 0
+        elif isinstance(rule, dict) and isinstance(rule.get("label"), str) and isinstance(rule.get("priority", 0), int):
+            label, priority = rule["label"], rule.get("priority", 0)
+        else:
+            print(f"警告: 忽略无效的替换规则 '{pattern}': {rule!r}", file=sys.stderr)
+            return
+        if not pattern:
+            print(f"警告: 忽略空的{kind}替换规则 (标签 '{label}')。", file=sys.stderr)
+            return
+
+        if kind == "exact":
+            self.exact_rules[pattern] = (priority, label)
+        elif kind == "prefix":
+            node = self.prefix_trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[self._TRIE_TERMINAL] = (priority, label)
+        else:
+            contains_rules.append((pattern, priority, label))
+
+    def _build_automaton(self, contains_rules: list):
+        goto, fail, best = self._ac_goto, self._ac_fail, self._ac_best
+        for pattern, priority, label in contains_rules:
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    fail.append(0)
+                    best.append(None)
+                state = next_state
+            candidate = ((priority, len(pattern)), label)
+            if best[state] is None or candidate[0] > best[state][0]:
+                best[state] = candidate
+
+        # Breadth-first: set failure links and fold each node's failure-chain best into it
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                inherited = best[fail[next_state]]
+                if inherited is not None and (best[next_state] is None or inherited[0] > best[next_state][0]):
+                    best[next_state] = inherited
+                queue.append(next_state)
+
+    def match(self, text: str):
+        """Returns the label of the best matching rule, or None if no rule matches."""
+        cached = self._match_cache.get(text, self)
+        if cached is not self:
+            return cached
+
+        best_key, best_label = None, None
+        exact_rule = self.exact_rules.get(text)
+        if exact_rule is not None:
+            best_key, best_label = (exact_rule[0], 2, len(text)), exact_rule[1]
+
+        node = self.prefix_trie
+        for depth, char in enumerate(text, 1):
+            node = node.get(char)
+            if node is None:
+                break
+            rule = node.get(self._TRIE_TERMINAL)
+            if rule is not None:
+                key = (rule[0], 1, depth)
+                if best_key is None or key > best_key:
+                    best_key, best_label = key, rule[1]
+
+        if len(self._ac_goto) > 1:
+            goto, fail, best = self._ac_goto, self._ac_fail, self._ac_best
+            state = 0
+            for char in text:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                candidate = best[state]
+                if candidate is not None:
+                    (priority, length), label = candidate
+                    key = (priority, 0, length)
+                    if best_key is None or key > best_key:
+                        best_key, best_label = key, label
+
+        self._match_cache[text] = best_label
+        return best_label
+
+
+def print_unmapped_report(unmapped_event_counts: Counter, limit: int = 20):
+    # Lists event texts that no replacement rule matched, most frequent first
+    if not unmapped_event_counts:
+        return
+    print(f"未被替换规则匹配的事件文本 ({len(unmapped_event_counts)} 种，共 {sum(unmapped_event_counts.values())} 次):", file=sys.stderr)
+    for text, count in unmapped_event_counts.most_common(limit):
+        print(f"  {count:>6}  {text}", file=sys.stderr)
+    if len(unmapped_event_counts) > limit:
+        print(f"  ... 另有 {len(unmapped_event_counts) - limit} 种", file=sys.stderr)
+
 
 class LogProcessor:
     GREEN = "\033[92m"
     RED = "\033[91m"
     YELLOW = "\033[93m"
     RESET = "\033[0m"
+    ANSI_ESCAPE_PATTERN = re.compile(r"\033\[[0-9;]*m")
+    OUTPUT_FLUSH_LINES = 4096 # Buffered output lines are written to the stream in batches of this size
+    WAKEUP_EVENT_TEXTS = ("醒", "起床")
+    DAY_RECORD_LABEL_PATTERN = re.compile(r"\s*([a-zA-Z0-9_-]+)") # Same label rule as data_parser.FileDataParser
 
-    def __init__(self, year: int = 2025, replacement_map_file: str = "interval_processor.json", output_file_stream=None):
+    def __init__(self, year: int = 2025, replacement_map_file: str = "interval_processor.json", output_file_stream=None, alias_matcher: AliasMatcher = None):
+        # alias_matcher: an already compiled matcher; when given, replacement_map_file is not read
         self.year_to_use = year
         self._last_interval_start_raw_time = None # Internal state for current day block processing
         self._was_previous_event_initial_raw_xing = False # Internal state for current day block processing
-        self._printed_at_least_one_block = False # Overall state for process_log_data method
-        self.TEXT_REPLACEMENT_MAP = self._load_replacement_map(replacement_map_file)
+        self.alias_matcher = alias_matcher if alias_matcher is not None else AliasMatcher.from_config(self._load_replacement_map(replacement_map_file))
+        self.unmapped_event_counts = Counter() # Event text -> occurrences that no replacement rule matched
         self.output_file_stream = output_file_stream
+        self._output_buffer = [] # Pending output lines, written in batches by flush_output()
 
     def _output(self, message: str):
         if self.output_file_stream:
-            plain_message = (message.replace(self.GREEN, "")
-                                  .replace(self.RED, "")
-                                  .replace(self.YELLOW, "")
-                                  .replace(self.RESET, ""))
-            self.output_file_stream.write(plain_message + "\n")
+            if "\033" in message: # Most lines carry no color codes; only strip when one is present
+                message = self.ANSI_ESCAPE_PATTERN.sub("", message)
+            self._output_buffer.append(message)
+            if len(self._output_buffer) >= self.OUTPUT_FLUSH_LINES:
+                self.flush_output()
         else:
             # This path would only be taken if LogProcessor is instantiated elsewhere 
             # without an output_file_stream. In the context of main(), a stream is always provided.
             print(message) 
 
-    def _load_replacement_map(self, file_path: str) -> dict:
+    def flush_output(self):
+        """Writes any buffered output lines to the output stream."""
+        if self._output_buffer:
+            self._output_buffer.append("") # Trailing newline for the last line
+            self.output_file_stream.write("\n".join(self._output_buffer))
+            self._output_buffer = []
+
+    @staticmethod
+    def _load_replacement_map(file_path: str) -> dict:
         if not os.path.exists(file_path):
             print(f"警告: 文本替换映射文件 '{file_path}' 未找到。将使用空的替换映射。", file=sys.stderr)
             return {}
@@ -49,6 +214,14 @@ class LogProcessor:
             print(f"读取文本替换映射文件 '{file_path}' 时发生未知错误: {e}。将使用空的替换映射。", file=sys.stderr)
             return {}
 
+    def _map_event_text(self, original_text: str, count_unmapped: bool = True) -> str:
+        label = self.alias_matcher.match(original_text)
+        if label is None:
+            if count_unmapped:
+                self.unmapped_event_counts[original_text] += 1
+            return original_text
+        return label
+
     @staticmethod
     def _format_time(time_str: str) -> str:
         if len(time_str) == 4 and time_str.isdigit():
@@ -60,8 +233,10 @@ class LogProcessor:
         self._last_interval_start_raw_time = None
         self._was_previous_event_initial_raw_xing = False
 
-    # Modified to accept next_day_initial_wakeup_raw_time
-    def _process_and_print_date_block(self, date_line_content: str, event_lines_content: list, next_day_initial_wakeup_raw_time: str = None):
+    # Builds the structured record of one date block; returns None (after a warning) if the date is invalid.
+    # Record: {'date': 'YYYYMMDD', 'status': 'True'/'False', 'getup': 'HH:MM' or 'null', 'remark': str,
+    #          'intervals': [(start 'HH:MM' or None, end 'HH:MM', display_text), ...]}
+    def _build_date_block(self, date_line_content: str, event_lines_content: list, next_day_initial_wakeup_raw_time: str = None):
         if len(date_line_content) == 4 and date_line_content.isdigit():
             month_chars = date_line_content[0:2]
             day_chars = date_line_content[2:4]
@@ -70,19 +245,18 @@ class LogProcessor:
                 day_int = int(day_chars)
                 if not (1 <= month_int <= 12 and 1 <= day_int <= 31):
                     print(f"警告: 无效的日期部分 '{date_line_content}'. 跳过此日期块。", file=sys.stderr)
-                    return
+                    return None
                 formatted_month_str = f"{month_int:02d}"
                 formatted_day_str = f"{day_int:02d}"
             except ValueError:
                 print(f"警告: 无法将日期部分 '{date_line_content}' 解析为数字。跳过此日期块。", file=sys.stderr)
-                return
+                return None
         else:
             print(f"警告: 日期行格式无效 '{date_line_content}'. 跳过此日期块。", file=sys.stderr)
-            return
+            return None
 
-        formatted_date_output_str = f"Date:{self.year_to_use}{formatted_month_str}{formatted_day_str}"
         day_has_study_event = False
-        event_related_output_lines = []
+        intervals = []
         
         self._reset_date_block_processing_state() # Resets self._last_interval_start_raw_time for this block
 
@@ -98,13 +272,6 @@ class LogProcessor:
                     is_first_event_actual_getup_type = True
                     first_event_true_formatted_time = self._format_time(first_event_peek_raw_time)
 
-        if is_first_event_actual_getup_type:
-            event_related_output_lines.append(f"Getup:{first_event_true_formatted_time}")
-            event_related_output_lines.append("Remark:")
-        else:
-            event_related_output_lines.append(f"Getup:null") 
-            event_related_output_lines.append("Remark:")
-
         start_processing_from_index = 0
         if is_first_event_actual_getup_type:
             consumed_event_raw_time = event_lines_content[0][:4]
@@ -112,7 +279,7 @@ class LogProcessor:
             self._last_interval_start_raw_time = consumed_event_raw_time 
             self._was_previous_event_initial_raw_xing = (consumed_event_original_text == "醒")
             
-            consumed_display_text = self.TEXT_REPLACEMENT_MAP.get(consumed_event_original_text, consumed_event_original_text)
+            consumed_display_text = self._map_event_text(consumed_event_original_text, count_unmapped=False) # Becomes the Getup time
             if "study" in consumed_display_text:
                 day_has_study_event = True
             start_processing_from_index = 1
@@ -122,17 +289,17 @@ class LogProcessor:
             raw_time = event_line_str[:4]
             original_text = event_line_str[4:]
             current_formatted_time = self._format_time(raw_time)
-            display_text = self.TEXT_REPLACEMENT_MAP.get(original_text, original_text)
+            display_text = self._map_event_text(original_text)
             if "study" in display_text:
                 day_has_study_event = True
             
             if self._last_interval_start_raw_time is None:
-                event_related_output_lines.append(f"{current_formatted_time}{display_text}")
+                intervals.append((None, current_formatted_time, display_text))
                 self._last_interval_start_raw_time = raw_time
                 self._was_previous_event_initial_raw_xing = False 
             else:
                 start_formatted_time = self._format_time(self._last_interval_start_raw_time)
-                event_related_output_lines.append(f"{start_formatted_time}~{current_formatted_time}{display_text}")
+                intervals.append((start_formatted_time, current_formatted_time, display_text))
                 self._was_previous_event_initial_raw_xing = False
                 self._last_interval_start_raw_time = raw_time
 
@@ -140,113 +307,303 @@ class LogProcessor:
         if next_day_initial_wakeup_raw_time and self._last_interval_start_raw_time:
             last_event_time_current_day_formatted = self._format_time(self._last_interval_start_raw_time)
             next_day_wakeup_time_formatted = self._format_time(next_day_initial_wakeup_raw_time)
-            event_related_output_lines.append(f"{last_event_time_current_day_formatted}~{next_day_wakeup_time_formatted}sleep_night")
+            intervals.append((last_event_time_current_day_formatted, next_day_wakeup_time_formatted, "sleep_night"))
 
-        self._output(formatted_date_output_str)
-        if day_has_study_event:
-            self._output(f"Status:True")
-        else:
-            self._output(f"Status:False")
-
-        for out_line in event_related_output_lines:
-            self._output(out_line)
+        return {
+            'date': f"{self.year_to_use}{formatted_month_str}{formatted_day_str}",
+            'status': "True" if day_has_study_event else "False",
+            'getup': first_event_true_formatted_time if is_first_event_actual_getup_type else "null",
+            'remark': "",
+            'intervals': intervals,
+        }
 
-    def process_log_data(self, log_data_str: str):
-        lines = log_data_str.strip().split('\n')
-        
-        all_blocks = []
-        current_date_raw_content_temp = None
-        current_event_lines_for_block_temp = []
+    @staticmethod
+    def _format_date_block_lines(block: dict) -> list:
+        # Renders a date block record as Duration-format text lines
+        lines = [f"Date:{block['date']}", f"Status:{block['status']}", f"Getup:{block['getup']}", f"Remark:{block['remark']}"]
+        for start_formatted_time, end_formatted_time, display_text in block['intervals']:
+            if start_formatted_time is None:
+                lines.append(f"{end_formatted_time}{display_text}")
+            else:
+                lines.append(f"{start_formatted_time}~{end_formatted_time}{display_text}")
+        return lines
+
+    def _block_to_day_record(self, block: dict) -> dict:
+        # Converts a date block record into the day object shape produced by data_parser.FileDataParser,
+        # keeping only the intervals FileDataParser would accept from the rendered text
+        time_records = []
+        for start_formatted_time, end_formatted_time, display_text in block['intervals']:
+            if start_formatted_time is None:
+                continue # Rendered without '~'; FileDataParser ignores such lines
+            match = self.DAY_RECORD_LABEL_PATTERN.match(display_text)
+            if not match:
+                print(f"警告: {block['date']} 的活动 '{start_formatted_time}~{end_formatted_time}{display_text}' 不是有效的标签，已跳过。", file=sys.stderr)
+                continue
+            start_h, start_m = map(int, start_formatted_time.split(':'))
+            end_h, end_m = map(int, end_formatted_time.split(':'))
+            start_sec = start_h * 3600 + start_m * 60
+            end_sec = end_h * 3600 + end_m * 60
+            if end_sec < start_sec: # Overnight interval
+                end_sec += 86400
+            project_path = match.group(1).lower().replace('stduy', 'study')
+            time_records.append((start_formatted_time, end_formatted_time, project_path, end_sec - start_sec))
+        return {
+            'date': block['date'],
+            'day_info': {'status': block['status'], 'remark': block['remark'], 'getup_time': block['getup']},
+            'time_records': time_records,
+        }
+
+    def _find_initial_wakeup_raw_time(self, event_lines: list):
+        # The next day's first 醒/起床 event closes the previous day's sleep_night interval
+        for event_line_str in event_lines:
+            if len(event_line_str) >= 4 and event_line_str[:4].isdigit():
+                if event_line_str[4:] in self.WAKEUP_EVENT_TEXTS:
+                    return event_line_str[:4]
+        return None
+
+    def _iter_date_blocks(self, lines):
+        # Groups raw lines into {'date', 'events'} blocks lazily, one block at a time
+        current_date_raw_content = None
+        current_event_lines = []
 
         for line_content in lines:
             line = line_content.strip()
             if not line:
                 continue
-            
+
             # A line is a date if it's exactly 4 digits.
-            is_date_line = line.isdigit() and len(line) == 4
-            # An event line starts with 4 digits but isn't *just* 4 digits (to distinguish from date lines if context is lost)
-            # However, the structure implies date lines are processed first, then subsequent lines are events for that date.
-            # The original logic for else branch after date check implies this:
-            is_event_line = False
-            if not is_date_line and len(line) >= 4 and line[:4].isdigit():
-                 is_event_line = True
-
-
-            if is_date_line:
-                if current_date_raw_content_temp is not None: 
-                    all_blocks.append({
-                        'date': current_date_raw_content_temp,
-                        'events': list(current_event_lines_for_block_temp) 
-                    })
-                current_date_raw_content_temp = line
-                current_event_lines_for_block_temp = []
-            elif is_event_line:
-                if current_date_raw_content_temp is not None:
-                    current_event_lines_for_block_temp.append(line)
+            if line.isdigit() and len(line) == 4:
+                if current_date_raw_content is not None:
+                    yield {'date': current_date_raw_content, 'events': current_event_lines}
+                current_date_raw_content = line
+                current_event_lines = []
+            # An event line starts with 4 digits but isn't *just* 4 digits
+            elif len(line) >= 4 and line[:4].isdigit():
+                if current_date_raw_content is not None:
+                    current_event_lines.append(line)
                 else:
                     print(f"警告: 发现事件行 '{line}' 但没有活动的日期块。此行将被忽略。", file=sys.stderr)
-            # else:
-                # print(f"信息: 忽略格式不符的行: '{line}'", file=sys.stderr)
-
-
-        # Process the last accumulated block
-        if current_date_raw_content_temp is not None:
-            all_blocks.append({
-                'date': current_date_raw_content_temp,
-                'events': list(current_event_lines_for_block_temp)
-            })
-
-        self._printed_at_least_one_block = False # Reset for the printing loop below
-
-        num_blocks = len(all_blocks)
-        for i, block_data in enumerate(all_blocks):
-            current_date_raw_content = block_data['date']
-            current_event_lines_for_block = block_data['events']
-            next_day_initial_wakeup_raw_time = None
-
-            if i + 1 < num_blocks: # If there is a next day block
-                next_day_event_lines = all_blocks[i+1]['events']
-                for event_line_str in next_day_event_lines:
-                    if len(event_line_str) >= 4 and event_line_str[:4].isdigit():
-                        raw_time_next = event_line_str[:4]
-                        text_next = event_line_str[4:]
-                        if text_next in ["醒", "起床"]:
-                            next_day_initial_wakeup_raw_time = raw_time_next
-                            break 
-            
-            if self._printed_at_least_one_block:
-                self._output("") 
-            
-            self._process_and_print_date_block(
-                current_date_raw_content,
-                current_event_lines_for_block,
-                next_day_initial_wakeup_raw_time 
-            )
-            self._printed_at_least_one_block = True
+
+        # The last accumulated block
+        if current_date_raw_content is not None:
+            yield {'date': current_date_raw_content, 'events': current_event_lines}
+
+    def _iter_block_records(self, lines):
+        # Yields the record of each date block (None for blocks with an invalid date), holding
+        # only the current and the next block: a block is built once the following block,
+        # which supplies its sleep_night end time, has been read.
+        pending_block = None
+        for block_data in self._iter_date_blocks(lines):
+            if pending_block is not None:
+                yield self._build_date_block(pending_block['date'], pending_block['events'],
+                                             self._find_initial_wakeup_raw_time(block_data['events']))
+            pending_block = block_data
+
+        if pending_block is not None:
+            yield self._build_date_block(pending_block['date'], pending_block['events'], None)
+
+    def iter_output_lines(self, lines):
+        """
+        Lazily converts raw log lines into Duration-format text lines (without newlines),
+        exactly as they are written to the output file.
+        """
+        printed_at_least_one_block = False
+        for block in self._iter_block_records(lines):
+            if printed_at_least_one_block:
+                yield ""
+            printed_at_least_one_block = True
+            if block is not None:
+                yield from self._format_date_block_lines(block)
+
+    def iter_day_records(self, lines):
+        """
+        Lazily converts raw log lines into day objects shaped like data_parser.FileDataParser's
+        output, so they can be passed straight to database_importer without an intermediate file.
+        """
+        for block in self._iter_block_records(lines):
+            if block is not None:
+                yield self._block_to_day_record(block)
+
+    def process_log_stream(self, lines):
+        """
+        Processes an iterable of raw log lines (e.g. an open file) lazily.
+        Only the current and the next date block are held in memory.
+        """
+        for out_line in self.iter_output_lines(lines):
+            self._output(out_line)
+        if self.output_file_stream:
+            self.flush_output()
+
+    def process_log_data(self, log_data_str: str):
+        self.process_log_stream(log_data_str.strip().split('\n'))
+
+
+DEFAULT_REPLACEMENT_MAP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interval_processor.json")
+YEAR_IN_PATH_PATTERN = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+
+
+def load_year_map(file_path: str) -> dict:
+    # Loads {"relative/path/prefix": year, ...}; prefixes are relative to the input directory
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"年份映射文件 '{file_path}' 的内容不是一个JSON对象 (字典)。")
+    return {os.path.normpath(prefix).replace(os.sep, "/"): int(year) for prefix, year in data.items()}
+
+
+def infer_year(relative_path: str, year_map: dict, default_year: int) -> int:
+    """
+    Picks the year for a raw log, in order of precedence:
+    1. the longest year_map prefix matching the path (a whole file or directory name),
+    2. a 19xx/20xx number in the file name, then in the parent directories (nearest first),
+    3. default_year.
+    """
+    normalized_path = os.path.normpath(relative_path).replace(os.sep, "/")
+    best_prefix = None
+    for prefix in year_map:
+        if normalized_path == prefix or normalized_path.startswith(prefix + "/") or prefix == ".":
+            if best_prefix is None or len(prefix) > len(best_prefix):
+                best_prefix = prefix
+    if best_prefix is not None:
+        return year_map[best_prefix]
+
+    for path_part in reversed(normalized_path.split("/")):
+        match = YEAR_IN_PATH_PATTERN.search(path_part)
+        if match:
+            return int(match.group(1))
+    return default_year
+
+
+def find_raw_log_files(input_dir: str, output_dir: str) -> list:
+    # Every .txt under input_dir, skipping the output directory and earlier Duration_ outputs
+    output_dir_abs = os.path.abspath(output_dir)
+    raw_log_files = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_dir_abs)
+        for filename in sorted(files):
+            if filename.lower().endswith(".txt") and not filename.startswith("Duration_"):
+                raw_log_files.append(os.path.join(root, filename))
+    return raw_log_files
+
+
+def convert_log_file(input_path: str, output_path: str, year: int, alias_matcher: AliasMatcher) -> Counter:
+    # Returns the file's unmapped event counts
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(input_path, 'r', encoding='utf-8') as input_file, open(output_path, 'w', encoding='utf-8') as output_file:
+        processor = LogProcessor(year=year, output_file_stream=output_file, alias_matcher=alias_matcher)
+        processor.process_log_stream(input_file)
+    return processor.unmapped_event_counts
+
+
+_worker_alias_matcher = None
+
+def _init_worker(replacement_map_file: str):
+    # Process pool initializer: each worker loads and compiles the replacement map once
+    global _worker_alias_matcher
+    with contextlib.redirect_stderr(io.StringIO()): # The main process has already reported map loading problems
+        _worker_alias_matcher = AliasMatcher.from_config(LogProcessor._load_replacement_map(replacement_map_file))
+
+def _convert_file_in_worker(task: tuple):
+    # Returns (error message or None, seconds taken, unmapped event counts)
+    input_path, output_path, year = task
+    start_time = time.perf_counter()
+    try:
+        unmapped_event_counts = convert_log_file(input_path, output_path, year, _worker_alias_matcher)
+    except (OSError, UnicodeDecodeError) as e:
+        return str(e), time.perf_counter() - start_time, Counter()
+    return None, time.perf_counter() - start_time, unmapped_event_counts
+
+
+def convert_directory(input_dir: str, output_dir: str, default_year: int, replacement_map_file: str, year_map: dict = None, jobs: int = 0):
+    """
+    Converts every raw log under input_dir into output_dir, mirroring the directory
+    layout and naming each output Duration_<stem>.txt. jobs <= 0 uses all cores.
+    Returns the number of files that failed.
+    """
+    year_map = year_map or {}
+    tasks = []
+    for input_path in find_raw_log_files(input_dir, output_dir):
+        relative_path = os.path.relpath(input_path, input_dir)
+        relative_dir, filename = os.path.split(relative_path)
+        output_path = os.path.join(output_dir, relative_dir, f"Duration_{os.path.splitext(filename)[0]}.txt")
+        tasks.append((input_path, output_path, infer_year(relative_path, year_map, default_year)))
+
+    if not tasks:
+        print(f"No .txt files found in directory: {input_dir}")
+        return 0
+
+    jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+    alias_matcher = AliasMatcher.from_config(LogProcessor._load_replacement_map(replacement_map_file)) # Report map problems once, up front
+    print(f"Converting {len(tasks)} file(s) from {input_dir} into {output_dir} with {min(jobs, len(tasks))} process(es)...")
+
+    start_time = time.perf_counter()
+    if jobs <= 1 or len(tasks) <= 1:
+        results = []
+        for input_path, output_path, year in tasks:
+            task_start_time = time.perf_counter()
+            try:
+                unmapped_event_counts = convert_log_file(input_path, output_path, year, alias_matcher)
+                results.append((None, time.perf_counter() - task_start_time, unmapped_event_counts))
+            except (OSError, UnicodeDecodeError) as e:
+                results.append((str(e), time.perf_counter() - task_start_time, Counter()))
+    else:
+        # Each worker takes several files at a time to reduce inter-process communication
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(replacement_map_file,)) as executor:
+            results = list(executor.map(_convert_file_in_worker, tasks, chunksize=chunksize))
+
+    failed_count = 0
+    total_unmapped_event_counts = Counter()
+    for (input_path, output_path, year), (error, elapsed, unmapped_event_counts) in zip(tasks, results):
+        total_unmapped_event_counts.update(unmapped_event_counts)
+        if error:
+            failed_count += 1
+            print(f"错误: 转换 '{input_path}' 失败: {error}", file=sys.stderr)
+        else:
+            print(f"  [{year}] {input_path} -> {output_path} ({elapsed:.3f}s)")
+    print(f"Converted {len(tasks) - failed_count} of {len(tasks)} file(s) in {time.perf_counter() - start_time:.3f} seconds.")
+    print_unmapped_report(total_unmapped_event_counts)
+    return failed_count
 
 
 def main():
     parser = argparse.ArgumentParser(description="Process log files and output formatted duration data.")
-    parser.add_argument("filepath", help="Path to the input txt file.")
-    parser.add_argument("-o", "--output", help="Path to the output file. If not specified, output is saved to 'Duration_<input_file_stem>.txt'.")
+    parser.add_argument("filepath", help="Path to the input txt file, or a directory whose raw logs are all converted.")
+    parser.add_argument("-o", "--output", help="Path to the output file. If not specified, output is saved to 'Duration_<input_file_stem>.txt'. "
+                                               "In directory mode, the output directory (default: 'Duration_<input_dir_name>').")
     current_year = datetime.datetime.now().year# 获取当前年份作为 --year 参数的默认值
     parser.add_argument("--year", type=int, default=current_year, help=f"Year to use for date formatting (default: {current_year}).")
-    parser.add_argument("--config", default="duration_config.json", help="Path to the text replacement map JSON file (default: duration_config.json).")
+    parser.add_argument("--config", default=DEFAULT_REPLACEMENT_MAP_FILE, help="Path to the text replacement map JSON file (default: interval_processor.json next to this script).")
+    parser.add_argument("--year-map", help="Directory mode: JSON file mapping relative path prefixes to years; otherwise the year is taken from the path or file name, then --year.")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Directory mode: number of worker processes (default: 0 = all cores).")
 
     args = parser.parse_args()
 
+    if os.path.isdir(args.filepath):
+        input_dir = os.path.normpath(args.filepath)
+        output_dir = args.output or f"Duration_{os.path.basename(os.path.abspath(input_dir))}"
+        try:
+            year_map = load_year_map(args.year_map) if args.year_map else None
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取年份映射文件: {e}", file=sys.stderr)
+            sys.exit(1)
+        if convert_directory(input_dir, output_dir, args.year, args.config, year_map, args.jobs):
+            sys.exit(1)
+        return
+
     file_path_input = args.filepath
     user_specified_output_file = args.output 
     year_to_use = args.year
     config_file_path = args.config
     
+    input_file = None
     output_file_stream = None
     actual_output_filename = ""
 
     try:
-        with open(file_path_input, 'r', encoding='utf-8') as file:
-            input_data = file.read()
+        input_file = open(file_path_input, 'r', encoding='utf-8')
         
         if user_specified_output_file:
             actual_output_filename = user_specified_output_file
@@ -262,19 +619,22 @@ def main():
         processor = LogProcessor(year=year_to_use, replacement_map_file=config_file_path, output_file_stream=output_file_stream)
         
         start_time = time.perf_counter()
-        processor.process_log_data(input_data)
+        processor.process_log_stream(input_file) # Read lazily; memory use does not grow with the input size
         end_time = time.perf_counter()
         
         processing_duration = end_time - start_time
 
         print(f"Processing complete. Output has been saved to: {actual_output_filename}")
         print(f"Processing input content took: {processing_duration:.6f} seconds")
+        print_unmapped_report(processor.unmapped_event_counts)
             
     except FileNotFoundError:
         print(f"错误: 输入文件 '{file_path_input}' 未找到。", file=sys.stderr)
     except Exception as e:
         print(f"处理文件时发生错误: {e}", file=sys.stderr)
     finally:
+        if input_file:
+            input_file.close()
         if output_file_stream:
             output_file_stream.close()
 